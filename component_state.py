@@ -0,0 +1,32 @@
+"""
+Process-wide state for the Langflow custom components.
+
+Langflow re-executes a component's code every time the component is built, so
+globals defined in a component file are recreated on each run. Objects that
+should outlive a build (loaded judges, open caches) are kept here instead: this
+module is imported normally, so Python caches it in sys.modules and its globals
+last as long as the process. Langflow needs the repository root on PYTHONPATH
+to import it.
+"""
+import threading
+from types import SimpleNamespace
+
+_lock = threading.Lock()
+_states = {}
+
+
+def process_state(name, **defaults):
+    """
+    Return the namespace shared by every build of the component called `name`.
+
+    The namespace always has a `lock` attribute. Keyword arguments are set as
+    attributes only when they are missing, so they act as initial values.
+    """
+    with _lock:
+        state = _states.get(name)
+        if state is None:
+            state = _states[name] = SimpleNamespace(lock=threading.Lock())
+        for key, value in defaults.items():
+            if not hasattr(state, key):
+                setattr(state, key, value)
+        return state
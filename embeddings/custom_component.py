@@ -0,0 +1,75 @@
+from langflow.custom import Component
+from langflow.io import StrInput, IntInput, HandleInput, Output
+from langchain_core.embeddings import Embeddings
+import os
+
+# Langflow needs the repository root and the embeddings directory on PYTHONPATH for these
+from component_state import process_state
+from embedding_cache import EmbeddingCache, VectorStore
+
+CACHE_PATH = "./embedding-cache.db"
+
+
+def get_vector_store(path: str, memory_entries: int = 10000) -> VectorStore:
+    """Return the process-wide VectorStore for a cache file."""
+    holder = process_state("cached_embeddings", stores={})
+    with holder.lock:
+        store = holder.stores.get(os.path.abspath(path))
+        if store is None:
+            store = holder.stores[os.path.abspath(path)] = VectorStore(path, memory_entries)
+        store.memory_entries = memory_entries
+        return store
+
+
+class CachedEmbeddings(EmbeddingCache, Embeddings):
+    """EmbeddingCache as a LangChain Embeddings, so it plugs into any vector store component."""
+
+
+class CachedEmbeddingsComponent(Component):
+    display_name = "Cached Embeddings"
+    description = "Wraps an embeddings model with a persistent cache so unchanged text is never embedded twice."
+    icon = "database-zap"
+    name = "CachedEmbeddings"
+
+    inputs = [
+        HandleInput(
+            name="embedding",
+            display_name="Embedding",
+            info="Embeddings model to wrap, e.g. Mistral AI Embeddings.",
+            input_types=["Embeddings"]
+        ),
+        StrInput(
+            name="cache_path",
+            display_name="Cache Path",
+            info="SQLite file holding the cached vectors.",
+            value=CACHE_PATH
+        ),
+        IntInput(
+            name="memory_entries",
+            display_name="In-Memory Entries",
+            info="Most recently used vectors kept in memory.",
+            value=10000,
+            advanced=True
+        ),
+        StrInput(
+            name="model_id",
+            display_name="Model ID",
+            info="Identifies the wrapped model in cache keys. Detected from the model when empty.",
+            advanced=True
+        )
+    ]
+
+    outputs = [
+        Output(
+            name="embeddings",
+            display_name="Embeddings",
+            method="build_embeddings"
+        )
+    ]
+
+    def build_embeddings(self) -> Embeddings:
+        store = get_vector_store(self.cache_path or CACHE_PATH, max(1, self.memory_entries))
+        stats = store.stats()
+        self.status = (f"{stats['hit_ratio']:.0%} hit ratio so far ({stats['memory_hits']} memory, "
+                       f"{stats['disk_hits']} disk, {stats['misses']} misses).")
+        return CachedEmbeddings(self.embedding, store, self.model_id or None)
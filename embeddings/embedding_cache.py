@@ -0,0 +1,139 @@
+"""
+Persistent embedding cache behind the Cached Embeddings component.
+
+Kept apart from the component so it can be imported and tested without Langflow.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+
+def embedding_key(model: str, kind: str, text: str) -> bytes:
+    """16-byte key for a text embedded by a model; queries and documents are kept apart."""
+    return hashlib.blake2b(f"{model}\0{kind}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+
+def model_identifier(embeddings) -> str:
+    name = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) or ""
+    return f"{type(embeddings).__name__}:{name}"
+
+
+class VectorStore:
+    """
+    float32 vectors in SQLite blobs with a hot in-memory LRU in front.
+
+    One instance per file is shared by every component build in the process
+    (see get_vector_store), so the LRU stays warm between flow runs.
+    """
+
+    def __init__(self, path: str, memory_entries: int = 10000):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS vectors (key BLOB PRIMARY KEY, vector BLOB) WITHOUT ROWID")
+        self._db.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return the stored vectors for the keys that have one."""
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+            missing = list(dict.fromkeys(missing))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                query = f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(chunk))})"
+                for key, blob in self._db.execute(query, chunk):
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember_locked(key, vector)
+                    self.disk_hits += 1
+            self.misses += sum(1 for key in missing if key not in found)
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray]):
+        """Store vectors in one transaction."""
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                                 [(key, vector.tobytes()) for key, vector in items.items()])
+            self._db.commit()
+            for key, vector in items.items():
+                self._remember_locked(key, vector)
+
+    def _remember_locked(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class EmbeddingCache:
+    """
+    Embeddings wrapper that only sends texts it has never seen to the underlying model.
+
+    Works with any object that has embed_documents and embed_query; the component
+    mixes it into a LangChain Embeddings subclass.
+    """
+
+    def __init__(self, embeddings, store: VectorStore, model: Optional[str] = None):
+        self.embeddings = embeddings
+        self.store = store
+        self.model = model or model_identifier(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_key(self.model, "document", text) for text in texts]
+        found = self.store.get_many(keys)
+
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                misses.setdefault(key, text)
+        if misses:
+            # One call for every miss; the wrapped model does its own request batching
+            vectors = self.embeddings.embed_documents(list(misses.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(misses, vectors)}
+            self.store.put_many(computed)
+            found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_key(self.model, "query", text)
+        vector = self.store.get_many([key]).get(key)
+        if vector is None:
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+            self.store.put_many({key: vector})
+        return vector.tolist()
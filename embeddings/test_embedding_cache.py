@@ -0,0 +1,95 @@
+import numpy as np
+
+from embedding_cache import EmbeddingCache, VectorStore, embedding_key
+
+
+class FakeEmbedder:
+    """Deterministic embedder that records every call it receives."""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.document_calls = []
+        self.query_calls = []
+
+    def vector(self, text):
+        # Not exactly representable in float32, so the round trip is visible
+        return [len(text) / 3, text.count("a") / 7, 0.1]
+
+    def embed_documents(self, texts):
+        self.document_calls.append(list(texts))
+        return [self.vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return self.vector(text)
+
+
+def float32(values):
+    return np.asarray(values, dtype=np.float32).tolist()
+
+
+def test_misses_are_embedded_in_one_call_and_repeats_hit_memory(tmp_path):
+    embedder = FakeEmbedder()
+    store = VectorStore(str(tmp_path / "cache.db"))
+    cache = EmbeddingCache(embedder, store)
+
+    first = cache.embed_documents(["alpha", "beta", "alpha", "gamma"])
+    assert embedder.document_calls == [["alpha", "beta", "gamma"]]
+    assert first == [float32(embedder.vector(t)) for t in ["alpha", "beta", "alpha", "gamma"]]
+
+    second = cache.embed_documents(["gamma", "delta", "beta", "epsilon"])
+    assert embedder.document_calls[1:] == [["delta", "epsilon"]]
+    assert second[0] == first[3] and second[2] == first[1]
+
+    assert cache.embed_documents(["alpha", "beta"]) == first[:2]
+    assert len(embedder.document_calls) == 2
+    stats = store.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (4, 0, 5)
+
+
+def test_queries_and_documents_are_cached_separately(tmp_path):
+    embedder = FakeEmbedder()
+    cache = EmbeddingCache(embedder, VectorStore(str(tmp_path / "cache.db")))
+
+    cache.embed_documents(["alpha"])
+    assert cache.embed_query("alpha") == float32(embedder.vector("alpha"))
+    assert cache.embed_query("alpha") == float32(embedder.vector("alpha"))
+
+    assert embedder.query_calls == ["alpha"]
+    assert embedding_key("fake", "query", "alpha") != embedding_key("fake", "document", "alpha")
+
+
+def test_vectors_round_trip_as_float32_blobs(tmp_path):
+    store = VectorStore(str(tmp_path / "cache.db"))
+    vector = np.asarray([0.1, -2.5, 1e-8, 3.0], dtype=np.float64)
+    store.put_many({b"k": vector.astype(np.float32)})
+
+    blob, = store._db.execute("SELECT vector FROM vectors WHERE key = ?", (b"k",)).fetchone()
+    assert len(blob) == 4 * len(vector)
+
+    store._memory.clear()
+    loaded = store.get_many([b"k"])[b"k"]
+    assert loaded.dtype == np.float32
+    assert np.array_equal(loaded, vector.astype(np.float32))
+
+
+def test_vectors_persist_after_reopening_the_store(tmp_path):
+    path = str(tmp_path / "nested" / "cache.db")
+    embedder = FakeEmbedder()
+    store = VectorStore(path)
+    expected = EmbeddingCache(embedder, store).embed_documents(["alpha", "beta"])
+    store.close()
+
+    reopened = VectorStore(path)
+    fresh = FakeEmbedder()
+    cache = EmbeddingCache(fresh, reopened)
+
+    assert cache.embed_documents(["beta", "alpha"]) == expected[::-1]
+    assert fresh.document_calls == []
+    assert reopened.stats()["disk_hits"] == 2
+
+    # A different model id shares the file but not the vectors
+    other = EmbeddingCache(fresh, reopened, model="other-model")
+    other.embed_documents(["alpha"])
+    assert fresh.document_calls == [["alpha"]]
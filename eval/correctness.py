@@ -0,0 +1,182 @@
+"""
+Scoring and verdict caching for the Correctness Evaluator component.
+
+Kept apart from the component so it can be imported and tested without Langflow.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import time
+
+CACHE_PATH = "correctness_cache.db"
+
+
+def cache_dir() -> str:
+    """Directory relative verdict cache paths live in (CORRECTNESS_CACHE_DIR, default ~/.cache/correctness-eval)."""
+    return os.getenv("CORRECTNESS_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "correctness-eval")
+
+
+def resolve_cache_path(path: str) -> str:
+    """Absolute verdict cache path; a relative path is taken from cache_dir(), not the working directory."""
+    path = os.path.expanduser(path)
+    return path if os.path.isabs(path) else os.path.join(cache_dir(), path)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for HTTP 429 / rate-limit errors raised by the OpenAI or LangChain clients."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "ratelimit" in type(error).__name__.lower()
+
+
+def judge_with_backoff(judge, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0,
+                       sleep=time.sleep, **kwargs):
+    """Call the judge, retrying rate-limit errors with full-jitter exponential backoff."""
+    attempt = 0
+    while True:
+        try:
+            return judge(**kwargs)
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt >= max_retries:
+                raise
+            sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
+            attempt += 1
+
+
+def evaluate_rows(judge, rows, concurrency: int = 8, max_retries: int = 5, on_result=None, base_delay: float = 1.0):
+    """
+    Score (inputs, outputs, reference_outputs) rows with up to `concurrency` judge calls in flight.
+
+    A failing row does not stop the others. `on_result(index, result)` is called in the
+    calling thread as each row finishes, so verdicts can be saved before a later row fails.
+
+    Returns:
+        One evaluation result per row, in input order
+
+    Raises:
+        RuntimeError: If any row failed, after every other row has been scored
+    """
+    def score(row):
+        inputs, outputs, reference_outputs = row
+        return judge_with_backoff(judge, max_retries=max_retries, base_delay=base_delay, inputs=inputs,
+                                  outputs=outputs, reference_outputs=reference_outputs)
+
+    results = [None] * len(rows)
+    errors = []
+
+    def finished(index, result):
+        results[index] = result
+        if on_result is not None:
+            on_result(index, result)
+
+    if concurrency <= 1:
+        for index, row in enumerate(rows):
+            try:
+                result = score(row)
+            except Exception as e:
+                errors.append(e)
+                continue
+            finished(index, result)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(score, row): index for index, row in enumerate(rows)}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                finished(futures[future], result)
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(rows)} rows could not be scored") from errors[0]
+    return results
+
+
+def verdict_key(inputs, outputs, reference_outputs, model: str, prompt: str) -> str:
+    """Hash of everything that determines a verdict; any change means the row is scored again."""
+    payload = json.dumps([inputs, outputs, reference_outputs, model, prompt], default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """Judge results stored in SQLite, keyed by verdict_key."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite file, resolved with resolve_cache_path; ':memory:' keeps verdicts for this instance only
+        """
+        if path != ":memory:":
+            path = resolve_cache_path(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, result TEXT, created REAL)")
+        self._db.commit()
+
+    def get_many(self, keys):
+        """Return {key: result} for the keys that have a stored verdict."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            query = f"SELECT key, result FROM verdicts WHERE key IN ({','.join('?' * len(chunk))})"
+            for key, result in self._db.execute(query, chunk):
+                found[key] = json.loads(result)
+        return found
+
+    def put_many(self, items):
+        """Store (key, result) pairs in one transaction."""
+        now = time.time()
+        self._db.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?)",
+                             [(key, json.dumps(result, default=str), now) for key, result in items])
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def score_rows(judge, rows, model: str, prompt: str, cache_path=None, concurrency: int = 8, max_retries: int = 5):
+    """
+    Score rows, reusing verdicts from the cache and judging each distinct uncached row once.
+
+    Args:
+        judge: Evaluator called with inputs, outputs and reference_outputs
+        rows: (inputs, outputs, reference_outputs) tuples
+        model: Judge model, part of the cache key
+        prompt: Judge prompt, part of the cache key
+        cache_path: Verdict cache file, or None to judge every row
+
+    Returns:
+        (results in input order, rows reused from the cache, rows judged)
+    """
+    cache = VerdictCache(cache_path) if cache_path else None
+    try:
+        keys = [verdict_key(*row, model, prompt) for row in rows]
+        cached = cache.get_many(keys) if cache is not None else {}
+
+        # Identical rows are scored once
+        pending_rows = {}
+        for key, row in zip(keys, rows):
+            if key not in cached:
+                pending_rows.setdefault(key, row)
+        pending = list(pending_rows)
+
+        def save(index, result):
+            # Each verdict is stored as soon as it arrives so a failing row does not lose the others
+            if cache is not None:
+                cache.put_many([(pending[index], result)])
+
+        scored = evaluate_rows(judge, list(pending_rows.values()), concurrency=concurrency,
+                               max_retries=max_retries, on_result=save)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    verdicts = dict(cached)
+    verdicts.update(zip(pending, scored))
+    reused = sum(1 for key in keys if key in cached)
+    return [verdicts[key] for key in keys], reused, len(scored)
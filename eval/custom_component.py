@@ -1,8 +1,32 @@
 from langflow.custom import Component
-from langflow.io import StrInput, DataFrameInput, Output
+from langflow.io import StrInput, IntInput, DataFrameInput, Output
 from langflow.schema import DataFrame, Data
 from openevals.llm import create_llm_as_judge
 from openevals.prompts import CORRECTNESS_PROMPT
+import hashlib
+import time
+
+# Langflow needs the repository root and the eval directory on PYTHONPATH for these
+from component_state import process_state
+from correctness import CACHE_PATH, score_rows
+
+JUDGE_MODEL = "openai:o3-mini"
+
+
+def get_judge(model: str, prompt: str, api_key: str):
+    """Return a cached LLM-as-judge evaluator, building it only the first time a model/prompt/key is used."""
+    holder = process_state("correctness_evaluator", judges={})
+    key = (model, hashlib.sha256(prompt.encode()).hexdigest(), hashlib.sha256((api_key or "").encode()).hexdigest())
+    with holder.lock:
+        judge = holder.judges.get(key)
+        if judge is None:
+            judge = holder.judges[key] = create_llm_as_judge(
+                prompt=prompt,
+                feedback_key="correctness",
+                model=model,
+            )
+        return judge
+
 
 class CorrectnessEvaluator(Component):
     display_name = "Correctness Evaluator"
@@ -35,6 +59,35 @@ class CorrectnessEvaluator(Component):
             name="reference_output_column",
             display_name="Reference Output Column",
             info="Column name for reference outputs in the DataFrame."
+        ),
+        StrInput(
+            name="judge_model",
+            display_name="Judge Model",
+            info="Model used as the judge.",
+            value=JUDGE_MODEL,
+            advanced=True
+        ),
+        IntInput(
+            name="concurrency",
+            display_name="Concurrency",
+            info="Maximum judge calls in flight at once. 1 evaluates rows one at a time.",
+            value=8,
+            advanced=True
+        ),
+        IntInput(
+            name="max_retries",
+            display_name="Max Retries",
+            info="Retries per row when the judge is rate limited.",
+            value=5,
+            advanced=True
+        ),
+        StrInput(
+            name="cache_path",
+            display_name="Verdict Cache",
+            info="SQLite file where verdicts are kept so unchanged rows are not scored again. Relative paths are "
+                 "under CORRECTNESS_CACHE_DIR (default ~/.cache/correctness-eval). Leave empty to disable.",
+            value=CACHE_PATH,
+            advanced=True
         )
     ]
 
@@ -50,24 +103,25 @@ class CorrectnessEvaluator(Component):
         import os
         os.environ["OPENAI_API_KEY"] = self.api_key
 
-        correctness_evaluator = create_llm_as_judge(
-            prompt=CORRECTNESS_PROMPT,
-            feedback_key="correctness",
-            model="openai:o3-mini",
-        )
+        judge_model = self.judge_model or JUDGE_MODEL
+        correctness_evaluator = get_judge(judge_model, CORRECTNESS_PROMPT, self.api_key)
 
-        results = []
-        for _, row in self.dataframe.iterrows():
-            inputs = row[self.input_column]
-            outputs = row[self.output_column]
-            reference_outputs = row[self.reference_output_column]
+        rows = [
+            (row[self.input_column], row[self.output_column], row[self.reference_output_column])
+            for _, row in self.dataframe.iterrows()
+        ]
 
-            eval_result = correctness_evaluator(
-                inputs=inputs,
-                outputs=outputs,
-                reference_outputs=reference_outputs
-            )
-            results.append(eval_result)
+        started = time.perf_counter()
+        results, reused, scored = score_rows(
+            correctness_evaluator,
+            rows,
+            judge_model,
+            CORRECTNESS_PROMPT,
+            cache_path=self.cache_path or None,
+            concurrency=max(1, self.concurrency or 1),
+            max_retries=self.max_retries if self.max_retries is not None else 5,
+        )
 
-        self.status = f"Evaluated correctness for {len(results)} rows."
-        return DataFrame(results)
\ No newline at end of file
+        self.status = (f"Evaluated correctness for {len(results)} rows in {time.perf_counter() - started:.1f}s: "
+                       f"{reused} reused from cache, {scored} scored.")
+        return DataFrame(results)
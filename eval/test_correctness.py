@@ -0,0 +1,181 @@
+import threading
+import time
+
+import pytest
+
+from correctness import (VerdictCache, evaluate_rows, is_rate_limit_error, judge_with_backoff, resolve_cache_path,
+                         score_rows)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeJudge:
+    """Judge that records how many calls overlap and answers with the input."""
+
+    def __init__(self, delay=0.0, fail_on=()):
+        self.delay = delay
+        self.fail_on = set(fail_on)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, inputs, outputs, reference_outputs):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later rows finish first so completion order differs from input order
+            time.sleep(self.delay / (1 + inputs))
+            if inputs in self.fail_on:
+                raise ValueError(f"row {inputs} failed")
+            return {"key": "correctness", "score": outputs == reference_outputs, "inputs": inputs}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_rows(count):
+    return [(i, f"answer {i}", f"answer {i}" if i % 2 else "other") for i in range(count)]
+
+
+def test_concurrency_is_bounded_and_results_keep_input_order():
+    judge = FakeJudge(delay=0.05)
+
+    results = evaluate_rows(judge, make_rows(12), concurrency=3)
+
+    assert judge.max_in_flight == 3
+    assert [r["inputs"] for r in results] == list(range(12))
+    assert [r["score"] for r in results] == [i % 2 == 1 for i in range(12)]
+
+
+def test_concurrency_one_runs_rows_one_at_a_time():
+    judge = FakeJudge(delay=0.01)
+
+    results = evaluate_rows(judge, make_rows(4), concurrency=1)
+
+    assert judge.max_in_flight == 1
+    assert [r["inputs"] for r in results] == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_on_result_sees_every_finished_row_before_the_failure_is_raised(concurrency):
+    judge = FakeJudge(delay=0.01, fail_on={2})
+    seen = {}
+    caller = threading.current_thread()
+
+    def on_result(index, result):
+        assert threading.current_thread() is caller
+        seen[index] = result["inputs"]
+
+    with pytest.raises(RuntimeError, match="1 of 5 rows") as excinfo:
+        evaluate_rows(judge, make_rows(5), concurrency=concurrency, on_result=on_result)
+
+    assert isinstance(excinfo.value.__cause__, ValueError)
+    assert seen == {0: 0, 1: 1, 3: 3, 4: 4}
+    assert judge.calls == 5
+
+
+def test_rate_limit_errors_are_retried_with_growing_backoff():
+    attempts = []
+    delays = []
+
+    def judge(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) < 4:
+            raise RateLimitError("slow down")
+        return {"score": True}
+
+    result = judge_with_backoff(judge, max_retries=5, base_delay=1.0, max_delay=3.0, sleep=delays.append,
+                                inputs="q", outputs="a", reference_outputs="a")
+
+    assert result == {"score": True}
+    assert len(attempts) == 4 and attempts[0] == {"inputs": "q", "outputs": "a", "reference_outputs": "a"}
+    # Full jitter: each delay is drawn from [0, min(max_delay, base_delay * 2 ** attempt)]
+    assert len(delays) == 3
+    assert all(0 <= delay <= cap for delay, cap in zip(delays, [1.0, 2.0, 3.0]))
+
+
+def test_backoff_gives_up_after_max_retries_and_never_retries_other_errors():
+    calls = []
+
+    def limited(**kwargs):
+        calls.append(1)
+        raise RateLimitError("slow down")
+
+    with pytest.raises(RateLimitError):
+        judge_with_backoff(limited, max_retries=2, sleep=lambda delay: None)
+    assert len(calls) == 3
+
+    calls.clear()
+
+    def broken(**kwargs):
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        judge_with_backoff(broken, max_retries=2, sleep=lambda delay: None)
+    assert len(calls) == 1
+
+
+def test_rate_limited_rows_are_retried_inside_evaluate_rows():
+    failures = {1: 2}
+    lock = threading.Lock()
+
+    def judge(inputs, outputs, reference_outputs):
+        with lock:
+            if failures.get(inputs):
+                failures[inputs] -= 1
+                raise RateLimitError("slow down")
+        return inputs
+
+    assert evaluate_rows(judge, make_rows(3), concurrency=2, max_retries=2, base_delay=0.001) == [0, 1, 2]
+
+
+def test_is_rate_limit_error():
+    class Response:
+        status_code = 429
+
+    class WrappedError(Exception):
+        response = Response()
+
+    class OpenAIRateLimitError(Exception):
+        pass
+
+    assert is_rate_limit_error(RateLimitError())
+    assert is_rate_limit_error(WrappedError())
+    assert is_rate_limit_error(OpenAIRateLimitError())
+    assert not is_rate_limit_error(ValueError())
+
+
+def test_second_run_reuses_saved_verdicts(tmp_path, monkeypatch):
+    monkeypatch.setenv("CORRECTNESS_CACHE_DIR", str(tmp_path / "cache"))
+    rows = make_rows(3) + [make_rows(3)[0]]
+
+    first = FakeJudge()
+    results, reused, scored = score_rows(first, rows, "judge-model", "prompt", cache_path="verdicts.db")
+    assert (reused, scored, first.calls) == (0, 3, 3)
+
+    second = FakeJudge()
+    again, reused, scored = score_rows(second, rows, "judge-model", "prompt", cache_path="verdicts.db")
+    assert (reused, scored, second.calls) == (4, 0, 0)
+    assert again == results and [r["inputs"] for r in again] == [0, 1, 2, 0]
+
+    other_model = FakeJudge()
+    score_rows(other_model, rows, "other-model", "prompt", cache_path="verdicts.db")
+    assert other_model.calls == 3
+
+
+def test_relative_cache_path_ignores_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("CORRECTNESS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.chdir(tmp_path)
+
+    cache = VerdictCache("verdicts.db")
+    cache.close()
+
+    assert cache.path == str(tmp_path / "cache" / "verdicts.db")
+    assert (tmp_path / "cache" / "verdicts.db").exists() and not (tmp_path / "verdicts.db").exists()
+    assert resolve_cache_path(str(tmp_path / "data" / "v.db")) == str(tmp_path / "data" / "v.db")
@@ -0,0 +1,173 @@
+from langflow.custom import Component
+from langflow.io import StrInput, IntInput, BoolInput, HandleInput, Output
+from langflow.schema import Data
+from langchain_text_splitters import CharacterTextSplitter
+# Langflow needs the ingestion directory on PYTHONPATH for this
+from incremental import (MANIFEST_VERSION, STORE_BATCH_SIZE, apply_changes, load_html_pages, load_manifest,
+                         plan_changes, save_manifest, unmanaged_ids)
+from typing import List, Tuple
+import os
+import time
+
+
+class IncrementalIngestor(Component):
+    display_name = "Incremental Ingestor"
+    description = "Indexes pages into Chroma, embedding only new or changed chunks and removing deleted ones."
+    icon = "database"
+    name = "IncrementalIngestor"
+
+    inputs = [
+        HandleInput(
+            name="pages",
+            display_name="Pages",
+            info="Pages from the URL component (text and url/source per item).",
+            input_types=["Data", "DataFrame"],
+            is_list=True,
+            required=False
+        ),
+        StrInput(
+            name="html_directory",
+            display_name="HTML Directory",
+            info="Read .html files from this directory instead of (or as well as) connected pages.",
+            advanced=True
+        ),
+        HandleInput(
+            name="embedding",
+            display_name="Embedding",
+            input_types=["Embeddings"]
+        ),
+        StrInput(
+            name="persist_directory",
+            display_name="Persist Directory",
+            value="./chroma-db"
+        ),
+        StrInput(
+            name="collection_name",
+            display_name="Collection Name",
+            value="cas-benefits"
+        ),
+        StrInput(
+            name="manifest_path",
+            display_name="Manifest Path",
+            info="JSON file recording page and chunk hashes. Defaults to <persist directory>/<collection>.manifest.json.",
+            advanced=True
+        ),
+        IntInput(
+            name="chunk_size",
+            display_name="Chunk Size",
+            value=1000,
+            advanced=True
+        ),
+        IntInput(
+            name="chunk_overlap",
+            display_name="Chunk Overlap",
+            value=200,
+            advanced=True
+        ),
+        StrInput(
+            name="separator",
+            display_name="Separator",
+            value="\\n",
+            advanced=True
+        ),
+        IntInput(
+            name="batch_size",
+            display_name="Embedding Batch Size",
+            info="Chunks sent per embedding call.",
+            value=64,
+            advanced=True
+        ),
+        IntInput(
+            name="max_concurrency",
+            display_name="Max Concurrent Embedding Calls",
+            value=4,
+            advanced=True
+        ),
+        BoolInput(
+            name="delete_missing",
+            display_name="Delete Missing Pages",
+            info="Remove chunks of pages that are no longer returned by the crawl.",
+            value=True,
+            advanced=True
+        )
+    ]
+
+    outputs = [
+        Output(
+            name="ingestion_stats",
+            display_name="Ingestion Stats",
+            method="ingest"
+        )
+    ]
+
+    def _pages(self) -> List[Tuple[str, str]]:
+        pages = []
+        for item in self.pages or []:
+            records = item.to_data_list() if hasattr(item, "to_data_list") else [item]
+            for record in records:
+                data = record.data if hasattr(record, "data") else dict(record)
+                source = data.get("url") or data.get("source")
+                text = data.get("text") or ""
+                if source and text:
+                    pages.append((source, text))
+        if self.html_directory:
+            pages.extend(load_html_pages(self.html_directory))
+        return pages
+
+    def ingest(self) -> Data:
+        import chromadb
+
+        started = time.perf_counter()
+        separator = (self.separator or "\\n").replace("\\n", "\n").replace("\\t", "\t")
+        splitter = CharacterTextSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap,
+                                         separator=separator, keep_separator=False)
+        manifest_path = self.manifest_path or os.path.join(self.persist_directory,
+                                                           f"{self.collection_name}.manifest.json")
+        manifest = load_manifest(manifest_path)
+        embedding_model = (f"{type(self.embedding).__name__}:"
+                           f"{getattr(self.embedding, 'model', None) or getattr(self.embedding, 'model_name', '')}")
+
+        splitter_config = {"chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap, "separator": separator}
+        plan = plan_changes(self._pages(), manifest, splitter.split_text, embedding_model,
+                            delete_missing=self.delete_missing, splitter=splitter_config)
+
+        collection = chromadb.PersistentClient(path=self.persist_directory).get_or_create_collection(
+            self.collection_name)
+        # Without a manifest any existing documents came from elsewhere (e.g. the original flow)
+        legacy = []
+        if not manifest["pages"] and collection.count():
+            legacy = unmanaged_ids(lambda limit, offset: collection.get(limit=limit, offset=offset,
+                                                                        include=["metadatas"]))
+        apply_changes(
+            plan,
+            self.embedding.embed_documents,
+            lambda ids, embeddings, documents, metadatas: collection.upsert(
+                ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas),
+            lambda ids: collection.delete(ids=ids),
+            lambda ids, metadatas: collection.update(ids=ids, metadatas=metadatas),
+            batch_size=max(1, self.batch_size),
+            max_concurrency=max(1, self.max_concurrency),
+        )
+        # Old copies are removed only after their replacements are stored, so retrieval keeps working
+        for start in range(0, len(legacy), STORE_BATCH_SIZE):
+            collection.delete(ids=legacy[start:start + STORE_BATCH_SIZE])
+        # Only record the new state once the vector store has it
+        save_manifest(manifest_path, {"version": MANIFEST_VERSION, "embedding_model": embedding_model,
+                                      "splitter": splitter_config,
+                                      "pages": plan["pages"]})
+
+        stats = {
+            "embedded_chunks": len(plan["upserts"]),
+            "deleted_chunks": len(plan["deletes"]),
+            "migrated_chunks": len(legacy),
+            "kept_chunks": plan["kept_chunks"],
+            "changed_pages": plan["changed_pages"],
+            "unchanged_pages": plan["unchanged_pages"],
+            "removed_pages": plan["removed_pages"],
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        self.status = (f"Embedded {stats['embedded_chunks']} chunks, deleted {stats['deleted_chunks']} "
+                       f"(plus {stats['migrated_chunks']} from before incremental ingestion), "
+                       f"kept {stats['kept_chunks']} ({stats['changed_pages']} changed pages, "
+                       f"{stats['unchanged_pages']} unchanged, {stats['removed_pages']} removed).")
+        return Data(data=stats)
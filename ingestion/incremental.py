@@ -0,0 +1,207 @@
+"""
+Planning and writing for the Incremental Ingestor component.
+
+Kept apart from the component so it can be imported and tested without Langflow.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+MANIFEST_VERSION = 1
+# Ids per vector store call when updating or deleting outside a plan's embedding batches
+STORE_BATCH_SIZE = 1000
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source: str, chunk: str, occurrence: int = 0) -> str:
+    """Stable id for a chunk: the same text on the same page always maps to the same id."""
+    return hashlib.sha256(f"{source}\0{occurrence}\0{chunk}".encode("utf-8")).hexdigest()[:32]
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML page, one block per line."""
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        text = re.sub(r"(?is)<(script|style)[^>]*>.*?</\1>", " ", html)
+        text = re.sub(r"(?s)<[^>]+>", "\n", text)
+    else:
+        soup = BeautifulSoup(html, "html.parser")
+        for tag in soup(["script", "style"]):
+            tag.decompose()
+        text = soup.get_text("\n")
+    lines = (re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def load_html_pages(directory: str) -> List[Tuple[str, str]]:
+    """Read every .html file under `directory` as (source, text) pages, e.g. for test fixtures."""
+    pages = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith((".html", ".htm")):
+                path = os.path.join(root, name)
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    pages.append((os.path.relpath(path, directory), html_to_text(f.read())))
+    return pages
+
+
+def load_manifest(path: str) -> Dict:
+    if not path or not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "embedding_model": None, "splitter": None, "pages": {}}
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "embedding_model": None, "splitter": None, "pages": {}}
+    return manifest
+
+
+def save_manifest(path: str, manifest: Dict):
+    """Write the manifest atomically so a crash never leaves it half written."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def plan_changes(pages: List[Tuple[str, str]], manifest: Dict, split_fn: Callable[[str], List[str]],
+                 embedding_model: Optional[str] = None, delete_missing: bool = True,
+                 splitter: Optional[Dict] = None) -> Dict:
+    """
+    Work out which chunks to embed and which to delete.
+
+    Unchanged pages are skipped without splitting. Changed pages are split and
+    only chunks whose id is new get embedded; ids that disappeared are deleted and
+    chunks that are kept get their page hash and position refreshed. If the
+    splitter settings changed, every page is split again the same way (chunks
+    that come out identical are kept). If the embedding model changed,
+    everything is re-embedded.
+
+    Args:
+        splitter: Settings `split_fn` was built from (e.g. chunk size and overlap),
+            compared with the ones stored in the manifest
+
+    Returns:
+        {'upserts': [(id, text, metadata)], 'updates': [(id, metadata)], 'deletes': [id],
+         'pages': new manifest pages, 'unchanged_pages', 'changed_pages', 'removed_pages', 'kept_chunks'}
+    """
+    old_pages = manifest.get("pages", {})
+    reembed_all = manifest.get("embedding_model") != embedding_model
+    resplit_all = manifest.get("splitter") != splitter
+    upserts, updates, deletes, new_pages = [], [], [], {}
+    unchanged = changed = kept = 0
+
+    seen = set()
+    for source, text in pages:
+        if source in seen:
+            continue
+        seen.add(source)
+        page_hash = content_hash(text)
+        old = old_pages.get(source)
+        if old is not None and old["hash"] == page_hash and not reembed_all and not resplit_all:
+            new_pages[source] = old
+            unchanged += 1
+            kept += len(old["chunks"])
+            continue
+
+        changed += 1
+        old_ids = set(old["chunks"]) if old is not None and not reembed_all else set()
+        ids, occurrences = [], {}
+        for index, chunk in enumerate(split_fn(text)):
+            occurrence = occurrences[chunk] = occurrences.get(chunk, -1) + 1
+            cid = chunk_id(source, chunk, occurrence)
+            ids.append(cid)
+            metadata = {"source": source, "page_hash": page_hash, "chunk_index": index}
+            if cid in old_ids:
+                kept += 1
+                updates.append((cid, metadata))
+            else:
+                upserts.append((cid, chunk, metadata))
+        if old is not None:
+            current = set(ids)
+            deletes.extend(cid for cid in old["chunks"] if cid not in current)
+        new_pages[source] = {"hash": page_hash, "chunks": ids}
+
+    removed = 0
+    for source, old in old_pages.items():
+        if source in seen:
+            continue
+        if delete_missing:
+            deletes.extend(old["chunks"])
+            removed += 1
+        else:
+            new_pages[source] = old
+
+    return {"upserts": upserts, "updates": updates, "deletes": deletes, "pages": new_pages, "unchanged_pages": unchanged,
+            "changed_pages": changed, "removed_pages": removed, "kept_chunks": kept}
+
+
+def embed_in_batches(embed_documents: Callable[[List[str]], List[List[float]]], texts: List[str],
+                     batch_size: int = 64, max_concurrency: int = 4) -> List[List[float]]:
+    """Embed texts in batches with at most `max_concurrency` calls in flight, keeping input order."""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as executor:
+        results = list(executor.map(embed_documents, batches))
+    return [vector for batch in results for vector in batch]
+
+
+def apply_changes(plan: Dict, embed_documents, upsert, delete, update=None, batch_size: int = 64,
+                  max_concurrency: int = 4):
+    """
+    Embed the planned chunks and write them to the vector store.
+
+    Args:
+        plan: Output of plan_changes
+        embed_documents: Callable list of texts -> list of vectors
+        upsert: Callable (ids, embeddings, documents, metadatas)
+        delete: Callable (ids)
+        update: Callable (ids, metadatas) for kept chunks; skipped when omitted
+    """
+    upserts = plan["upserts"]
+    for start in range(0, len(upserts), batch_size * max_concurrency):
+        window = upserts[start:start + batch_size * max_concurrency]
+        vectors = embed_in_batches(embed_documents, [text for _, text, _ in window], batch_size, max_concurrency)
+        upsert([cid for cid, _, _ in window], vectors, [text for _, text, _ in window], [meta for _, _, meta in window])
+    updates = plan.get("updates", [])
+    if update is not None:
+        for start in range(0, len(updates), STORE_BATCH_SIZE):
+            window = updates[start:start + STORE_BATCH_SIZE]
+            update([cid for cid, _ in window], [meta for _, meta in window])
+    if plan["deletes"]:
+        delete(plan["deletes"])
+
+
+def unmanaged_ids(get_page, page_size: int = STORE_BATCH_SIZE) -> List[str]:
+    """
+    Ids of documents without a page_hash, i.e. ones not written by this component.
+
+    Collections filled by the stock Chroma component use generated ids, so the
+    first incremental run cannot match them and would otherwise leave them next
+    to their re-embedded copies.
+
+    Args:
+        get_page: Callable (limit, offset) -> {'ids': [...], 'metadatas': [...]}
+        page_size: Documents read per call
+    """
+    found = []
+    offset = 0
+    while True:
+        page = get_page(page_size, offset)
+        ids = page.get("ids") or []
+        for cid, metadata in zip(ids, page.get("metadatas") or [None] * len(ids)):
+            if not (metadata or {}).get("page_hash"):
+                found.append(cid)
+        if len(ids) < page_size:
+            return found
+        offset += len(ids)
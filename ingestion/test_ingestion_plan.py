@@ -0,0 +1,118 @@
+from incremental import (MANIFEST_VERSION, apply_changes, chunk_id, load_manifest, plan_changes, save_manifest,
+                         unmanaged_ids)
+
+
+def split_lines(text):
+    return text.split("\n")
+
+
+def empty_manifest():
+    return {"version": MANIFEST_VERSION, "embedding_model": None, "splitter": None, "pages": {}}
+
+
+def manifest_after(plan, embedding_model="model", splitter=None):
+    return {"version": MANIFEST_VERSION, "embedding_model": embedding_model, "splitter": splitter,
+            "pages": plan["pages"]}
+
+
+def test_first_run_embeds_every_chunk():
+    plan = plan_changes([("a", "one\ntwo"), ("b", "three")], empty_manifest(), split_lines, "model")
+
+    assert [text for _, text, _ in plan["upserts"]] == ["one", "two", "three"]
+    assert plan["deletes"] == [] and plan["updates"] == []
+    assert plan["changed_pages"] == 2 and plan["kept_chunks"] == 0
+
+
+def test_unchanged_pages_are_skipped_without_splitting():
+    pages = [("a", "one\ntwo")]
+    manifest = manifest_after(plan_changes(pages, empty_manifest(), split_lines, "model"))
+
+    def fail(text):
+        raise AssertionError("unchanged page was split")
+
+    plan = plan_changes(pages, manifest, fail, "model")
+
+    assert plan["upserts"] == [] and plan["updates"] == [] and plan["deletes"] == []
+    assert plan["unchanged_pages"] == 1 and plan["kept_chunks"] == 2
+
+
+def test_changed_page_embeds_new_chunks_deletes_old_and_refreshes_kept_metadata():
+    manifest = manifest_after(plan_changes([("a", "one\ntwo\nthree")], empty_manifest(), split_lines, "model"))
+
+    plan = plan_changes([("a", "zero\none\nthree")], manifest, split_lines, "model")
+
+    assert [text for _, text, _ in plan["upserts"]] == ["zero"]
+    assert plan["deletes"] == [chunk_id("a", "two")]
+    new_hash = plan["pages"]["a"]["hash"]
+    assert plan["updates"] == [
+        (chunk_id("a", "one"), {"source": "a", "page_hash": new_hash, "chunk_index": 1}),
+        (chunk_id("a", "three"), {"source": "a", "page_hash": new_hash, "chunk_index": 2}),
+    ]
+    assert plan["kept_chunks"] == 2
+
+
+def test_removed_pages_are_deleted_unless_kept():
+    manifest = manifest_after(plan_changes([("a", "one"), ("b", "two")], empty_manifest(), split_lines, "model"))
+
+    plan = plan_changes([("a", "one")], manifest, split_lines, "model")
+    assert plan["deletes"] == [chunk_id("b", "two")] and plan["removed_pages"] == 1
+
+    plan = plan_changes([("a", "one")], manifest, split_lines, "model", delete_missing=False)
+    assert plan["deletes"] == [] and "b" in plan["pages"]
+
+
+def test_new_embedding_model_reembeds_everything():
+    manifest = manifest_after(plan_changes([("a", "one\ntwo")], empty_manifest(), split_lines, "model"))
+
+    plan = plan_changes([("a", "one\ntwo")], manifest, split_lines, "other-model")
+
+    assert [text for _, text, _ in plan["upserts"]] == ["one", "two"]
+    assert plan["updates"] == [] and plan["deletes"] == []
+
+
+def test_apply_changes_updates_kept_chunks():
+    manifest = manifest_after(plan_changes([("a", "one\ntwo")], empty_manifest(), split_lines, "model"))
+    plan = plan_changes([("a", "two\nthree")], manifest, split_lines, "model")
+    calls = []
+
+    apply_changes(plan, lambda texts: [[float(len(t))] for t in texts],
+                  lambda ids, embeddings, documents, metadatas: calls.append(("upsert", documents)),
+                  lambda ids: calls.append(("delete", ids)),
+                  lambda ids, metadatas: calls.append(("update", [m["chunk_index"] for m in metadatas])))
+
+    assert calls == [("upsert", ["three"]), ("update", [0]), ("delete", [chunk_id("a", "one")])]
+
+
+def test_unmanaged_ids_pages_through_the_collection():
+    documents = [(f"id{i}", {"source": "x", "page_hash": "h"} if i % 3 else None) for i in range(7)]
+
+    def get_page(limit, offset):
+        page = documents[offset:offset + limit]
+        return {"ids": [cid for cid, _ in page], "metadatas": [meta for _, meta in page]}
+
+    assert unmanaged_ids(get_page, page_size=2) == ["id0", "id3", "id6"]
+
+
+def test_new_splitter_settings_resplit_unchanged_pages():
+    lines = {"chunk_size": 1}
+    manifest = manifest_after(plan_changes([("a", "one\ntwo three")], empty_manifest(), split_lines, "model",
+                                           splitter=lines), splitter=lines)
+
+    plan = plan_changes([("a", "one\ntwo three")], manifest, lambda text: text.replace("\n", " ").split(" "),
+                        "model", splitter={"chunk_size": 2})
+
+    assert plan["unchanged_pages"] == 0 and plan["changed_pages"] == 1
+    assert [text for _, text, _ in plan["upserts"]] == ["two", "three"]
+    assert [cid for cid, _ in plan["updates"]] == [chunk_id("a", "one")]
+    assert plan["deletes"] == [chunk_id("a", "two three")]
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "nested" / "manifest.json")
+    assert load_manifest(path) == empty_manifest()
+
+    manifest = manifest_after(plan_changes([("a", "one")], empty_manifest(), split_lines, "model"),
+                              splitter={"chunk_size": 1000})
+    save_manifest(path, manifest)
+
+    assert load_manifest(path) == manifest
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+BACKENDS = ('transformers', 'int8', 'onnx')
+DEFAULT_BACKEND = os.getenv('PRIVACY_BACKEND', 'transformers')
+
+
+def _load_transformers(task: str, model: str, device: Optional[str]):
+    """The FP32 transformers pipeline the module has always used."""
+    from transformers import pipeline
+    return pipeline(task, model=model, device=device)
+
+
+def _load_int8(task: str, model: str, device: Optional[str]):
+    """Transformers pipeline with dynamically int8-quantized Linear layers (CPU only)."""
+    if device not in (None, 'cpu'):
+        raise ValueError("The int8 backend only runs on CPU")
+    import torch
+    from transformers import AutoModelForTokenClassification, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    fp32_model = AutoModelForTokenClassification.from_pretrained(model)
+    quantized = torch.quantization.quantize_dynamic(fp32_model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline(task, model=quantized, tokenizer=tokenizer, device='cpu')
+
+
+def onnx_export_dir(model: str) -> str:
+    """Directory the ONNX export of a model is kept in (PRIVACY_ONNX_CACHE, default ~/.cache/privacy-onnx)."""
+    root = os.getenv('PRIVACY_ONNX_CACHE') or os.path.join(os.path.expanduser('~'), '.cache', 'privacy-onnx')
+    return os.path.join(root, model.replace('/', '--'))
+
+
+def _load_onnx(task: str, model: str, device: Optional[str]):
+    """Pipeline over an ONNX Runtime session, exporting the model to the cache directory on first load."""
+    try:
+        from optimum.onnxruntime import ORTModelForTokenClassification
+    except ImportError as e:
+        raise ImportError("The onnx backend needs `pip install optimum[onnxruntime]`") from e
+    from transformers import AutoTokenizer, pipeline
+
+    provider = 'CPUExecutionProvider' if device in (None, 'cpu') else 'CUDAExecutionProvider'
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    export_dir = onnx_export_dir(model)
+    if not os.path.isdir(export_dir):
+        # Export into a private directory and rename it into place, so processes
+        # loading at the same time (e.g. pool workers) never see half an export
+        os.makedirs(os.path.dirname(export_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(export_dir), suffix='.tmp')
+        try:
+            ORTModelForTokenClassification.from_pretrained(model, export=True).save_pretrained(tmp_dir)
+            try:
+                os.rename(tmp_dir, export_dir)
+            except OSError:
+                if not os.path.isdir(export_dir):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    ort_model = ORTModelForTokenClassification.from_pretrained(export_dir, provider=provider)
+    return pipeline(task, model=ort_model, tokenizer=tokenizer)
+
+
+_LOADERS = {
+    'transformers': _load_transformers,
+    'int8': _load_int8,
+    'onnx': _load_onnx,
+}
+
+
+def load_pipeline(task: str, model: str, device: Optional[str], backend: str = DEFAULT_BACKEND):
+    """
+    Load a token-classification pipeline on the requested inference backend.
+
+    Every backend is wrapped in a transformers pipeline, so they all return the same
+    word/score/start/end records that `process_anonymization_results` consumes. The
+    pipeline's `inference_backend` attribute records which backend it runs on.
+
+    Args:
+        task: Transformers pipeline task
+        model: Model id or path
+        device: Device to run on; None lets transformers choose
+        backend: One of 'transformers', 'int8' or 'onnx'
+
+    Returns:
+        The loaded pipeline
+    """
+    if backend not in _LOADERS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    pipe = _LOADERS[backend](task, model, device)
+    pipe.inference_backend = backend
+    return pipe
@@ -0,0 +1,108 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent callers and runs them through one batched call.
+
+    A background thread waits for the first text, then keeps collecting for up to
+    `max_wait_ms` milliseconds or until `max_batch_size` texts are queued, and hands
+    the whole batch to `batch_fn`. Each caller gets back only its own result.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[str]], List[Dict]], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0):
+        """
+        Args:
+            batch_fn: Callable mapping a list of texts to a list of results in the same order
+            max_batch_size: Maximum number of texts per batched call
+            max_wait_ms: How long to wait for more texts after the first one arrives
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> "MicroBatcher":
+        """Start the background batching thread (idempotent)."""
+        with self._lock:
+            self._start_locked()
+        return self
+
+    def _start_locked(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="privacy-micro-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text and return a Future resolving to its result."""
+        future: Future = Future()
+        # Checked under the lock close() takes, so nothing is queued behind the stop signal
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._start_locked()
+            self._queue.put((text, future))
+        return future
+
+    def anonymize(self, text: str, timeout: Optional[float] = None) -> Dict:
+        """Submit a text and block until its result is ready."""
+        return self.submit(text).result(timeout=timeout)
+
+    def close(self) -> None:
+        """Finish the queued work and stop the background thread."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _collect(self) -> tuple:
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            try:
+                results = self.batch_fn(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            if len(results) != len(batch):
+                # Results can't be matched to callers, so fail every one rather than leave some waiting forever
+                error = RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} texts")
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,511 @@
+"""
+Benchmarks for the privacy pipeline.
+
+    python benchmark.py                              # aggregation and masking timings
+    python benchmark.py --suite --update-baseline    # time every stage and store a baseline
+    python benchmark.py --suite                      # fail (exit 1) if a stage regressed, 2 without a baseline
+
+benchmark_baseline.json is committed. It stores the calibration time of the
+machine it was recorded on, and the suite scales its timings by the ratio to
+the current machine, so CI compares against it directly. After an intended
+performance change, re-run with --update-baseline and commit the new file.
+    python benchmark.py --suite --model --profile cprofile
+"""
+import argparse
+import cProfile
+import gc
+import json
+import os
+import pstats
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from main import (aggregate_privacy_tokens, aggregate_token_columns, mask_text_with_original,
+                  predict_columns, process_anonymization_results, process_token_columns, token_columns)
+
+# SMS, a long message, a few pages, a multi-page document
+SUITE_SIZES = [160, 2_000, 20_000, 200_000]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+WORDS = ["I", "am", "living", "in", "South", "London", "and", "currently", "unemployed",
+         "looking", "to", "apply", "for", "benefits", "my", "name", "is", "Jane", "Smith"]
+
+
+def synthetic_predictions(n_chars: int, pii_rate: float = 0.1, seed: int = 0) -> Tuple[str, List[Dict]]:
+    """
+    Build a text of roughly `n_chars` characters with matching token predictions.
+
+    Words are split into one or two sub-word tokens using the 'Ġ' word-start
+    convention of the model's tokenizer, and a `pii_rate` share of words gets a
+    high score so the post-processing stages have realistic work to do.
+
+    Args:
+        n_chars: Approximate length of the generated text
+        pii_rate: Fraction of words scored above the default threshold
+        seed: Random seed so runs are comparable
+
+    Returns:
+        Tuple of (text, token_predictions)
+    """
+    rng = random.Random(seed)
+    words = []
+    tokens = []
+    pos = 0
+    while pos < n_chars:
+        word = rng.choice(WORDS)
+        start = pos + (1 if words else 0)
+        score = rng.uniform(0.5, 1.0) if rng.random() < pii_rate else rng.uniform(0.0, 0.1)
+        prefix = 'Ġ' if words else ''
+        if len(word) > 4:
+            cut = len(word) // 2
+            tokens.append({'word': prefix + word[:cut], 'score': score, 'start': start, 'end': start + cut})
+            tokens.append({'word': word[cut:], 'score': score / 2, 'start': start + cut, 'end': start + len(word)})
+        else:
+            tokens.append({'word': prefix + word, 'score': score, 'start': start, 'end': start + len(word)})
+        words.append(word)
+        pos = start + len(word)
+    return ' '.join(words), tokens
+
+
+def bench_masking(sizes: List[int], repeat: int = 3) -> List[Dict]:
+    """
+    Time `mask_text_with_original` across text sizes.
+
+    Args:
+        sizes: Text sizes in characters
+        repeat: Runs per size; the fastest is reported
+
+    Returns:
+        List of {'chars', 'seconds', 'ns_per_char'} records
+    """
+    records = []
+    for size in sizes:
+        text, tokens = synthetic_predictions(size)
+        groups = aggregate_privacy_tokens(tokens)
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            mask_text_with_original(tokens, groups, text)
+            best = min(best, time.perf_counter() - started)
+        records.append({'chars': len(text), 'seconds': best, 'ns_per_char': best * 1e9 / len(text)})
+    return records
+
+
+def bench_aggregation(sizes: List[int], repeat: int = 3) -> List[Dict]:
+    """
+    Time the dictionary loop against the columnar aggregation across text sizes.
+
+    Returns:
+        List of {'chars', 'tokens', 'loop_seconds', 'columnar_seconds'} records
+    """
+    records = []
+    for size in sizes:
+        _, tokens = synthetic_predictions(size)
+        columns = token_columns(tokens)
+        loop_best = columnar_best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            aggregate_privacy_tokens(tokens)
+            loop_best = min(loop_best, time.perf_counter() - started)
+            started = time.perf_counter()
+            aggregate_token_columns(columns['scores'], columns['word_start'], columns['special'])
+            columnar_best = min(columnar_best, time.perf_counter() - started)
+        records.append({'chars': size, 'tokens': len(tokens),
+                        'loop_seconds': loop_best, 'columnar_seconds': columnar_best})
+    return records
+
+
+def bench_pool_scaling(process_counts: List[int], n_texts: int = 256, text_chars: int = 160) -> List[Dict]:
+    """
+    Measure anonymization throughput of AnonymizerPool for each process count.
+
+    This loads the real model, so it is only run when asked for with --scaling.
+
+    Returns:
+        List of {'processes', 'seconds', 'texts_per_sec', 'speedup'} records
+    """
+    from pool import AnonymizerPool
+
+    texts = [synthetic_predictions(text_chars, seed=i)[0] for i in range(n_texts)]
+    records = []
+    for processes in process_counts:
+        with AnonymizerPool(processes=processes, threads_per_worker=1) as pool:
+            pool.anonymize_batch(texts[:processes])  # warm up every worker
+            started = time.perf_counter()
+            pool.anonymize_batch(texts)
+            seconds = time.perf_counter() - started
+        records.append({'processes': processes, 'seconds': seconds, 'texts_per_sec': n_texts / seconds,
+                        'speedup': records[0]['seconds'] / seconds if records else 1.0})
+    return records
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def compare_backends(backends: List[str], n_texts: int = 64, text_chars: int = 160) -> List[Dict]:
+    """
+    Check each inference backend against the FP32 transformers output and time it.
+
+    Texts go through `predict_columns` and `process_token_columns`, the path
+    production uses, so differences in the logits or offsets a backend produces
+    show up here. For every backend this records load time, resident memory added
+    by the load, mean latency per text, the share of texts whose predicted token
+    spans and masked output match FP32 exactly, and the largest score difference
+    on tokens both backends produced.
+
+    Returns:
+        One record per backend
+    """
+    from backends import load_pipeline
+
+    texts = [synthetic_predictions(text_chars, seed=i)[0] for i in range(n_texts)]
+    reference = None
+    records = []
+    for backend in ['transformers'] + [b for b in backends if b != 'transformers']:
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        pipe = load_pipeline('token-classification', 'ai4privacy/llama-ai4privacy-english-anonymiser-openpii',
+                             'cpu', backend)
+        load_seconds = time.perf_counter() - started
+        memory_mb = _rss_mb() - rss_before
+
+        predict_columns(pipe, texts[:1])  # warm up
+        started = time.perf_counter()
+        predictions = [predict_columns(pipe, [text])[0] for text in texts]
+        latency_ms = (time.perf_counter() - started) * 1000 / n_texts
+
+        masked = [process_token_columns(columns, text)['masked_text'] for columns, text in zip(predictions, texts)]
+        spans = [list(zip(columns['starts'].tolist(), columns['ends'].tolist())) for columns in predictions]
+        if reference is None:
+            reference = (predictions, masked, spans)
+        max_score_diff = 0.0
+        for columns, ref_columns in zip(predictions, reference[0]):
+            ref_scores = dict(zip(zip(ref_columns['starts'].tolist(), ref_columns['ends'].tolist()),
+                                  ref_columns['scores'].tolist()))
+            for key, score in zip(zip(columns['starts'].tolist(), columns['ends'].tolist()), columns['scores'].tolist()):
+                if key in ref_scores:
+                    max_score_diff = max(max_score_diff, abs(score - ref_scores[key]))
+        agreement = sum(a == b for a, b in zip(masked, reference[1])) / n_texts
+        span_agreement = sum(a == b for a, b in zip(spans, reference[2])) / n_texts
+
+        records.append({'backend': backend, 'load_seconds': load_seconds, 'memory_mb': memory_mb,
+                        'latency_ms': latency_ms, 'span_agreement': span_agreement, 'masked_agreement': agreement,
+                        'max_score_diff': max_score_diff})
+        del pipe
+    return records
+
+
+def _best_time(fn: Callable, repeat: int) -> float:
+    """Fastest of `repeat` runs, with the garbage collector paused as timeit does."""
+    best = float('inf')
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best
+
+
+def calibrate(repeat: int = 5) -> float:
+    """
+    Time a fixed pure-Python workload (dict building and iteration, like the
+    post-processing stages) so results can be compared across machines.
+    """
+    def workload():
+        groups = []
+        for i in range(100_000):
+            if i % 7 == 0:
+                groups.append({'indices': [i], 'scores': [i * 0.5]})
+            else:
+                groups[-1]['indices'].append(i)
+        return groups
+
+    return _best_time(workload, repeat)
+
+
+def _memory(fn: Callable) -> Tuple[int, int]:
+    """
+    Run `fn` once under tracemalloc.
+
+    Returns:
+        (peak bytes allocated while it ran, bytes still allocated afterwards)
+    """
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak - before, current - before
+
+
+def _stage_record(stage: str, chars: int, tokens: int, fn: Callable, repeat: int) -> Dict:
+    # Timing and memory are measured in separate runs; tracemalloc slows allocation-heavy code a lot
+    seconds = _best_time(fn, repeat)
+    peak, retained = _memory(fn)
+    return {'stage': stage, 'chars': chars, 'tokens': tokens, 'seconds': seconds,
+            'peak_kb': peak / 1024, 'retained_kb': retained / 1024}
+
+
+def bench_stages(sizes: List[int], repeat: int = 3, model: bool = False, backend: Optional[str] = None) -> List[Dict]:
+    """
+    Time each stage of the privacy pipeline separately across text sizes.
+
+    Post-processing stages run on synthetic token predictions, so no model is
+    needed. 'postprocess' is process_token_columns, the path anonymize_text and
+    anonymize_batch use; 'dict_postprocess' is process_anonymization_results on
+    token dictionaries, kept for run_anonymization_pipeline callers. With `model=True` the model load and inference stages
+    are added; inference runs predict_columns on the whole text, which splits it
+    into token windows since the model has a fixed context length.
+
+    Returns:
+        List of {'stage', 'chars', 'tokens', 'seconds', 'peak_kb', 'retained_kb'} records
+    """
+    records = []
+    pipe = None
+    if model:
+        from backends import DEFAULT_BACKEND, load_pipeline
+        from model_registry import DEFAULT_DEVICE, DEFAULT_MODEL, DEFAULT_TASK
+
+        backend = backend or DEFAULT_BACKEND
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        # Load directly rather than through the registry so the cost is not hidden by its cache
+        pipe = load_pipeline(DEFAULT_TASK, DEFAULT_MODEL, DEFAULT_DEVICE, backend)
+        records.append({'stage': 'model_load', 'chars': 0, 'tokens': 0, 'seconds': time.perf_counter() - started,
+                        'peak_kb': None, 'retained_kb': None, 'rss_mb': _rss_mb() - rss_before, 'backend': backend})
+        pipe("warm up")
+
+    for size in sizes:
+        text, tokens = synthetic_predictions(size)
+        chars, n_tokens = len(text), len(tokens)
+        groups = aggregate_privacy_tokens(tokens)
+        columns = token_columns(tokens)
+
+        if pipe is not None:
+            records.append(_stage_record('inference', chars, n_tokens,
+                                         lambda: predict_columns(pipe, [text]), min(repeat, 2)))
+        records.append(_stage_record('aggregation', chars, n_tokens,
+                                     lambda: aggregate_privacy_tokens(tokens), repeat))
+        records.append(_stage_record('columnar_aggregation', chars, n_tokens,
+                                     lambda: aggregate_token_columns(columns['scores'], columns['word_start'],
+                                                                     columns['special']), repeat))
+        records.append(_stage_record('masking', chars, n_tokens,
+                                     lambda: mask_text_with_original(tokens, groups, text), repeat))
+        records.append(_stage_record('postprocess', chars, n_tokens,
+                                     lambda: process_token_columns(columns, text), repeat))
+        records.append(_stage_record('dict_postprocess', chars, n_tokens,
+                                     lambda: process_anonymization_results(tokens, text), repeat))
+    return records
+
+
+@contextmanager
+def profile_hook(kind: Optional[str], output_dir: str = '.'):
+    """
+    Profile the enclosed block.
+
+    Args:
+        kind: None, 'cprofile' (writes privacy_bench.prof and prints the top functions)
+              or 'py-spy' (records a flame graph privacy_bench.svg; needs py-spy on PATH)
+        output_dir: Where profile output is written
+    """
+    if kind is None:
+        yield
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    if kind == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = os.path.join(output_dir, 'privacy_bench.prof')
+            profiler.dump_stats(path)
+            print(f"cProfile output written to {path}")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+        return
+    if kind == 'py-spy':
+        if shutil.which('py-spy') is None:
+            raise SystemExit("py-spy is not installed (pip install py-spy)")
+        path = os.path.join(output_dir, 'privacy_bench.svg')
+        recorder = subprocess.Popen(['py-spy', 'record', '--pid', str(os.getpid()), '--output', path, '--rate', '200'])
+        time.sleep(1.0)  # let py-spy attach before the work starts
+        try:
+            yield
+        finally:
+            recorder.send_signal(signal.SIGINT)
+            recorder.wait(timeout=30)
+            print(f"py-spy flame graph written to {path}")
+        return
+    raise ValueError(f"Unknown profiler {kind!r}")
+
+
+def _record_key(record: Dict) -> Tuple[str, int]:
+    return record['stage'], record['chars']
+
+
+def check_regressions(records: List[Dict], baseline: List[Dict], tolerance: float = 0.5,
+                      min_delta_ms: float = 0.5, speed_ratio: float = 1.0, min_delta_kb: float = 64.0) -> List[str]:
+    """
+    Compare stage records against a stored baseline.
+
+    A stage regresses when its time exceeds the baseline by more than `tolerance`
+    (a fraction) and by more than `min_delta_ms`, so sub-millisecond noise on
+    small inputs doesn't fail the gate. When both runs carry a calibration time,
+    baseline times are scaled by the ratio first, so a baseline recorded on a
+    faster or slower machine still applies. Peak memory is held to the same
+    tolerance and must also grow by more than `min_delta_kb`, since a few KB on a
+    small stage is already a large fraction.
+
+    Returns:
+        One message per regression (empty when everything is within bounds)
+    """
+    reference = {_record_key(record): record for record in baseline}
+    regressions = []
+    for record in records:
+        base = reference.get(_record_key(record))
+        if base is None:
+            continue
+        label = f"{record['stage']} @ {record['chars']} chars"
+        expected = base['seconds'] * speed_ratio
+        slower = record['seconds'] - expected
+        if record['seconds'] > expected * (1 + tolerance) and slower * 1000 > min_delta_ms:
+            regressions.append(f"{label}: {record['seconds'] * 1000:.2f} ms vs baseline "
+                               f"{expected * 1000:.2f} ms (+{slower / expected:.0%})")
+        if (record.get('peak_kb') and base.get('peak_kb') and record['peak_kb'] > base['peak_kb'] * (1 + tolerance)
+                and record['peak_kb'] - base['peak_kb'] > min_delta_kb):
+            regressions.append(f"{label}: peak memory {record['peak_kb']:.0f} KB vs baseline {base['peak_kb']:.0f} KB")
+    return regressions
+
+
+def run_suite(args) -> int:
+    """Run the stage suite, save or compare a baseline, and return the exit code."""
+    sizes = args.sizes or SUITE_SIZES
+    repeat = max(args.repeat, 5)
+    calibration = calibrate()
+    with profile_hook(args.profile, args.profile_dir):
+        records = bench_stages(sizes, repeat, model=args.model, backend=args.backend)
+
+    print(f"{'stage':>22} {'chars':>9} {'tokens':>8} {'ms':>10} {'peak KB':>10} {'retained KB':>12}")
+    for record in records:
+        peak = f"{record['peak_kb']:>10.0f}" if record['peak_kb'] is not None else f"{'-':>10}"
+        retained = f"{record['retained_kb']:>12.0f}" if record['retained_kb'] is not None else f"{'-':>12}"
+        print(f"{record['stage']:>22} {record['chars']:>9} {record['tokens']:>8} "
+              f"{record['seconds'] * 1000:>10.2f} {peak} {retained}")
+
+    report = {'python': sys.version.split()[0], 'repeat': repeat, 'calibration_seconds': calibration,
+              'records': records}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # Passing here would let a gate with a mistyped or missing path pass forever
+        print(f"\nERROR: no baseline at {args.baseline}, nothing was checked. "
+              f"Run with --update-baseline to create one.", file=sys.stderr)
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    speed_ratio = calibration / baseline['calibration_seconds'] if baseline.get('calibration_seconds') else 1.0
+    regressions = check_regressions(records, baseline['records'], args.tolerance, args.min_delta_ms, speed_ratio,
+                                    args.min_delta_kb)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nNo stage regressed more than {args.tolerance:.0%} against {args.baseline}.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the privacy post-processing stages.")
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        help="Text sizes in characters (default 160 10000 100000 1000000, "
+                             "or 160 2000 20000 200000 with --suite)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per size (at least 5 with --suite)")
+    parser.add_argument('--scaling', type=int, nargs='*', metavar='PROCESSES',
+                        help="Benchmark the process pool with these process counts (loads the model)")
+    parser.add_argument('--backends', nargs='*', metavar='BACKEND',
+                        help="Compare inference backends against FP32 (loads the model)")
+    suite = parser.add_argument_group("stage suite")
+    suite.add_argument('--suite', action='store_true',
+                       help="Time every pipeline stage with memory tracking and check against the baseline")
+    suite.add_argument('--model', action='store_true', help="Include model load and inference (loads the model)")
+    suite.add_argument('--backend', help="Inference backend for --model")
+    suite.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON to compare against or save to")
+    suite.add_argument('--update-baseline', '--save-baseline', dest='update_baseline', action='store_true',
+                       help="Store this run as the new baseline (without one the suite exits 2)")
+    suite.add_argument('--tolerance', type=float, default=0.5, help="Allowed slowdown as a fraction")
+    suite.add_argument('--min-delta-ms', type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    suite.add_argument('--min-delta-kb', type=float, default=64.0,
+                       help="Ignore peak memory growth smaller than this")
+    suite.add_argument('--profile', choices=['cprofile', 'py-spy'], help="Profile the suite run")
+    suite.add_argument('--profile-dir', default='.', help="Where profiler output is written")
+    suite.add_argument('--output', help="Write the suite report as JSON to this file")
+    args = parser.parse_args()
+
+    if args.suite:
+        raise SystemExit(run_suite(args))
+    sizes = args.sizes or [160, 10_000, 100_000, 1_000_000]
+
+    if args.backends is not None:
+        print(f"{'backend':>12} {'load s':>8} {'mem MB':>8} {'ms/text':>8} {'spans':>6} {'masked':>6} "
+              f"{'max dscore':>10}")
+        for record in compare_backends(args.backends or ['int8', 'onnx']):
+            print(f"{record['backend']:>12} {record['load_seconds']:>8.1f} {record['memory_mb']:>8.0f} "
+                  f"{record['latency_ms']:>8.1f} {record['span_agreement']:>6.0%} {record['masked_agreement']:>6.0%} "
+                  f"{record['max_score_diff']:>10.4f}")
+        return
+
+    if args.scaling is not None:
+        counts = args.scaling or [1, 2, 4, os.cpu_count() or 1]
+        print(f"{'processes':>10} {'seconds':>10} {'texts/sec':>10} {'speedup':>8}")
+        for record in bench_pool_scaling(sorted(set(counts))):
+            print(f"{record['processes']:>10} {record['seconds']:>10.2f} {record['texts_per_sec']:>10.1f} "
+                  f"{record['speedup']:>8.2f}")
+        return
+
+    print(f"{'chars':>10} {'tokens':>10} {'loop s':>10} {'columnar s':>12}")
+    for record in bench_aggregation(sizes, args.repeat):
+        print(f"{record['chars']:>10} {record['tokens']:>10} {record['loop_seconds']:>10.4f} "
+              f"{record['columnar_seconds']:>12.4f}")
+
+    print()
+    print(f"{'chars':>10} {'seconds':>10} {'ns/char':>10}")
+    for record in bench_masking(sizes, args.repeat):
+        print(f"{record['chars']:>10} {record['seconds']:>10.4f} {record['ns_per_char']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
-# Use a pipeline as a high-level helper
-from transformers import pipeline
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import numpy as np
 
+from backends import DEFAULT_BACKEND
+from batching import MicroBatcher
+from model_registry import DEFAULT_DEVICE, DEFAULT_MODEL, get_registry
+from result_cache import AnonymizationCache
+
+SPECIAL_TOKENS = ('[CLS]', '[SEP]')
+
 def softmax(logits: List[float]) -> List[float]:
     """Compute softmax probabilities from logits."""
-    exp_logits = [np.exp(x) for x in logits]
-    sum_exp = sum(exp_logits)
-    return [exp / sum_exp for exp in exp_logits]
+    return softmax_array(logits).tolist()
+
+def softmax_array(logits, axis: int = -1) -> np.ndarray:
+    """Vectorized softmax over `axis`, e.g. the label axis of a (num_tokens, num_labels) logits array."""
+    logits = np.asarray(logits, dtype=np.float64)
+    shifted = np.exp(logits - logits.max(axis=axis, keepdims=True))
+    return shifted / shifted.sum(axis=axis, keepdims=True)
 
 def aggregate_privacy_tokens(token_predictions: List[Dict], threshold: float = 0.3) -> List[Dict]:
     """
@@ -60,48 +69,176 @@ def aggregate_privacy_tokens(token_predictions: List[Dict], threshold: float = 0
             
     return aggregated
 
-def mask_text_with_original(token_predictions: List[Dict], aggregated_groups: List[Dict], original_text: str) -> Tuple[str, List[Dict]]:
+def token_columns(token_predictions: List[Dict]) -> Dict[str, np.ndarray]:
     """
-    Mask the original text by replacing sensitive tokens with placeholders.
+    Convert pipeline token dictionaries into column arrays.
     
     Args:
         token_predictions: List of token prediction dictionaries
+    
+    Returns:
+        Dictionary of 'scores', 'starts', 'ends', 'word_start' and 'special' arrays
+    """
+    words = [token['word'] for token in token_predictions]
+    return {
+        'scores': np.fromiter((token['score'] for token in token_predictions), dtype=np.float64, count=len(words)),
+        'starts': np.fromiter((token['start'] for token in token_predictions), dtype=np.int64, count=len(words)),
+        'ends': np.fromiter((token['end'] for token in token_predictions), dtype=np.int64, count=len(words)),
+        'word_start': np.fromiter((word.startswith('Ġ') for word in words), dtype=bool, count=len(words)),
+        'special': np.fromiter((word in SPECIAL_TOKENS for word in words), dtype=bool, count=len(words)),
+    }
+
+def columns_from_logits(logits, offset_mapping, tokens: List[str], ignore_label_ids: List[int],
+                        special_tokens_mask=None) -> Dict[str, np.ndarray]:
+    """
+    Build token columns straight from model logits and the tokenizer offset mapping.
+    
+    Produces the same tokens and scores as the transformers token-classification
+    pipeline without building one dictionary per token: special tokens and tokens
+    whose best label is ignored ('O') are dropped, and every other token is scored
+    with the probability of its best label.
+    
+    Args:
+        logits: Array of shape (num_tokens, num_labels)
+        offset_mapping: Array of shape (num_tokens, 2) with character offsets
+        tokens: Token strings from `tokenizer.convert_ids_to_tokens`
+        ignore_label_ids: Label ids the pipeline leaves out of its output (the 'O' label)
+        special_tokens_mask: Optional array marking special and padding tokens
+    
+    Returns:
+        Dictionary of 'scores', 'starts', 'ends', 'word_start' and 'special' arrays
+    """
+    probabilities = softmax_array(logits, axis=-1)
+    keep = ~np.isin(probabilities.argmax(axis=-1), ignore_label_ids)
+    if special_tokens_mask is not None:
+        keep &= ~np.asarray(special_tokens_mask, dtype=bool)
+    offsets = np.asarray(offset_mapping, dtype=np.int64).reshape(-1, 2)[keep]
+    kept_tokens = [token for token, kept in zip(tokens, keep.tolist()) if kept]
+    return {
+        'scores': probabilities.max(axis=-1)[keep],
+        'starts': offsets[:, 0],
+        'ends': offsets[:, 1],
+        'word_start': np.array([token.startswith('Ġ') for token in kept_tokens], dtype=bool),
+        'special': np.array([token in SPECIAL_TOKENS for token in kept_tokens], dtype=bool),
+    }
+
+def aggregate_token_columns(scores: np.ndarray, word_start: np.ndarray, special: np.ndarray,
+                            threshold: float = 0.3) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized equivalent of `aggregate_privacy_tokens` over column arrays.
+    
+    Every special token or 'Ġ' token opens a new segment. A segment is a word group
+    when its first token is not special and either starts with 'Ġ' or is the very
+    first token, mirroring the loop in `aggregate_privacy_tokens`.
+    
+    Args:
+        scores: Per-token privacy scores
+        word_start: True where the token starts with 'Ġ'
+        special: True for [CLS]/[SEP] tokens
+        threshold: Minimum score threshold for privacy detection
+    
+    Returns:
+        Tuple of (first_index, last_index, max_score) arrays, one entry per kept group
+    """
+    n = len(scores)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float64)
+    
+    boundary = word_start | special
+    boundary[0] = True
+    segment_starts = np.flatnonzero(boundary)
+    segment_ends = np.append(segment_starts[1:], n)
+    segment_max = np.maximum.reduceat(np.asarray(scores, dtype=np.float64), segment_starts)
+    
+    is_group = ~special[segment_starts] & (word_start[segment_starts] | (segment_starts == 0))
+    keep = is_group & (segment_max >= threshold)
+    return segment_starts[keep], segment_ends[keep] - 1, segment_max[keep]
+
+def merge_spans(spans) -> List[Tuple[int, int, float]]:
+    """
+    Sort (start, end, activation) spans and merge overlapping or touching ones.
+    
+    Args:
+        spans: Iterable of (start, end, activation) tuples
+    
+    Returns:
+        List of non-overlapping (start, end, activation) tuples in reading order
+    """
+    merged = []
+    for start, end, score in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            prev_start, prev_end, prev_score = merged[-1]
+            merged[-1] = (prev_start, max(prev_end, end), max(prev_score, score))
+        else:
+            merged.append((start, end, score))
+    return merged
+
+def merge_group_spans(aggregated_groups: List[Dict]) -> List[Tuple[int, int, float]]:
+    """
+    Convert aggregated groups into sorted, non-overlapping character spans.
+    
+    Overlapping or touching spans are merged into one, keeping the highest score.
+    
+    Args:
         aggregated_groups: List of aggregated token groups to mask
+    
+    Returns:
+        List of (start, end, activation) tuples in reading order
+    """
+    return merge_spans(
+        (group['tokens'][0]['start'], group['tokens'][-1]['end'], max(group['scores']))
+        for group in aggregated_groups
+    )
+
+def mask_spans(spans: List[Tuple[int, int, float]], original_text: str) -> Tuple[str, List[Dict]]:
+    """
+    Replace merged spans with numbered placeholders in a single pass.
+    
+    Args:
+        spans: Non-overlapping (start, end, activation) tuples in reading order
         original_text: The complete original text
     
     Returns:
         Tuple of (masked_text, replacements)
     """
     replacements = []
-    redacted_counter = 1
-    masked_text = original_text
-    
-    # Sort groups by their position in the original text (start position)
-    sorted_groups = sorted(aggregated_groups, key=lambda g: g['tokens'][0]['start'])
+    parts = []
+    cursor = 0
     
-    # Process groups in reverse order to avoid position shifting
-    for group in reversed(sorted_groups):
-        # Get the text span for this group
-        start_pos = group['tokens'][0]['start']
-        end_pos = group['tokens'][-1]['end']
-        
-        # Extract the original text for this group
-        original_group_text = original_text[start_pos:end_pos]
-        
-        # Create placeholder
+    for redacted_counter, (start_pos, end_pos, activation) in enumerate(spans, start=1):
         placeholder = f"[PII_{redacted_counter}]"
         replacements.append({
-            'original': original_group_text,
+            'original': original_text[start_pos:end_pos],
             'placeholder': placeholder,
-            'activation': max(group['scores'])
+            'activation': activation,
+            'start': start_pos,
+            'end': end_pos
         })
         
-        # Replace in the masked text
-        masked_text = masked_text[:start_pos] + placeholder + masked_text[end_pos:]
-        
-        redacted_counter += 1
+        parts.append(original_text[cursor:start_pos])
+        parts.append(placeholder)
+        cursor = end_pos
     
-    return masked_text, replacements
+    parts.append(original_text[cursor:])
+    return ''.join(parts), replacements
+
+def mask_text_with_original(token_predictions: List[Dict], aggregated_groups: List[Dict], original_text: str) -> Tuple[str, List[Dict]]:
+    """
+    Mask the original text by replacing sensitive tokens with placeholders.
+    
+    Spans are merged and written out in a single pass, so the cost is linear in
+    the length of the text. Placeholders are numbered in reading order.
+    
+    Args:
+        token_predictions: List of token prediction dictionaries
+        aggregated_groups: List of aggregated token groups to mask
+        original_text: The complete original text
+    
+    Returns:
+        Tuple of (masked_text, replacements)
+    """
+    return mask_spans(merge_group_spans(aggregated_groups), original_text)
 
 def process_anonymization_results(token_results: List[Dict], original_text: str, threshold: float = 0.3) -> Dict:
     """
@@ -127,6 +264,30 @@ def process_anonymization_results(token_results: List[Dict], original_text: str,
         'original_text': original_text
     }
 
+def process_token_columns(columns: Dict[str, np.ndarray], original_text: str, threshold: float = 0.3) -> Dict:
+    """
+    Columnar counterpart of `process_anonymization_results`.
+    
+    Args:
+        columns: Token columns from `token_columns` or `columns_from_logits`
+        original_text: Original input text
+        threshold: Minimum score threshold for privacy detection
+    
+    Returns:
+        Dictionary containing masked_text and replacements
+    """
+    first, last, max_scores = aggregate_token_columns(
+        columns['scores'], columns['word_start'], columns['special'], threshold
+    )
+    spans = merge_spans(zip(columns['starts'][first].tolist(), columns['ends'][last].tolist(), max_scores.tolist()))
+    masked_text, replacements = mask_spans(spans, original_text)
+    
+    return {
+        'masked_text': masked_text,
+        'replacements': replacements,
+        'original_text': original_text
+    }
+
 def run_anonymization_pipeline(token_results: List[Dict], original_text: str = None) -> Dict:
     """
     Main pipeline function that processes token results and returns anonymized text.
@@ -155,19 +316,140 @@ def run_anonymization_pipeline(token_results: List[Dict], original_text: str = N
     
     return result
 
-def initialize_privacy_pipeline():
+def initialize_privacy_pipeline(model: str = DEFAULT_MODEL, device: Optional[str] = DEFAULT_DEVICE,
+                                backend: str = DEFAULT_BACKEND):
     """
     Initialize the privacy anonymization pipeline.
     
+    The pipeline comes from the shared model registry, so it is only loaded once
+    per process and later calls return the already warm instance.
+    
+    Args:
+        model: Model id of the token-classification model
+        device: Device to run the model on; by default transformers picks one (a GPU when available)
+        backend: Inference backend: 'transformers', 'int8' or 'onnx'
+    
     Returns:
         The initialized transformers pipeline
     """
     print("Initializing privacy anonymization pipeline...")
-    pipe = pipeline("token-classification", model="ai4privacy/llama-ai4privacy-english-anonymiser-openpii")
+    pipe = get_registry().get(model=model, device=device, backend=backend)
     print("Pipeline initialized successfully!")
     return pipe
 
-def anonymize_text(pipe, text: str, verbose: bool = True) -> Dict:
+def preload_privacy_pipeline(model: str = DEFAULT_MODEL, device: Optional[str] = DEFAULT_DEVICE,
+                             backend: str = DEFAULT_BACKEND) -> None:
+    """
+    Load the privacy model ahead of the first request.
+    
+    Call this at server start so the first message only pays inference time.
+    
+    Args:
+        model: Model id of the token-classification model
+        device: Device to run the model on; by default transformers picks one
+        backend: Inference backend: 'transformers', 'int8' or 'onnx'
+    """
+    get_registry().preload([(model, device)], backend=backend)
+
+def pipeline_model_id(pipe) -> str:
+    """Model id a pipeline was loaded from, used to key cached results."""
+    return getattr(getattr(pipe, 'model', None), 'name_or_path', None) or DEFAULT_MODEL
+
+def pipeline_backend(pipe) -> str:
+    """Inference backend a pipeline runs on, used to key cached results."""
+    return getattr(pipe, 'inference_backend', 'transformers')
+
+def ignored_label_ids(model) -> List[int]:
+    """Label ids the token-classification pipeline leaves out of its output (the 'O' label)."""
+    return [int(label_id) for label_id, label in model.config.id2label.items() if label == 'O']
+
+def model_max_tokens(pipe) -> int:
+    """Longest input the model accepts, in tokens including special tokens."""
+    limits = [getattr(pipe.tokenizer, 'model_max_length', None),
+              getattr(pipe.model.config, 'max_position_embeddings', None)]
+    # Tokenizers without a configured limit report a huge sentinel value
+    limits = [limit for limit in limits if limit and limit < 1_000_000]
+    return min(limits) if limits else 512
+
+def merge_window_columns(windows: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """
+    Combine the token columns of overlapping windows over the same text.
+    
+    Windows come from one tokenization of the whole text, so a token in an
+    overlap has the same offsets in every window that contains it. Each token is
+    kept once, ordered by position, with the highest score any window gave it;
+    a token flagged by only one of the windows is still kept.
+    
+    Args:
+        windows: Token columns for each window, with offsets into the full text
+    
+    Returns:
+        Token columns for the whole text
+    """
+    if len(windows) == 1:
+        return windows[0]
+    merged = {key: np.concatenate([window[key] for window in windows]) for key in windows[0]}
+    # Sort by position, highest score first among copies of the same token
+    order = np.lexsort((-merged['scores'], merged['ends'], merged['starts']))
+    merged = {key: values[order] for key, values in merged.items()}
+    first_copy = np.ones(len(order), dtype=bool)
+    first_copy[1:] = ((merged['starts'][1:] != merged['starts'][:-1])
+                      | (merged['ends'][1:] != merged['ends'][:-1]))
+    return {key: values[first_copy] for key, values in merged.items()}
+
+def predict_columns(pipe, texts: List[str], batch_size: int = 16, window_tokens: Optional[int] = None,
+                    overlap_tokens: Optional[int] = None) -> List[Dict[str, np.ndarray]]:
+    """
+    Run the privacy model over texts and return token columns for each one.
+
+    With a fast tokenizer the model is called directly on padded batches and the
+    columns are built from the logits by `columns_from_logits`, so no per-token
+    dictionaries are created. Texts longer than the model's context are split by
+    the tokenizer into overlapping token windows, whose offsets already point
+    into the full text, and the windows are combined by `merge_window_columns`.
+    Other tokenizers go through the pipeline instead, which truncates long texts.
+
+    Args:
+        pipe: The initialized transformers pipeline
+        texts: Texts to run through the model
+        batch_size: Number of texts, and of windows, per forward pass
+        window_tokens: Maximum window length in tokens including special tokens
+            (defaults to the model's limit)
+        overlap_tokens: Tokens shared by consecutive windows (defaults to a quarter of a window)
+
+    Returns:
+        List of token column dictionaries, one per input text
+    """
+    tokenizer = getattr(pipe, 'tokenizer', None)
+    if not getattr(tokenizer, 'is_fast', False):
+        return [token_columns(tokens) for tokens in pipe(list(texts), batch_size=batch_size)]
+
+    import torch
+    max_length = window_tokens or model_max_tokens(pipe)
+    if overlap_tokens is None:
+        overlap_tokens = (max_length - tokenizer.num_special_tokens_to_add()) // 4
+    ignore_ids = ignored_label_ids(pipe.model)
+    windows = [[] for _ in texts]
+    for text_start in range(0, len(texts), batch_size):
+        encoded = tokenizer(list(texts[text_start:text_start + batch_size]), return_tensors='pt', padding=True,
+                            truncation=True, max_length=max_length, stride=overlap_tokens,
+                            return_overflowing_tokens=True, return_offsets_mapping=True,
+                            return_special_tokens_mask=True)
+        sample_of_row = encoded.pop('overflow_to_sample_mapping').tolist()
+        offsets = encoded.pop('offset_mapping').numpy()
+        skip = encoded.pop('special_tokens_mask').numpy().astype(bool) | (encoded['attention_mask'].numpy() == 0)
+        for row_start in range(0, len(sample_of_row), batch_size):
+            rows = slice(row_start, row_start + batch_size)
+            with torch.no_grad():
+                output = pipe.model(**{name: tensor[rows].to(pipe.device) for name, tensor in encoded.items()})
+            logits = (output['logits'] if isinstance(output, dict) else output[0]).float().cpu().numpy()
+            for row, input_ids in enumerate(encoded['input_ids'][rows].tolist(), start=row_start):
+                tokens = tokenizer.convert_ids_to_tokens(input_ids)
+                windows[text_start + sample_of_row[row]].append(
+                    columns_from_logits(logits[row - row_start], offsets[row], tokens, ignore_ids, skip[row]))
+    return [merge_window_columns(text_windows) for text_windows in windows]
+
+def anonymize_text(pipe, text: str, verbose: bool = True, cache: Optional[AnonymizationCache] = None) -> Dict:
     """
     Anonymize a given text using the privacy pipeline.
     
@@ -175,6 +457,7 @@ def anonymize_text(pipe, text: str, verbose: bool = True) -> Dict:
         pipe: The initialized transformers pipeline
         text: Text to anonymize
         verbose: Whether to print detailed output
+        cache: Optional result cache; a hit skips inference entirely
     
     Returns:
         Dictionary containing anonymization results
@@ -182,23 +465,114 @@ def anonymize_text(pipe, text: str, verbose: bool = True) -> Dict:
     if verbose:
         print(f"Anonymizing text: {text}")
     
-    # Get token classification results
-    result = pipe(text)
-    
-    if verbose:
-        print("Raw token classification results:")
-        print(result)
-        print("\n" + "="*50)
+    if cache is not None:
+        cached = cache.get(text, pipeline_model_id(pipe), 0.3, pipeline_backend(pipe))
+        if cached is not None:
+            if verbose:
+                print(f"Cache hit, anonymized text: {cached['masked_text']}")
+            return cached
     
+    # Get token classification results as columns
+    columns = predict_columns(pipe, [text])[0]
+
     # Run the anonymization pipeline
-    anonymized_result = run_anonymization_pipeline(result, text)
-    
+    anonymized_result = process_token_columns(columns, text, threshold=0.3)
+
     if verbose:
-        print("="*50)
+        print(f"Detected {len(columns['scores'])} privacy tokens")
+        print("Replacements:")
+        for replacement in anonymized_result['replacements']:
+            print(f"  {replacement['original']} -> {replacement['placeholder']} (score: {replacement['activation']:.4f})")
         print(f"\nFinal anonymized text: {anonymized_result['masked_text']}")
     
+    if cache is not None:
+        cache.put(text, pipeline_model_id(pipe), 0.3, pipeline_backend(pipe), anonymized_result)
+    
     return anonymized_result
 
+def anonymize_batch(pipe, texts: List[str], batch_size: int = 16, threshold: float = 0.3,
+                    cache: Optional[AnonymizationCache] = None) -> List[Dict]:
+    """
+    Anonymize several texts with batched forward passes.
+    
+    Texts are sorted by length before batching so each batch pads to a similar
+    length, and results are returned in the original order.
+    
+    Args:
+        pipe: The initialized transformers pipeline
+        texts: Texts to anonymize
+        batch_size: Number of texts per forward pass
+        threshold: Minimum score threshold for privacy detection
+        cache: Optional result cache; only misses go through the model
+    
+    Returns:
+        List of anonymization result dictionaries, one per input text
+    """
+    results = [None] * len(texts)
+    model_id = pipeline_model_id(pipe) if cache is not None else None
+    backend = pipeline_backend(pipe)
+    pending = []
+    for i, text in enumerate(texts):
+        cached = cache.get(text, model_id, threshold, backend) if cache is not None else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+    
+    order = sorted(pending, key=lambda i: len(texts[i]))
+    sorted_texts = [texts[i] for i in order]
+    token_results = predict_columns(pipe, sorted_texts, batch_size=batch_size)
+
+    for i, columns in zip(order, token_results):
+        results[i] = process_token_columns(columns, texts[i], threshold)
+        if cache is not None:
+            cache.put(texts[i], model_id, threshold, backend, results[i])
+    return results
+
+def anonymize_long_text(pipe, text: str, window_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None,
+                        batch_size: int = 8, threshold: float = 0.3) -> Dict:
+    """
+    Anonymize a text longer than the model's context with overlapping token windows.
+    
+    `anonymize_text` and `anonymize_batch` already window long texts; this is for
+    callers that want to choose the window and overlap sizes.
+    
+    Args:
+        pipe: The initialized transformers pipeline
+        text: Text to anonymize
+        window_tokens: Maximum window length in tokens including special tokens
+        overlap_tokens: Tokens shared by consecutive windows
+        batch_size: Number of windows per forward pass
+        threshold: Minimum score threshold for privacy detection
+    
+    Returns:
+        Dictionary containing masked_text and replacements
+    """
+    columns = predict_columns(pipe, [text], batch_size=batch_size, window_tokens=window_tokens,
+                              overlap_tokens=overlap_tokens)[0]
+    return process_token_columns(columns, text, threshold)
+
+def start_micro_batcher(pipe, max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                        threshold: float = 0.3) -> MicroBatcher:
+    """
+    Start a background micro-batcher that groups concurrent anonymization calls.
+    
+    Args:
+        pipe: The initialized transformers pipeline
+        max_batch_size: Maximum number of texts per forward pass
+        max_wait_ms: How long to wait for more texts before running a batch
+        threshold: Minimum score threshold for privacy detection
+    
+    Returns:
+        A started MicroBatcher; call `.anonymize(text)` from any thread
+    """
+    def batch_fn(texts: List[str]) -> List[Dict]:
+        return anonymize_batch(pipe, texts, batch_size=max_batch_size, threshold=threshold)
+    
+    return MicroBatcher(batch_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms).start()
+
 def main():
     """
     Main function to demonstrate the privacy anonymization pipeline.
@@ -0,0 +1,196 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backends import DEFAULT_BACKEND, load_pipeline
+
+DEFAULT_TASK = "token-classification"
+DEFAULT_MODEL = "ai4privacy/llama-ai4privacy-english-anonymiser-openpii"
+# None lets transformers pick the device, so a GPU is used when one is available
+DEFAULT_DEVICE = None
+
+
+class ModelRegistry:
+    """
+    Thread-safe, process-wide cache of loaded pipelines keyed by (task, model, device, backend).
+
+    Models are loaded lazily on first use, kept in least-recently-used order and
+    evicted once more than `max_models` are loaded or once they have been idle
+    for longer than `idle_ttl` seconds. Idle models are evicted by a background
+    reaper thread, so memory is freed even when no further call comes in.
+    """
+
+    def __init__(self, max_models: int = 2, idle_ttl: Optional[float] = None,
+                 loader: Callable = load_pipeline):
+        """
+        Args:
+            max_models: Maximum number of pipelines kept loaded at once
+            idle_ttl: Seconds a pipeline may go unused before it is evicted (None disables)
+            loader: Callable (task, model, device, backend) -> pipeline
+        """
+        if max_models < 1:
+            raise ValueError("max_models must be at least 1")
+        self.max_models = max_models
+        self.idle_ttl = idle_ttl
+        self._loader = loader
+        self._entries: "OrderedDict[Tuple[str, str, str, str], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per key so concurrent callers wait for a single load instead of racing
+        self._load_locks: Dict[Tuple[str, str, str, str], threading.Lock] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def get(self, model: str = DEFAULT_MODEL, device: Optional[str] = DEFAULT_DEVICE, task: str = DEFAULT_TASK,
+            backend: str = DEFAULT_BACKEND):
+        """
+        Return the pipeline for (task, model, device, backend), loading it on first use.
+
+        Args:
+            model: Model id or path
+            device: Device to run on; None lets transformers choose
+            task: Transformers pipeline task
+            backend: Inference backend, see backends.BACKENDS
+
+        Returns:
+            The loaded pipeline
+        """
+        key = (task, model, device, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry['last_used'] = time.monotonic()
+                return entry['pipeline']
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry['last_used'] = time.monotonic()
+                    return entry['pipeline']
+
+            print(f"Loading {task} model {model} on {device or 'default device'} ({backend} backend)...")
+            started = time.perf_counter()
+            pipe = self._loader(task, model, device, backend)
+            print(f"Loaded {model} in {time.perf_counter() - started:.2f}s")
+
+            with self._lock:
+                self._entries[key] = {'pipeline': pipe, 'last_used': time.monotonic()}
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_models:
+                    evicted_key, _ = self._entries.popitem(last=False)
+                    print(f"Evicted model {evicted_key[1]} (LRU limit {self.max_models})")
+                self._start_reaper_locked()
+            return pipe
+
+    def _start_reaper_locked(self) -> None:
+        if self.idle_ttl is None or self._reaper is not None:
+            return
+        self._stop.clear()
+        self._reaper = threading.Thread(target=self._reap, name="privacy-model-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap(self) -> None:
+        # Checking a few times per TTL keeps a model from outliving it by much
+        interval = max(self.idle_ttl / 4, 0.01)
+        while not self._stop.wait(interval):
+            if self.evict_idle():
+                # Pipelines hold reference cycles; collect now so the weights are actually freed
+                gc.collect()
+
+    def preload(self, models: Optional[List[Tuple[str, Optional[str]]]] = None, task: str = DEFAULT_TASK,
+                backend: str = DEFAULT_BACKEND) -> None:
+        """
+        Warm up pipelines ahead of the first request, e.g. at server start.
+
+        Args:
+            models: List of (model, device) pairs; defaults to the privacy model on the default device
+            task: Transformers pipeline task
+            backend: Inference backend, see backends.BACKENDS
+        """
+        for model, device in models or [(DEFAULT_MODEL, DEFAULT_DEVICE)]:
+            self.get(model=model, device=device, task=task, backend=backend)
+
+    def evict_idle(self) -> int:
+        """Evict pipelines idle for longer than `idle_ttl`. Returns the number evicted."""
+        with self._lock:
+            return self._evict_idle_locked()
+
+    def _evict_idle_locked(self) -> int:
+        if self.idle_ttl is None:
+            return 0
+        cutoff = time.monotonic() - self.idle_ttl
+        stale = [key for key, entry in self._entries.items() if entry['last_used'] < cutoff]
+        for key in stale:
+            del self._entries[key]
+            print(f"Evicted idle model {key[1]}")
+        return len(stale)
+
+    def loaded(self) -> List[Tuple[str, str, str, str]]:
+        """Keys of the currently loaded pipelines, least recently used first."""
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self) -> None:
+        """Drop every loaded pipeline and stop the reaper thread."""
+        with self._lock:
+            self._entries.clear()
+            reaper, self._reaper = self._reaper, None
+            self._stop.set()
+        if reaper is not None and reaper is not threading.current_thread():
+            reaper.join()
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """
+    Return the process-wide registry, created on first use.
+
+    Limits can be configured with PRIVACY_MAX_MODELS and PRIVACY_MODEL_IDLE_TTL (seconds).
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                idle_ttl = os.getenv('PRIVACY_MODEL_IDLE_TTL')
+                _registry = ModelRegistry(
+                    max_models=int(os.getenv('PRIVACY_MAX_MODELS', '2')),
+                    idle_ttl=float(idle_ttl) if idle_ttl else None,
+                )
+    return _registry
+
+
+_preload_thread: Optional[threading.Thread] = None
+
+
+def preload_in_background(models: Optional[List[Tuple[str, Optional[str]]]] = None,
+                          backend: str = DEFAULT_BACKEND) -> threading.Thread:
+    """
+    Warm up pipelines on a daemon thread, once per process.
+
+    Meant to be called when a server starts, so the model is already loaded by the
+    time the first request arrives without delaying startup itself. Later calls
+    return the thread started by the first one.
+
+    Args:
+        models: List of (model, device) pairs; defaults to the privacy model on the default device
+        backend: Inference backend, see backends.BACKENDS
+    """
+    global _preload_thread
+    registry = get_registry()
+    with _registry_lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(target=registry.preload, args=(models,),
+                                               kwargs={'backend': backend}, name="privacy-model-preload",
+                                               daemon=True)
+            _preload_thread.start()
+        return _preload_thread
@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backends import DEFAULT_BACKEND
+from model_registry import DEFAULT_DEVICE, DEFAULT_MODEL, DEFAULT_TASK, get_registry
+
+# Set in each worker process by _init_worker
+_worker_pipe = None
+
+
+def _set_thread_budget(threads: int) -> None:
+    """Limit intra-op threads so workers don't oversubscribe the cores between them."""
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['MKL_NUM_THREADS'] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _load_from_registry(model: str, device: Optional[str], backend: str):
+    return get_registry().get(model=model, device=device, backend=backend)
+
+
+def _shared_weights(model: str, device: Optional[str], backend: str) -> Optional[Tuple]:
+    """
+    Load the pipeline in this process and move its weights into shared memory.
+
+    Returns:
+        (model module, tokenizer, backend) to hand to the workers, or None when the
+        weights can't be shared: torch is missing, the model isn't on the CPU, or the
+        backend isn't plain torch (int8 packed weights and ONNX sessions are loaded per worker)
+    """
+    if backend != 'transformers' or device not in (None, 'cpu'):
+        return None
+    try:
+        # Registers the reducers that pass shared tensors between processes as handles
+        import torch.multiprocessing  # noqa: F401
+    except ImportError:
+        return None
+    pipe = get_registry().get(model=model, device=device, backend=backend)
+    if pipe.device.type != 'cpu':
+        return None
+    pipe.model.share_memory()
+    return pipe.model, pipe.tokenizer, backend
+
+
+def _init_worker(loader: Callable, shared: Optional[Tuple], threads: int) -> None:
+    global _worker_pipe
+    # Spawned workers import `main` by name; another `main` earlier on the inherited
+    # sys.path (e.g. twilio/main.py) must not shadow the one next to this file
+    here = os.path.dirname(os.path.abspath(__file__))
+    if sys.path[:1] != [here]:
+        sys.path.insert(0, here)
+    _set_thread_budget(threads)
+    if shared is None:
+        _worker_pipe = loader()
+        return
+    # The module arrives as handles to the parent's shared tensors, so only the
+    # small pipeline wrapper is built here
+    from transformers import pipeline
+    model, tokenizer, backend = shared
+    _worker_pipe = pipeline(DEFAULT_TASK, model=model, tokenizer=tokenizer, device='cpu')
+    _worker_pipe.inference_backend = backend
+
+
+def _anonymize_chunk(texts: List[str], batch_size: int, threshold: float) -> List[Dict]:
+    from main import anonymize_batch
+    return anonymize_batch(_worker_pipe, texts, batch_size=batch_size, threshold=threshold)
+
+
+class AnonymizerPool:
+    """
+    Process pool that spreads anonymization across CPU cores.
+
+    Each worker holds one pipeline and a fixed intra-op thread budget. The model
+    is loaded once in the parent and its weights are moved to shared memory, so
+    the workers map the same pages instead of each loading a copy. Backends whose
+    weights can't be shared that way (int8, ONNX, or a model on the GPU) are
+    loaded by every worker. Workers are started with `forkserver` where the
+    platform has it and `spawn` otherwise: forking a parent that has already
+    started threads or initialized torch/OpenMP can deadlock the children.
+    """
+
+    def __init__(self, processes: Optional[int] = None, threads_per_worker: int = 1,
+                 model: str = DEFAULT_MODEL, device: Optional[str] = DEFAULT_DEVICE, backend: str = DEFAULT_BACKEND,
+                 start_method: Optional[str] = None, preload_in_parent: bool = False, share_weights: bool = True,
+                 loader: Optional[Callable] = None):
+        """
+        Args:
+            processes: Number of worker processes (defaults to the CPU count)
+            threads_per_worker: Intra-op threads each worker may use
+            model: Model id of the token-classification model
+            device: Device to run the model on
+            backend: Inference backend, see backends.BACKENDS
+            start_method: 'forkserver', 'spawn' or 'fork' (defaults to forkserver where available)
+            preload_in_parent: With 'fork' and unshared weights, load the model before forking so
+                workers share its pages copy-on-write. Only safe when the parent has not started any threads.
+            share_weights: Load the model in the parent and share its weights with the workers
+            loader: Picklable callable returning the pipeline inside each worker, replacing the
+                model registry (and weight sharing), e.g. for tests
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        # Held for the pool's lifetime so the shared storage outlives every worker
+        self._shared = None
+        if loader is None:
+            loader = partial(_load_from_registry, model, device, backend)
+            if share_weights:
+                self._shared = _shared_weights(model, device, backend)
+            if self._shared is None and preload_in_parent and start_method == 'fork':
+                get_registry().get(model=model, device=device, backend=backend)
+        context = multiprocessing.get_context(start_method)
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(loader, self._shared, threads_per_worker),
+        )
+
+    def anonymize_batch(self, texts: List[str], batch_size: int = 16, threshold: float = 0.3) -> List[Dict]:
+        """
+        Anonymize texts across the worker processes, returning results in input order.
+
+        Args:
+            texts: Texts to anonymize
+            batch_size: Number of texts per forward pass inside a worker
+            threshold: Minimum score threshold for privacy detection
+
+        Returns:
+            List of anonymization result dictionaries, one per input text
+        """
+        if not texts:
+            return []
+        # Deal texts out so every worker gets a similar mix of lengths
+        chunk_count = min(self.processes, len(texts))
+        chunks = [texts[i::chunk_count] for i in range(chunk_count)]
+        futures = [self._executor.submit(_anonymize_chunk, chunk, batch_size, threshold) for chunk in chunks]
+
+        results = [None] * len(texts)
+        for i, future in enumerate(futures):
+            results[i::chunk_count] = future.result()
+        return results
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "AnonymizerPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
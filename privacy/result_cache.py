@@ -0,0 +1,131 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def cache_key(text: str, model: str, threshold: float, backend: str) -> str:
+    """Content address of an anonymization result."""
+    digest = hashlib.sha256()
+    digest.update(model.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(backend.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(repr(float(threshold)).encode('ascii'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _rebuild(text: str, value: str) -> Dict:
+    """Turn a stored entry back into a full result, taking the originals from `text`."""
+    entry = json.loads(value)
+    return {
+        'masked_text': entry['masked_text'],
+        'replacements': [{'original': text[start:end], 'placeholder': placeholder, 'activation': activation,
+                          'start': start, 'end': end}
+                         for start, end, placeholder, activation in entry['spans']],
+        'original_text': text,
+    }
+
+
+class AnonymizationCache:
+    """
+    Two-tier cache of anonymization results keyed by hash(text, model, threshold, backend).
+
+    Only the masked text and the span offsets, placeholders and scores are stored,
+    never the original text or the detected PII; `get` rebuilds those from the text
+    it is asked about. The memory tier is an LRU bounded by the size of the
+    serialized entries. The optional disk tier is a sqlite file that survives
+    restarts; entries found there are promoted back into memory.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, db_path: Optional[str] = None):
+        """
+        Args:
+            max_bytes: Byte budget of the in-memory tier
+            db_path: Path of the sqlite file for the disk tier (None keeps the cache in memory only)
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS masked_results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+
+    def get(self, text: str, model: str, threshold: float, backend: str) -> Optional[Dict]:
+        """Return a new copy of the cached result for this text, or None on a miss."""
+        key = cache_key(text, model, threshold, backend)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _rebuild(text, value)
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM masked_results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._store_locked(key, row[0])
+                    self.disk_hits += 1
+                    return _rebuild(text, row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, model: str, threshold: float, backend: str, result: Dict) -> None:
+        """Store the masked form of a result in memory and, when enabled, on disk."""
+        key = cache_key(text, model, threshold, backend)
+        entry = {
+            'masked_text': result['masked_text'],
+            'spans': [[r['start'], r['end'], r['placeholder'], r['activation']] for r in result['replacements']],
+        }
+        # Pipeline scores are numpy floats, which json can't serialize directly
+        value = json.dumps(entry, ensure_ascii=False, default=float)
+        with self._lock:
+            self._store_locked(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO masked_results (key, value) VALUES (?, ?)", (key, value))
+                self._db.commit()
+
+    def _store_locked(self, key: str, value: str) -> None:
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous.encode('utf-8'))
+        self._entries[key] = value
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.encode('utf-8'))
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current memory usage."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def close(self) -> None:
+        """Close the disk tier."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
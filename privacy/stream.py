@@ -0,0 +1,196 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+def read_rows(path: str, file_format: str, skip: int = 0) -> Iterator[Dict]:
+    """
+    Lazily yield rows from a CSV or JSONL file.
+
+    Args:
+        path: Input file path
+        file_format: 'csv' or 'jsonl'
+        skip: Number of rows to skip (used when resuming)
+
+    Yields:
+        One dictionary per row
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        yield from islice(rows, skip, None)
+
+
+def read_fieldnames(path: str) -> List[str]:
+    """Column names from the header of a CSV file (empty for an empty file)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return csv.DictReader(f).fieldnames or []
+
+
+def batched(rows: Iterable[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    """Group an iterable of rows into lists of at most `batch_size`."""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def anonymize_rows(rows: Iterable[Dict], columns: List[str], anonymize_fn: Callable[[List[str]], List[Dict]],
+                   batch_size: int = 32) -> Iterator[List[Dict]]:
+    """
+    Anonymize the selected columns of each row, one batch at a time.
+
+    Args:
+        rows: Iterable of row dictionaries
+        columns: Column names to anonymize
+        anonymize_fn: Callable mapping a list of texts to anonymization results
+        batch_size: Number of rows per batch
+
+    Yields:
+        Lists of rows with the selected columns replaced by their masked text
+    """
+    for batch in batched(rows, batch_size):
+        texts = []
+        slots = []
+        for row_index, row in enumerate(batch):
+            for column in columns:
+                value = row.get(column)
+                if isinstance(value, str) and value:
+                    texts.append(value)
+                    slots.append((row_index, column))
+        results = anonymize_fn(texts) if texts else []
+        for (row_index, column), result in zip(slots, results):
+            batch[row_index][column] = result['masked_text']
+        yield batch
+
+
+def load_checkpoint(path: str) -> int:
+    """Return the number of rows already written according to the checkpoint file."""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f).get('rows_done', 0)
+
+
+def save_checkpoint(path: str, rows_done: int, output_bytes: int) -> None:
+    """Atomically record progress so a crashed run can resume."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'rows_done': rows_done, 'output_bytes': output_bytes}, f)
+    os.replace(tmp_path, path)
+
+
+def stream_anonymize_file(input_path: str, output_path: str, columns: List[str],
+                          anonymize_fn: Callable[[List[str]], List[Dict]], batch_size: int = 32,
+                          file_format: Optional[str] = None, checkpoint_path: Optional[str] = None,
+                          report_every: int = 1000) -> int:
+    """
+    Stream a CSV/JSONL file through the anonymizer and write results incrementally.
+
+    Progress is checkpointed after every batch. When a checkpoint exists the output
+    file is truncated back to the last checkpointed size and the run resumes from
+    the next unprocessed row.
+
+    Args:
+        input_path: Input CSV or JSONL file
+        output_path: Output file, written in the same format as the input
+        columns: Column names to anonymize
+        anonymize_fn: Callable mapping a list of texts to anonymization results
+        batch_size: Number of rows per batch
+        file_format: 'csv' or 'jsonl'; inferred from the input extension when omitted
+        checkpoint_path: Checkpoint file; defaults to `<output_path>.checkpoint`
+        report_every: Print throughput every this many rows
+
+    Returns:
+        Total number of rows written
+    """
+    file_format = file_format or ('jsonl' if input_path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+
+    rows_done = load_checkpoint(checkpoint_path)
+    if rows_done and os.path.exists(output_path):
+        with open(checkpoint_path) as f:
+            output_bytes = json.load(f).get('output_bytes', 0)
+        with open(output_path, 'r+b') as f:
+            f.truncate(output_bytes)
+        print(f"Resuming after {rows_done} rows")
+    else:
+        rows_done = 0
+
+    started = time.perf_counter()
+    rows_this_run = 0
+    next_report = report_every
+    # The output is written as bytes so out.tell() is a real byte offset to truncate back to
+    buffer = io.StringIO(newline='')
+    with open(output_path, 'ab' if rows_done else 'wb') as out:
+        writer = None
+        if file_format == 'csv':
+            writer = csv.DictWriter(buffer, fieldnames=read_fieldnames(input_path))
+            if not rows_done and writer.fieldnames:
+                writer.writeheader()
+        for batch in anonymize_rows(read_rows(input_path, file_format, skip=rows_done), columns,
+                                    anonymize_fn, batch_size):
+            if writer is not None:
+                writer.writerows(batch)
+            else:
+                for row in batch:
+                    buffer.write(json.dumps(row, ensure_ascii=False) + '\n')
+            out.write(buffer.getvalue().encode('utf-8'))
+            buffer.seek(0)
+            buffer.truncate()
+            out.flush()
+
+            rows_done += len(batch)
+            rows_this_run += len(batch)
+            save_checkpoint(checkpoint_path, rows_done, out.tell())
+
+            if rows_this_run >= next_report:
+                elapsed = time.perf_counter() - started
+                print(f"{rows_done} rows done ({rows_this_run / elapsed:.1f} rows/sec)")
+                next_report += report_every
+        # Anything still buffered is the header of a file without rows
+        out.write(buffer.getvalue().encode('utf-8'))
+
+    elapsed = time.perf_counter() - started
+    rate = rows_this_run / elapsed if elapsed > 0 else 0.0
+    print(f"Finished: {rows_done} rows written to {output_path} ({rate:.1f} rows/sec)")
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return rows_done
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Anonymize columns of a CSV or JSONL file in a streaming fashion.")
+    parser.add_argument('input', help="Input CSV or JSONL file")
+    parser.add_argument('output', help="Output file (same format as the input)")
+    parser.add_argument('--columns', nargs='+', required=True, help="Columns to anonymize")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (default: from extension)")
+    parser.add_argument('--batch-size', type=int, default=32, help="Rows per batch")
+    parser.add_argument('--threshold', type=float, default=0.3, help="Privacy score threshold")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: <output>.checkpoint)")
+    args = parser.parse_args(argv)
+
+    from main import anonymize_batch, initialize_privacy_pipeline
+
+    pipe = initialize_privacy_pipeline()
+
+    def anonymize_fn(texts: List[str]) -> List[Dict]:
+        return anonymize_batch(pipe, texts, batch_size=args.batch_size, threshold=args.threshold)
+
+    stream_anonymize_file(args.input, args.output, args.columns, anonymize_fn, batch_size=args.batch_size,
+                          file_format=args.format, checkpoint_path=args.checkpoint)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import random
+
+import numpy as np
+import pytest
+
+from main import (aggregate_privacy_tokens, aggregate_token_columns, columns_from_logits, process_anonymization_results,
+                  process_token_columns, softmax, token_columns)
+
+WORDS = ["alice", "smith", "lives", "in", "london", "and", "is", "unemployed", "x", "ab"]
+LABELS = ['O', 'B-NAME', 'I-NAME', 'B-CITY']
+
+
+def random_predictions(rng, n_tokens):
+    """Random pipeline-style token dictionaries over a text of matching length."""
+    tokens = []
+    pos = 0
+    for _ in range(n_tokens):
+        kind = rng.random()
+        if kind < 0.1:
+            tokens.append({'word': rng.choice(['[CLS]', '[SEP]']), 'score': rng.random(), 'start': pos, 'end': pos})
+            continue
+        piece = rng.choice(WORDS)
+        if kind < 0.6:
+            pos += 1
+            word = 'Ġ' + piece
+        else:
+            word = piece
+        tokens.append({'word': word, 'score': rng.random(), 'start': pos, 'end': pos + len(piece)})
+        pos += len(piece)
+    return 'x' * pos, tokens
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_columnar_aggregation_matches_loop(seed):
+    rng = random.Random(seed)
+    for _ in range(400):
+        text, tokens = random_predictions(rng, rng.randint(0, 40))
+        threshold = rng.choice([0.0, 0.3, 0.5, 0.9])
+
+        expected = [(g['indices'][0], g['indices'][-1], max(g['scores']))
+                    for g in aggregate_privacy_tokens(tokens, threshold)]
+        columns = token_columns(tokens)
+        first, last, max_scores = aggregate_token_columns(columns['scores'], columns['word_start'],
+                                                          columns['special'], threshold)
+
+        assert list(zip(first.tolist(), last.tolist(), max_scores.tolist())) == expected
+        assert process_token_columns(columns, text, threshold) == process_anonymization_results(tokens, text, threshold)
+
+
+def pipeline_tokens(logits, offsets, tokens, special):
+    """What the token-classification pipeline returns with no aggregation and 'O' ignored."""
+    output = []
+    for row, (start, end), word, is_special in zip(logits, offsets, tokens, special):
+        probabilities = softmax(list(row))
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        if is_special or LABELS[best] == 'O':
+            continue
+        output.append({'word': word, 'score': probabilities[best], 'start': start, 'end': end})
+    return output
+
+
+def test_columns_from_logits_matches_pipeline_output():
+    rng = np.random.default_rng(0)
+    text = "Alice Smith lives in South London"
+    tokens = ['[CLS]', 'Al', 'ice', 'ĠSmith', 'Ġlives', 'Ġin', 'ĠSouth', 'ĠLondon', '[SEP]', '[PAD]']
+    offsets = [(0, 0), (0, 2), (2, 5), (5, 11), (11, 17), (17, 20), (20, 26), (26, 33), (0, 0), (0, 0)]
+    special = [True, False, False, False, False, False, False, False, True, True]
+
+    for _ in range(50):
+        logits = rng.normal(scale=3.0, size=(len(tokens), len(LABELS)))
+        expected = pipeline_tokens(logits, offsets, tokens, special)
+        columns = columns_from_logits(logits, offsets, tokens, [0], np.array(special))
+
+        assert np.allclose(columns['scores'], token_columns(expected)['scores'])
+        for key in ('starts', 'ends', 'word_start', 'special'):
+            assert columns[key].tolist() == token_columns(expected)[key].tolist()
+        assert process_token_columns(columns, text) == process_anonymization_results(expected, text)
+
+
+def test_softmax_returns_a_list():
+    probabilities = softmax([1.0, 2.0, 3.0])
+
+    assert isinstance(probabilities, list)
+    assert sum(probabilities) == pytest.approx(1.0)
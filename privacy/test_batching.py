@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from batching import MicroBatcher
+
+
+class RecordingBatchFn:
+    def __init__(self, transform=str.upper):
+        self.batches = []
+        self.transform = transform
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return [self.transform(text) for text in texts]
+
+
+def test_concurrent_callers_share_one_batch_and_get_their_own_results():
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher(batch_fn, max_batch_size=16, max_wait_ms=200).start()
+    texts = [f"text {i}" for i in range(8)]
+    results = {}
+    start = threading.Barrier(len(texts))
+
+    def caller(text):
+        start.wait()
+        results[text] = batcher.anonymize(text, timeout=5)
+
+    threads = [threading.Thread(target=caller, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == {text: text.upper() for text in texts}
+    assert len(batch_fn.batches) == 1 and sorted(batch_fn.batches[0]) == sorted(texts)
+
+
+def test_results_follow_submission_order_across_batches():
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher(batch_fn, max_batch_size=3, max_wait_ms=50)
+    futures = [batcher.submit(f"t{i}") for i in range(7)]
+
+    assert [future.result(timeout=5) for future in futures] == [f"T{i}" for i in range(7)]
+    batcher.close()
+    assert [len(batch) for batch in batch_fn.batches] == [3, 3, 1]
+
+
+def test_short_batch_fails_every_caller():
+    batcher = MicroBatcher(lambda texts: texts[:-1], max_batch_size=4, max_wait_ms=100)
+    futures = [batcher.submit(f"t{i}") for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="2 results for 3 texts"):
+            future.result(timeout=5)
+    batcher.close()
+
+
+def test_batch_fn_error_reaches_every_caller_and_close_refuses_new_texts():
+    def fail(texts):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(fail, max_wait_ms=50)
+    futures = [batcher.submit("a"), batcher.submit("b")]
+    for future in futures:
+        with pytest.raises(ValueError, match="model failed"):
+            future.result(timeout=5)
+
+    batcher.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit("c")
@@ -0,0 +1,58 @@
+import argparse
+
+from benchmark import check_regressions, run_suite
+
+
+def record(seconds, peak_kb, stage='mask', chars=160):
+    return {'stage': stage, 'chars': chars, 'tokens': 10, 'seconds': seconds, 'peak_kb': peak_kb,
+            'retained_kb': 0}
+
+
+def test_small_memory_growth_is_ignored():
+    baseline = [record(0.01, 4.0)]
+
+    assert check_regressions([record(0.01, 12.0)], baseline) == []
+    assert len(check_regressions([record(0.01, 12.0)], baseline, min_delta_kb=1.0)) == 1
+
+
+def test_large_memory_growth_regresses():
+    regressions = check_regressions([record(0.01, 2048.0)], [record(0.01, 1024.0)])
+
+    assert len(regressions) == 1 and 'peak memory' in regressions[0]
+
+
+def test_slowdown_needs_both_tolerance_and_min_delta():
+    baseline = [record(0.0001, 1.0)]
+
+    assert check_regressions([record(0.0003, 1.0)], baseline) == []
+    assert len(check_regressions([record(0.0100, 1.0)], baseline)) == 1
+
+
+def suite_args(tmp_path, update_baseline=False):
+    return argparse.Namespace(sizes=[160], repeat=1, profile=None, profile_dir=str(tmp_path), model=False,
+                              backend=None, output=None, baseline=str(tmp_path / 'baseline.json'),
+                              update_baseline=update_baseline, tolerance=0.5, min_delta_ms=0.5,
+                              min_delta_kb=64.0)
+
+
+def test_missing_baseline_fails_until_one_is_saved(tmp_path, capsys):
+    assert run_suite(suite_args(tmp_path)) == 2
+    assert 'no baseline' in capsys.readouterr().err
+
+    assert run_suite(suite_args(tmp_path, update_baseline=True)) == 0
+    assert (tmp_path / 'baseline.json').exists()
+
+
+def test_postprocess_stage_times_the_columnar_path(monkeypatch):
+    import benchmark
+
+    calls = []
+    monkeypatch.setattr(benchmark, 'process_token_columns', lambda columns, text: calls.append('columns'))
+    monkeypatch.setattr(benchmark, 'process_anonymization_results', lambda tokens, text: calls.append('dicts'))
+
+    records = benchmark.bench_stages([160], repeat=1)
+
+    assert [r['stage'] for r in records] == ['aggregation', 'columnar_aggregation', 'masking', 'postprocess',
+                                             'dict_postprocess']
+    # One timed run and one memory run per stage
+    assert calls == ['columns', 'columns', 'dicts', 'dicts']
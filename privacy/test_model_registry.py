@@ -0,0 +1,49 @@
+import time
+
+from model_registry import ModelRegistry
+
+
+class CountingLoader:
+    def __init__(self):
+        self.loads = []
+
+    def __call__(self, task, model, device, backend):
+        self.loads.append((model, device))
+        return object()
+
+
+def test_idle_model_is_evicted_without_another_call():
+    loader = CountingLoader()
+    registry = ModelRegistry(idle_ttl=0.1, loader=loader)
+    registry.get("model-a")
+
+    deadline = time.monotonic() + 2
+    while registry.loaded() and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert registry.loaded() == []
+    registry.clear()
+
+
+def test_model_in_use_is_not_reloaded():
+    loader = CountingLoader()
+    registry = ModelRegistry(idle_ttl=0.3, loader=loader)
+
+    first = registry.get("model-a")
+    for _ in range(5):
+        time.sleep(0.1)
+        assert registry.get("model-a") is first
+
+    assert loader.loads == [("model-a", None)]
+    registry.clear()
+
+
+def test_least_recently_used_model_is_evicted_beyond_the_limit():
+    loader = CountingLoader()
+    registry = ModelRegistry(max_models=2, loader=loader)
+    registry.get("model-a")
+    registry.get("model-b")
+    registry.get("model-a")
+    registry.get("model-c")
+
+    assert [key[1] for key in registry.loaded()] == ["model-a", "model-c"]
@@ -0,0 +1,31 @@
+from pool import AnonymizerPool
+
+
+class StubPipeline:
+    """Pipeline stand-in that tags the first word of every text as a name."""
+
+    def __call__(self, texts, batch_size=16):
+        outputs = []
+        for text in texts:
+            word = text.split(' ')[0]
+            outputs.append([{'word': 'Ġ' + word, 'score': 0.9, 'start': 0, 'end': len(word)}] if word else [])
+        return outputs
+
+
+def load_stub():
+    return StubPipeline()
+
+
+def test_pool_returns_worker_results_in_input_order():
+    # Imported here: workers import this module to unpickle load_stub, before they fix sys.path
+    from main import anonymize_batch
+
+    texts = [f"Person{i} lives at number {i}" for i in range(23)] + ["", "Alice"]
+
+    with AnonymizerPool(processes=3, loader=load_stub) as pool:
+        results = pool.anonymize_batch(texts, batch_size=4)
+
+    assert results == anonymize_batch(StubPipeline(), texts, batch_size=4)
+    assert [result['original_text'] for result in results] == texts
+    assert all(not result['masked_text'].startswith(f"Person{i}") for i, result in enumerate(results[:23]))
+    assert pool.anonymize_batch([]) == []
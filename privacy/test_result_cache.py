@@ -0,0 +1,55 @@
+from main import process_token_columns, token_columns
+from result_cache import AnonymizationCache
+
+TEXT = "Alice lives in London"
+MODEL = "test-model"
+
+
+def result_for(text):
+    tokens = [
+        {'word': 'Alice', 'score': 0.9, 'start': 0, 'end': 5},
+        {'word': 'ĠLondon', 'score': 0.8, 'start': 15, 'end': 21},
+    ]
+    return process_token_columns(token_columns(tokens), text)
+
+
+def test_hit_rebuilds_originals_from_the_text(tmp_path):
+    cache = AnonymizationCache(db_path=str(tmp_path / "cache.db"))
+    result = result_for(TEXT)
+    cache.put(TEXT, MODEL, 0.3, 'transformers', result)
+
+    assert cache.get(TEXT, MODEL, 0.3, 'transformers') == result
+    cache.close()
+
+    reopened = AnonymizationCache(db_path=str(tmp_path / "cache.db"))
+    assert reopened.get(TEXT, MODEL, 0.3, 'transformers') == result
+    reopened.close()
+
+
+def test_original_text_is_never_stored(tmp_path):
+    db_path = tmp_path / "cache.db"
+    cache = AnonymizationCache(db_path=str(db_path))
+    cache.put(TEXT, MODEL, 0.3, 'transformers', result_for(TEXT))
+    cache.close()
+
+    stored = b"".join(path.read_bytes() for path in tmp_path.iterdir())
+    assert b"Alice" not in stored
+    assert b"London" not in stored
+    assert all("Alice" not in value for value in cache._entries.values())
+
+
+def test_get_returns_a_copy():
+    cache = AnonymizationCache()
+    cache.put(TEXT, MODEL, 0.3, 'transformers', result_for(TEXT))
+
+    first = cache.get(TEXT, MODEL, 0.3, 'transformers')
+    first['replacements'].clear()
+
+    assert len(cache.get(TEXT, MODEL, 0.3, 'transformers')['replacements']) == 2
+
+
+def test_backend_is_part_of_the_key():
+    cache = AnonymizationCache()
+    cache.put(TEXT, MODEL, 0.3, 'transformers', result_for(TEXT))
+
+    assert cache.get(TEXT, MODEL, 0.3, 'int8') is None
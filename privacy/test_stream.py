@@ -0,0 +1,42 @@
+import json
+
+from stream import stream_anonymize_file
+
+
+def mask_all(texts):
+    return [{'masked_text': '[PII_1]'} for _ in texts]
+
+
+def test_header_only_csv_keeps_its_header(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("name,note\n", encoding='utf-8')
+    output = tmp_path / "out.csv"
+
+    assert stream_anonymize_file(str(source), str(output), ['name'], mask_all) == 0
+    assert output.read_bytes() == b"name,note\r\n"
+    assert not (tmp_path / "out.csv.checkpoint").exists()
+
+
+def test_empty_jsonl_writes_an_empty_file(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text("", encoding='utf-8')
+    output = tmp_path / "out.jsonl"
+
+    assert stream_anonymize_file(str(source), str(output), ['name'], mask_all) == 0
+    assert output.read_bytes() == b""
+
+
+def test_resume_truncates_to_the_checkpointed_byte_offset(tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text("".join(json.dumps({'name': name}) + "\n" for name in ["Zoë", "Renée", "Ana"]),
+                      encoding='utf-8')
+    output = tmp_path / "out.jsonl"
+    first_row = json.dumps({'name': '[PII_1]'}, ensure_ascii=False) + "\n"
+    # One row written and checkpointed, followed by a partial write from a crashed batch
+    output.write_bytes(first_row.encode('utf-8') + b'{"name": "Ren')
+    checkpoint = tmp_path / "out.jsonl.checkpoint"
+    checkpoint.write_text(json.dumps({'rows_done': 1, 'output_bytes': len(first_row.encode('utf-8'))}))
+
+    assert stream_anonymize_file(str(source), str(output), ['name'], mask_all, batch_size=1) == 3
+    assert output.read_text(encoding='utf-8') == first_row * 3
+    assert not checkpoint.exists()
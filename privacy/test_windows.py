@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from main import merge_window_columns, model_max_tokens, process_token_columns, token_columns
+
+TEXT = "Alice Smith lives in South London with Bob"
+TOKENS = [
+    {'word': 'Al', 'score': 0.9, 'start': 0, 'end': 2},
+    {'word': 'ice', 'score': 0.8, 'start': 2, 'end': 5},
+    {'word': 'ĠSmith', 'score': 0.7, 'start': 5, 'end': 11},
+    {'word': 'ĠSouth', 'score': 0.6, 'start': 20, 'end': 26},
+    {'word': 'ĠLondon', 'score': 0.5, 'start': 26, 'end': 33},
+    {'word': 'ĠBob', 'score': 0.95, 'start': 38, 'end': 42},
+]
+
+
+def with_scores(tokens, scores):
+    return [dict(token, score=score) for token, score in zip(tokens, scores)]
+
+
+def test_single_window_is_returned_unchanged():
+    columns = token_columns(TOKENS)
+
+    assert merge_window_columns([columns]) is columns
+
+
+def test_overlapping_windows_keep_each_token_once_with_its_highest_score():
+    first = token_columns(with_scores(TOKENS[:5], [0.9, 0.8, 0.7, 0.2, 0.5]))
+    second = token_columns(with_scores(TOKENS[2:], [0.4, 0.6, 0.1, 0.95]))
+
+    merged = merge_window_columns([first, second])
+
+    assert merged['starts'].tolist() == [token['start'] for token in TOKENS]
+    assert np.allclose(merged['scores'], [0.9, 0.8, 0.7, 0.6, 0.5, 0.95])
+    assert process_token_columns(merged, TEXT) == process_token_columns(token_columns(TOKENS), TEXT)
+
+
+def test_token_flagged_by_one_window_only_is_kept():
+    first = token_columns(TOKENS[:3])
+    second = token_columns(TOKENS[3:])
+
+    merged = merge_window_columns([second, first])
+
+    assert merged['starts'].tolist() == [token['start'] for token in TOKENS]
+
+
+def test_model_max_tokens_ignores_the_unset_tokenizer_sentinel():
+    def pipe(model_max_length, max_position_embeddings):
+        return SimpleNamespace(tokenizer=SimpleNamespace(model_max_length=model_max_length),
+                               model=SimpleNamespace(config=SimpleNamespace(
+                                   max_position_embeddings=max_position_embeddings)))
+
+    assert model_max_tokens(pipe(512, 514)) == 512
+    assert model_max_tokens(pipe(int(1e30), 8192)) == 8192
+    assert model_max_tokens(pipe(int(1e30), None)) == 512
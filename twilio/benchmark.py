@@ -0,0 +1,368 @@
+"""
+Benchmarks for the Twilio bot.
+
+    python benchmark.py parser                      # synthetic payloads of several sizes
+    python benchmark.py parser --payload run.json   # a response recorded from the RAG flow
+    python benchmark.py replay --rate 20 --requests 500 --output replay.json
+    python benchmark.py replay --questions ../eval/test_small.csv --langflow-latency 2.0 --stream
+
+`replay` runs the bot in-process against a fake Langflow endpoint and a fake
+Twilio client, POSTs questions to /webhook at the given arrival rate and
+measures until every reply has been sent. The bot runs with its production
+configuration (environment variables or main.py defaults) except where a flag
+overrides it; the effective settings are printed and included in the report.
+
+Record a real payload with:
+
+    curl -s -X POST http://127.0.0.1:7860/api/v1/run/<flow-id> \\
+         -H 'Content-Type: application/json' \\
+         -d '{"input_value": "What is Universal Credit?", "output_type": "chat", "input_type": "chat"}' > run.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from response_parser import ResponseExtractor, ijson, orjson
+from stubs import FakeLangflowServer, FakeTwilioClient, langflow_response
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "eval", "test.csv")
+APOLOGY_PREFIX = "Sorry, I'm having trouble"
+
+ANSWER = ("Universal Credit is a payment to help with your living costs. You may be able to get it if "
+          "you're on a low income, out of work or you cannot work. https://www.citizensadvice.org.uk/benefits/")
+
+
+def synthetic_payload(target_bytes):
+    """
+    A run response padded with log and document records until it reaches `target_bytes`,
+    mimicking the intermediate outputs a RAG flow returns alongside the answer.
+    """
+    response = langflow_response(ANSWER)
+    item = response["outputs"][0]["outputs"][0]
+    records = item["logs"].setdefault("documents", [])
+    record = {"text": "Citizens Advice page chunk. " * 30, "source": "https://www.citizensadvice.org.uk/benefits/",
+              "metadata": {"score": 0.81, "chunk": 0, "title": "Benefits"}}
+    record_size = len(json.dumps(record))
+    for i in range(max(0, target_bytes // record_size)):
+        records.append(dict(record, metadata=dict(record["metadata"], chunk=i)))
+    return json.dumps(response).encode()
+
+
+def legacy_parse(response_text):
+    """The original parse_api_response lookup: full json.loads, then walk the structure."""
+    response_data = json.loads(response_text)
+    message = response_data["outputs"][0]["outputs"][0]["results"]["message"]
+    return (message.get('text') or
+            message.get('data', {}).get('text') or
+            message.get('artifacts', {}).get('message') or
+            message.get('outputs', {}).get('message', {}).get('message')).strip()
+
+
+def time_call(fn, payload, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(payload)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_parser(payloads, repeat=5):
+    """
+    Time the legacy parser against each available extractor backend.
+
+    Args:
+        payloads: List of (label, payload bytes)
+        repeat: Runs per payload; the fastest is reported
+
+    Returns:
+        List of {'payload', 'bytes', '<backend>_ms', ...} records
+    """
+    backends = ["json"] + (["orjson"] if orjson is not None else []) + (["ijson"] if ijson is not None else []) + ["auto"]
+    records = []
+    for label, payload in payloads:
+        record = {"payload": label, "bytes": len(payload),
+                  "legacy_ms": time_call(legacy_parse, payload, repeat) * 1000}
+        for backend in backends:
+            extractor = ResponseExtractor(backend)
+            record[f"{backend}_ms"] = time_call(lambda p: extractor.extract(p, "bench"), payload, repeat) * 1000
+        records.append(record)
+    return records
+
+
+def load_questions(path, column="user_question"):
+    """
+    Questions to replay: a CSV with `column`, a JSONL log with a `Body` (or `message`)
+    field per line, or a text file with one message per line.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            return [row[column] for row in csv.DictReader(f) if row.get(column)]
+        if path.endswith((".jsonl", ".json")):
+            records = (json.loads(line) for line in f if line.strip())
+            return [record.get("Body") or record.get("message") for record in records
+                    if record.get("Body") or record.get("message")]
+        return [line.strip() for line in f if line.strip()]
+
+
+def arrival_offsets(count, rate, pattern="poisson", seed=0):
+    """Send times in seconds from the start for `count` messages arriving at `rate` per second."""
+    rng = random.Random(seed)
+    offsets, t = [], 0.0
+    for _ in range(count):
+        offsets.append(t)
+        t += rng.expovariate(rate) if pattern == "poisson" else 1.0 / rate
+    return offsets
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    samples = sorted(samples)
+
+    def pick(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": samples[-1],
+            "mean": sum(samples) / len(samples)}
+
+
+def replay(questions, rate=10.0, requests=100, arrival="poisson", langflow_latency=0.5, padding_bytes=0,
+           token_delay=0.0, twilio_latency=0.05, coalesce_window=None, stream=None, cache=None,
+           workers=None, sms_rate=None, sms_burst=None, max_queued=None, timeout=120.0, seed=0):
+    """
+    Replay questions against the webhook with everything but our own code faked out.
+
+    Each message comes from its own phone number, so end-to-end latency runs from
+    the webhook POST to the last SMS sent to that number. Bot settings left as
+    None keep their production value.
+
+    Returns:
+        Report dict with config, throughput, latency percentiles, error rate and
+        a per-stage time breakdown taken from the bot's own metrics
+    """
+    langflow = FakeLangflowServer(latency=langflow_latency, padding_bytes=padding_bytes, token_delay=token_delay,
+                                  answer=ANSWER).start()
+    # main.py reads its configuration from the environment at import time
+    os.environ.update({
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": "replay",
+        "TWILIO_PHONE_NUMBER": "+15550000000",
+        "LANGFLOW_API_URL": langflow.url,
+        "MESSAGE_STORE_PATH": ":memory:",
+        "SESSION_STORE_PATH": ":memory:",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    })
+    overrides = {
+        "WORKER_COUNT": workers,
+        "MAX_QUEUED_MESSAGES": max_queued,
+        "COALESCE_WINDOW": coalesce_window,
+        "STREAM_RESPONSES": None if stream is None else ("true" if stream else "false"),
+        "RESPONSE_CACHE": None if cache is None else ("true" if cache else "false"),
+        "SMS_RATE_PER_SECOND": sms_rate,
+        "SMS_BURST": sms_burst,
+    }
+    os.environ.update({name: str(value) for name, value in overrides.items() if value is not None})
+    import requests as http
+    from werkzeug.serving import make_server
+    import main as bot
+
+    effective = {
+        "workers": bot.WORKER_COUNT,
+        "max_queued": bot.MAX_QUEUED_MESSAGES,
+        "coalesce_window": bot.sessions.coalesce_window,
+        "stream": bot.STREAM_RESPONSES,
+        "cache": bot.RESPONSE_CACHE_ENABLED,
+        "sms_rate": bot.dispatcher.rate,
+        "sms_burst": bot.dispatcher.burst,
+        "sending_numbers": len(bot.dispatcher.number_pool) or 1,
+    }
+
+    fake_twilio = FakeTwilioClient(latency=twilio_latency)
+    bot.dispatcher.client = fake_twilio
+    server = make_server("127.0.0.1", 0, bot.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    webhook_url = f"http://127.0.0.1:{server.server_port}/webhook"
+
+    sent_at, statuses = {}, {}
+    session = http.Session()
+    session.mount("http://", http.adapters.HTTPAdapter(pool_maxsize=64))
+
+    def post(index, sender, body):
+        sent_at[sender] = time.time()
+        try:
+            response = session.post(webhook_url, data={"From": sender, "Body": body, "To": "+15550000000"},
+                                    timeout=30)
+            statuses[sender] = "busy" if response.ok and "<Message>" in response.text else response.status_code
+        except http.exceptions.RequestException as e:
+            statuses[sender] = type(e).__name__
+
+    offsets = arrival_offsets(requests, rate, arrival, seed)
+    senders = [f"+1555{i:07d}" for i in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=64) as executor:
+        for index, (offset, sender) in enumerate(zip(offsets, senders)):
+            delay = offset - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(post, index, sender, questions[index % len(questions)])
+    send_seconds = time.perf_counter() - started
+
+    # Wait for every accepted message to get its reply (or the timeout)
+    expected = {s for s in senders if statuses.get(s) == 200}
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        replied = {m["to"] for m in list(fake_twilio.messages.sent)}
+        if expected <= replied and bot.dispatcher.depth == 0 and bot.job_queue.in_flight == 0:
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    first_reply, last_reply, apologies = {}, {}, set()
+    for message in list(fake_twilio.messages.sent):
+        to = message["to"]
+        first_reply.setdefault(to, message["time"])
+        last_reply[to] = message["time"]
+        if message["body"].startswith(APOLOGY_PREFIX):
+            apologies.add(to)
+    completed = [s for s in expected if s in last_reply and s not in apologies]
+    end_to_end = [last_reply[s] - sent_at[s] for s in completed]
+    first_sms = [first_reply[s] - sent_at[s] for s in completed]
+
+    def stage(histogram):
+        count, total = histogram.totals()
+        return {"count": count, "total_seconds": total, "mean_seconds": total / count if count else None}
+
+    from dispatcher import TWILIO_SEND_SECONDS
+    breakdown = {
+        "webhook": stage(bot.WEBHOOK_SECONDS),
+        "processing": stage(bot.MESSAGE_SECONDS),
+        "langflow": stage(bot.LANGFLOW_SECONDS),
+        "parse": stage(bot.PARSE_SECONDS),
+        "twilio_send": stage(TWILIO_SEND_SECONDS),
+    }
+    # Whatever is not processing or sending was spent queued (job queue, coalescing, outbound queue)
+    if end_to_end and breakdown["processing"]["count"]:
+        breakdown["queued_mean_seconds"] = max(0.0, sum(end_to_end) / len(end_to_end)
+                                               - breakdown["processing"]["mean_seconds"])
+
+    rejected = sum(1 for s in senders if statuses.get(s) == "busy")
+    failed = sum(1 for s in senders if statuses.get(s) not in (200, "busy"))
+    unanswered = len(expected - set(last_reply))
+    errors = rejected + failed + unanswered + len(apologies & expected)
+
+    server.shutdown()
+    langflow.stop()
+    return {
+        "config": {"requests": requests, "rate": rate, "arrival": arrival, "questions": len(questions),
+                   "langflow_latency": langflow_latency, "padding_bytes": padding_bytes, "token_delay": token_delay,
+                   "twilio_latency": twilio_latency, "python": sys.version.split()[0], **effective},
+        "elapsed_seconds": elapsed,
+        "offered_rate": requests / send_seconds if send_seconds else None,
+        "throughput": len(completed) / elapsed if elapsed else None,
+        "completed": len(completed),
+        "rejected_busy": rejected,
+        "webhook_failures": failed,
+        "unanswered": unanswered,
+        "apologies": len(apologies & expected),
+        "error_rate": errors / requests if requests else 0.0,
+        "end_to_end_seconds": percentiles(end_to_end),
+        "first_sms_seconds": percentiles(first_sms),
+        "breakdown": breakdown,
+        "errors_by_kind": {kind: value for (kind,), value in bot.ERRORS.values().items()},
+        "response_cache": bot.response_cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the Twilio bot.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    parse_cmd = subcommands.add_parser("parser", help="Time response extraction")
+    parse_cmd.add_argument("--payload", action="append", help="Recorded run response (repeatable)")
+    parse_cmd.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 5_000_000],
+                           help="Synthetic payload sizes in bytes")
+    parse_cmd.add_argument("--repeat", type=int, default=5)
+
+    replay_cmd = subcommands.add_parser("replay", help="Replay questions against /webhook with fake Langflow and Twilio")
+    replay_cmd.add_argument("--questions", default=DEFAULT_QUESTIONS,
+                            help="CSV (user_question column), JSONL log with Body, or text file")
+    replay_cmd.add_argument("--column", default="user_question", help="CSV column holding the question")
+    replay_cmd.add_argument("--rate", type=float, default=10.0, help="Messages per second")
+    replay_cmd.add_argument("--requests", type=int, default=100, help="Messages to send (questions are cycled)")
+    replay_cmd.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    replay_cmd.add_argument("--langflow-latency", type=float, default=0.5, help="Seconds the fake flow takes")
+    replay_cmd.add_argument("--padding", type=int, default=0, help="Extra bytes in each run response")
+    replay_cmd.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed words")
+    replay_cmd.add_argument("--twilio-latency", type=float, default=0.05, help="Seconds per fake Twilio send")
+    # Bot settings: left unset, the bot uses its production configuration
+    replay_cmd.add_argument("--coalesce-window", type=float, help="Override COALESCE_WINDOW")
+    replay_cmd.add_argument("--workers", type=int, help="Override WORKER_COUNT")
+    replay_cmd.add_argument("--max-queued", type=int, help="Override MAX_QUEUED_MESSAGES")
+    replay_cmd.add_argument("--sms-rate", type=float, help="Override SMS_RATE_PER_SECOND")
+    replay_cmd.add_argument("--sms-burst", type=int, help="Override SMS_BURST")
+    replay_cmd.add_argument("--stream", action=argparse.BooleanOptionalAction,
+                            help="Override STREAM_RESPONSES")
+    replay_cmd.add_argument("--cache", action=argparse.BooleanOptionalAction,
+                            help="Override RESPONSE_CACHE (cycled questions make hits unrealistically common)")
+    replay_cmd.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for outstanding replies")
+    replay_cmd.add_argument("--seed", type=int, default=0)
+    replay_cmd.add_argument("--output", help="Write the report as JSON to this file")
+
+    args = parser.parse_args()
+
+    if args.command == "parser":
+        if args.payload:
+            payloads = []
+            for path in args.payload:
+                with open(path, "rb") as f:
+                    payloads.append((path, f.read()))
+        else:
+            payloads = [(f"synthetic-{size}", synthetic_payload(size)) for size in args.sizes]
+        records = bench_parser(payloads, args.repeat)
+        columns = [key for key in records[0] if key.endswith("_ms")]
+        print(f"{'payload':>20} {'bytes':>10} " + " ".join(f"{c:>12}" for c in columns))
+        for record in records:
+            print(f"{record['payload'][-20:]:>20} {record['bytes']:>10} " +
+                  " ".join(f"{record[c]:>12.2f}" for c in columns))
+
+    elif args.command == "replay":
+        report = replay(
+            load_questions(args.questions, args.column),
+            rate=args.rate, requests=args.requests, arrival=args.arrival,
+            langflow_latency=args.langflow_latency, padding_bytes=args.padding, token_delay=args.token_delay,
+            twilio_latency=args.twilio_latency, coalesce_window=args.coalesce_window, stream=args.stream,
+            cache=args.cache, workers=args.workers, sms_rate=args.sms_rate, sms_burst=args.sms_burst,
+            max_queued=args.max_queued, timeout=args.timeout, seed=args.seed,
+        )
+        config = report["config"]
+        print("Bot config: " + ", ".join(f"{key}={config[key]}" for key in (
+            "workers", "max_queued", "coalesce_window", "stream", "cache", "sms_rate", "sms_burst",
+            "sending_numbers")))
+        if config["cache"] and args.requests > config["questions"]:
+            print(f"Note: {config['questions']} questions are cycled over {args.requests} requests, "
+                  f"so the response cache hits far more often than in production")
+        latency = report["end_to_end_seconds"]
+        print(f"Completed {report['completed']}/{args.requests} in {report['elapsed_seconds']:.1f}s "
+              f"({report['throughput']:.1f} msg/s), error rate {report['error_rate']:.1%}")
+        if latency:
+            print(f"End-to-end p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  p99 {latency['p99']:.3f}s")
+        for name, stage in report["breakdown"].items():
+            if isinstance(stage, dict) and stage["count"]:
+                print(f"  {name:<12} {stage['mean_seconds'] * 1000:>9.1f} ms mean over {stage['count']} calls")
+        if "queued_mean_seconds" in report["breakdown"]:
+            print(f"  {'queued':<12} {report['breakdown']['queued_mean_seconds'] * 1000:>9.1f} ms mean")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
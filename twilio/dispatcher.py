@@ -0,0 +1,295 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from langflow_client import backoff_delay
+from log_config import mask_phone
+from metrics import REGISTRY
+from sms_segments import SmsSegmenter
+
+logger = logging.getLogger(__name__)
+
+TWILIO_SEND_SECONDS = REGISTRY.histogram("twilio_send_seconds", "Time per Twilio Messages API call",
+                                         labelnames=("outcome",))
+TWILIO_SEND_FAILURES = REGISTRY.counter("twilio_send_failures_total",
+                                        "Messages given up on after retries")
+
+# Twilio rejects message bodies longer than this
+MAX_BODY_CHARS = 1600
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def split_body(body, max_chars=MAX_BODY_CHARS):
+    """Split a reply that exceeds Twilio's body limit into several messages at sentence boundaries."""
+    if len(body) <= max_chars:
+        return [body]
+    segmenter = SmsSegmenter(gsm_limit=max_chars, ucs2_limit=max_chars)
+    return segmenter.feed(body) + segmenter.flush()
+
+
+class TokenBucket:
+    """Allows `rate` sends per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class MessageStore:
+    """Compact sqlite record of sent messages and their delivery status."""
+
+    def __init__(self, path=":memory:"):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " sid TEXT PRIMARY KEY, to_number TEXT, from_number TEXT, status TEXT,"
+                " error TEXT, attempts INTEGER, created REAL, updated REAL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS failures ("
+                " to_number TEXT, from_number TEXT, error TEXT, attempts INTEGER, created REAL)"
+            )
+            self._db.commit()
+
+    def record_sent(self, sid, to, from_, attempts):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, 'queued', NULL, ?, ?, ?)",
+                             (sid, to, from_, attempts, now, now))
+            self._db.commit()
+
+    def record_failure(self, to, from_, error, attempts):
+        with self._lock:
+            self._db.execute("INSERT INTO failures VALUES (?, ?, ?, ?, ?)", (to, from_, error, attempts, time.time()))
+            self._db.commit()
+
+    def update_statuses(self, updates):
+        """Apply a batch of (sid, status, error_code) delivery updates in one transaction."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany("UPDATE messages SET status = ?, error = ?, updated = ? WHERE sid = ?",
+                                 [(status, error, now, sid) for sid, status, error in updates])
+            self._db.commit()
+
+    def status_counts(self):
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall())
+            counts["failed_to_send"] = self._db.execute("SELECT COUNT(*) FROM failures").fetchone()[0]
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _Outgoing:
+    __slots__ = ("to", "body", "attempt", "not_before")
+
+    def __init__(self, to, body):
+        self.to = to
+        self.body = body
+        self.attempt = 0
+        self.not_before = 0.0
+
+
+class _Lane:
+    """Messages waiting to go out from one sending number, and the worker sending them."""
+
+    def __init__(self, from_number, bucket):
+        self.from_number = from_number
+        self.bucket = bucket
+        self.pending = deque()
+        self.thread = None
+
+
+class OutboundDispatcher:
+    """
+    Queues outgoing SMS and sends them from one background worker per sending number.
+
+    Each sending number has a token bucket so we stay under Twilio's per-number
+    rate, and numbers send in parallel. With a `number_pool` every recipient is
+    pinned to one number of the pool, which spreads the load while keeping each
+    conversation on a single number. 429 and 5xx errors are retried with
+    jittered exponential backoff: the message is held back until its retry time
+    without blocking the worker, so other recipients keep being served. Bodies
+    over Twilio's limit are split, and every send and delivery status update is
+    recorded in a MessageStore. Replies to one recipient are sent in the order queued.
+    """
+
+    def __init__(self, client, from_number, rate=1.0, burst=1, max_retries=4, store=None,
+                 status_callback=None, status_batch_size=50, status_flush_interval=2.0, number_pool=None):
+        """
+        Args:
+            client: twilio.rest.Client (or a stand-in with messages.create)
+            from_number: Default sending number
+            rate: Messages per second allowed per sending number
+            burst: Messages that may go out back to back before the rate applies
+            max_retries: Retries for 429/5xx responses
+            store: MessageStore for SIDs and outcomes (in-memory if omitted)
+            status_callback: Public URL Twilio should post delivery updates to
+            status_batch_size: Delivery updates written per batch
+            status_flush_interval: Maximum seconds a delivery update waits before being written
+            number_pool: Sending numbers to spread recipients over instead of `from_number`
+        """
+        self.client = client
+        self.from_number = from_number
+        self.number_pool = list(number_pool or [])
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.store = store or MessageStore()
+        self.status_callback = status_callback
+        self.status_batch_size = status_batch_size
+        self.status_flush_interval = status_flush_interval
+
+        self._lanes = {}
+        self._condition = threading.Condition()
+        self._closing = False
+        self._status_updates = []
+        self._status_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="sms-status-flusher", daemon=True)
+        self._flusher.start()
+
+    def send(self, to, body, from_=None):
+        """Queue a reply; long bodies are split into several messages."""
+        from_number = from_ or self.number_for(to)
+        with self._condition:
+            lane = self._lanes.get(from_number)
+            if lane is None:
+                lane = self._lanes[from_number] = _Lane(from_number, TokenBucket(self.rate, self.burst))
+                lane.thread = threading.Thread(target=self._run, args=(lane,),
+                                               name=f"sms-dispatcher-{len(self._lanes)}", daemon=True)
+                lane.thread.start()
+            lane.pending.extend(_Outgoing(to, part) for part in split_body(body))
+            self._condition.notify_all()
+
+    def number_for(self, to):
+        """Sending number used for a recipient."""
+        if not self.number_pool:
+            return self.from_number
+        digest = hashlib.blake2b(to.encode("utf-8"), digest_size=4).digest()
+        return self.number_pool[int.from_bytes(digest, "little") % len(self.number_pool)]
+
+    @property
+    def depth(self):
+        """Replies waiting to be sent."""
+        with self._condition:
+            return sum(len(lane.pending) for lane in self._lanes.values())
+
+    def record_status(self, sid, status, error_code=None):
+        """Buffer a delivery status callback; buffered updates are written in batches."""
+        with self._status_lock:
+            self._status_updates.append((sid, status, error_code))
+            full = len(self._status_updates) >= self.status_batch_size
+        if full:
+            self._flush_statuses()
+
+    def shutdown(self, timeout=30.0):
+        """Send what is queued, write pending status updates and stop."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+            threads = [lane.thread for lane in self._lanes.values()]
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        self._stopped.set()
+        self._flusher.join(max(deadline - time.monotonic(), 0))
+        self._flush_statuses()
+        return not any(thread.is_alive() for thread in threads)
+
+    def _next_ready(self, lane):
+        """
+        Return the first message that may be sent now, or the seconds until one may.
+
+        A message waiting for a retry also holds back later messages to the same
+        recipient, so replies never arrive out of order.
+        """
+        now = time.monotonic()
+        blocked = set()
+        wait = None
+        for outgoing in lane.pending:
+            if outgoing.to in blocked:
+                continue
+            if outgoing.not_before <= now:
+                return outgoing
+            blocked.add(outgoing.to)
+            remaining = outgoing.not_before - now
+            wait = remaining if wait is None else min(wait, remaining)
+        return wait
+
+    def _run(self, lane):
+        while True:
+            with self._condition:
+                while True:
+                    ready = self._next_ready(lane)
+                    if isinstance(ready, _Outgoing):
+                        break
+                    if ready is None and self._closing:
+                        return
+                    self._condition.wait(ready)
+            lane.bucket.acquire()
+            done = self._send_one(ready, lane.from_number)
+            with self._condition:
+                if done:
+                    lane.pending.remove(ready)
+
+    def _send_one(self, outgoing, from_number):
+        """Try to send a message; returns False if it was rescheduled for a retry."""
+        kwargs = {"body": outgoing.body, "from_": from_number, "to": outgoing.to}
+        if self.status_callback:
+            kwargs["status_callback"] = self.status_callback
+        started = time.perf_counter()
+        try:
+            message = self.client.messages.create(**kwargs)
+        except Exception as e:
+            TWILIO_SEND_SECONDS.observe(time.perf_counter() - started, outcome="error")
+            status = getattr(e, "status", None)
+            if status in RETRYABLE_STATUS and outgoing.attempt < self.max_retries:
+                delay = backoff_delay(outgoing.attempt, base=1.0, cap=30.0)
+                logger.warning("Twilio send rejected, retrying",
+                               extra={"status": status, "to": mask_phone(outgoing.to), "retry_in": round(delay, 2)})
+                outgoing.attempt += 1
+                outgoing.not_before = time.monotonic() + delay
+                return False
+            logger.error("Failed to send message",
+                         extra={"to": mask_phone(outgoing.to), "status": status, "error": str(e)})
+            TWILIO_SEND_FAILURES.inc()
+            self.store.record_failure(outgoing.to, from_number, str(e), outgoing.attempt + 1)
+            return True
+        TWILIO_SEND_SECONDS.observe(time.perf_counter() - started, outcome="ok")
+        self.store.record_sent(message.sid, outgoing.to, from_number, outgoing.attempt + 1)
+        return True
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.status_flush_interval):
+            self._flush_statuses()
+
+    def _flush_statuses(self):
+        with self._status_lock:
+            updates, self._status_updates = self._status_updates, []
+        if updates:
+            self.store.update_statuses(updates)
@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Bounded job queue drained by a fixed pool of worker threads.
+
+    The webhook puts work here and returns straight away. When the queue is full
+    `submit` refuses new jobs instead of blocking, so callers can shed load.
+    A caller that will only submit later (e.g. after a coalesce window) can
+    `reserve` a slot now; reserved slots count toward `max_queue`.
+    """
+
+    def __init__(self, workers=4, max_queue=100, name="job"):
+        """
+        Args:
+            workers: Number of worker threads (maximum concurrent jobs)
+            max_queue: Maximum number of jobs waiting to run
+            name: Prefix for worker thread names
+        """
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._accepting = True
+        self._in_flight = 0
+        self._reserved = 0
+        self._lock = threading.Lock()
+        # Held while accepting a job so shutdown can't queue its sentinels in between
+        self._submit_lock = threading.Lock()
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name=f"{name}-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue `fn(*args, **kwargs)` to run on a worker.
+
+        Returns:
+            True if the job was queued, False if the queue is full or shutting down
+        """
+        with self._submit_lock:
+            if not self._has_room_locked():
+                return False
+            try:
+                self._queue.put_nowait((fn, args, kwargs))
+                return True
+            except queue.Full:
+                return False
+
+    def reserve(self):
+        """
+        Hold a queue slot for a job that will be submitted later with `submit_reserved`.
+
+        Returns:
+            True if a slot was reserved, False if the queue is full or shutting down
+        """
+        with self._submit_lock:
+            if not self._has_room_locked():
+                return False
+            self._reserved += 1
+            return True
+
+    def release(self):
+        """Give back a reserved slot without using it."""
+        with self._submit_lock:
+            self._reserved = max(0, self._reserved - 1)
+
+    def submit_reserved(self, fn, *args, **kwargs):
+        """
+        Queue `fn(*args, **kwargs)` in a slot taken earlier with `reserve`.
+
+        Returns:
+            True if the job was queued, False if the queue is shutting down
+            (the slot is given back either way)
+        """
+        with self._submit_lock:
+            self._reserved = max(0, self._reserved - 1)
+            if not self._accepting:
+                return False
+            # Reserved slots are counted in the bound, so there is always room
+            self._queue.put_nowait((fn, args, kwargs))
+            return True
+
+    def _has_room_locked(self):
+        maxsize = self._queue.maxsize
+        return self._accepting and (maxsize <= 0 or self._queue.qsize() + self._reserved < maxsize)
+
+    @property
+    def depth(self):
+        """Number of jobs waiting to run."""
+        return self._queue.qsize()
+
+    @property
+    def full(self):
+        """True when `submit` would currently turn a job away."""
+        with self._submit_lock:
+            return not self._has_room_locked()
+
+    @property
+    def in_flight(self):
+        """Number of jobs currently running."""
+        with self._lock:
+            return self._in_flight
+
+    def shutdown(self, timeout=30.0):
+        """
+        Stop accepting jobs and wait for queued and running jobs to finish.
+
+        Args:
+            timeout: Maximum seconds to wait for the queue to drain
+
+        Returns:
+            True if every job finished within the timeout
+        """
+        with self._submit_lock:
+            self._accepting = False
+        deadline = time.monotonic() + timeout
+        for _ in self._threads:
+            # Sentinels are queued after the remaining jobs, so workers drain first
+            while True:
+                try:
+                    self._queue.put(None, timeout=max(deadline - time.monotonic(), 0.01))
+                    break
+                except queue.Full:
+                    if time.monotonic() >= deadline:
+                        return False
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            fn, args, kwargs = job
+            with self._lock:
+                self._in_flight += 1
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                logger.exception("Unhandled error in background job")
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
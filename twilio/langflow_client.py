@@ -0,0 +1,343 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+# Status codes where Langflow did not run the flow, so sending the request again is safe
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class _Retry(Exception):
+    """Internal signal that a response status is worth another attempt."""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Langflow while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError if calls are currently rejected."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                raise CircuitOpenError("Langflow is unavailable (circuit open)")
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class LatencyRecorder:
+    """Keeps the latest call durations and outcomes for reporting."""
+
+    def __init__(self, size=1000):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self._samples.append(seconds)
+            self.calls += 1
+            if not ok:
+                self.failures += 1
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            calls, failures = self.calls, self.failures
+        if not samples:
+            return {"calls": calls, "failures": failures}
+
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            "calls": calls,
+            "failures": failures,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": samples[-1],
+        }
+
+
+def is_connect_error(error):
+    """True if a requests error happened while connecting, before the request was sent."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        # requests wraps urllib3's MaxRetryError, whose reason says which phase failed
+        return isinstance(getattr(error.args[0], "reason", None), (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+def is_outage(error):
+    """True for connection errors, timeouts and 5xx responses; 4xx mean Langflow is up."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is None or error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def build_payload(message, session_id=None):
+    payload = {
+        "input_value": message,
+        "output_type": "chat",
+        "input_type": "chat"
+    }
+    if session_id:
+        payload["session_id"] = session_id
+    return payload
+
+
+class LangflowClient:
+    """
+    Langflow run API client over a pooled keep-alive requests.Session.
+
+    Requests have separate connect and read timeouts. Failures to connect and
+    429/502/503/504 responses are retried with jittered backoff, because in those
+    cases the flow did not run. A circuit breaker fails fast while Langflow is
+    down; only connection errors, timeouts and 5xx responses count against it.
+    """
+
+    def __init__(self, api_url, connect_timeout=3.05, read_timeout=60.0, max_retries=2,
+                 pool_size=10, breaker=None):
+        """
+        Args:
+            api_url: Full /api/v1/run/<flow-id> URL
+            connect_timeout: Seconds to wait for the TCP connection
+            read_timeout: Seconds to wait for Langflow to answer
+            max_retries: Extra attempts after the first one
+            pool_size: Keep-alive connections kept open to Langflow
+            breaker: CircuitBreaker to use (a default one is created if omitted)
+        """
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyRecorder()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def run(self, message, session_id=None):
+        """
+        Run the flow on a message.
+
+        Returns:
+            The raw response body
+
+        Raises:
+            CircuitOpenError: Langflow is marked as down
+            requests.exceptions.RequestException: The call failed after retries
+        """
+        self.breaker.before_call()
+        started = time.perf_counter()
+        error = None
+        try:
+            return self._post_with_retries(build_payload(message, session_id)).text
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # Always settle the call, or a half-open breaker would wait for this trial forever
+            self._finished(started, error)
+
+    def _post_with_retries(self, payload):
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+                if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                    raise _Retry()
+                response.raise_for_status()
+                return response
+            except (_Retry, requests.exceptions.ConnectionError) as e:
+                # Once the request may have reached Langflow (dropped connection, read
+                # timeout) it is not retried: the flow may already be running
+                if attempt >= self.max_retries or not (isinstance(e, _Retry) or is_connect_error(e)):
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+
+    def probe(self, timeout=2.0):
+        """
+        Check that the Langflow server answers its /health endpoint.
+
+        Returns:
+            (reachable, detail) where detail is the HTTP status or the error
+        """
+        origin = "/".join(self.api_url.split("/", 3)[:3])
+        try:
+            response = self.session.get(f"{origin}/health", timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            return False, type(e).__name__
+        return response.status_code < 500, response.status_code
+
+    def stream_events(self, message, session_id=None):
+        """
+        Run the flow with `stream=true` and yield its events as they arrive.
+
+        Langflow streams one JSON object per line (optionally prefixed with
+        `data:` when served as SSE), e.g. {"event": "token", "data": {"chunk": ...}}
+        and a final {"event": "end", "data": {"result": ...}}. Streamed runs are
+        not retried, since part of the answer may already have been sent. The
+        outcome is recorded even when the consumer raises or stops iterating early.
+
+        Yields:
+            (event, data) tuples
+        """
+        self.breaker.before_call()
+        payload = build_payload(message, session_id)
+        started = time.perf_counter()
+        error = None
+        try:
+            with self.session.post(self.api_url, params={"stream": "true"}, json=payload,
+                                   timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    if line.startswith("data:"):
+                        line = line[5:].strip()
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    yield event.get("event"), event.get("data") or {}
+        except BaseException as e:
+            # Includes GeneratorExit when the consumer abandons the stream
+            error = e
+            raise
+        finally:
+            self._finished(started, error)
+
+    def _finished(self, started, error=None):
+        """Record a call's latency and tell the breaker whether Langflow looked down."""
+        if error is not None and is_outage(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        self.latency.record(time.perf_counter() - started, error is None)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncLangflowClient:
+    """
+    asyncio counterpart of LangflowClient built on a pooled httpx.AsyncClient.
+
+    Same timeouts, retry rules and circuit breaker semantics as the sync client.
+    """
+
+    def __init__(self, api_url, connect_timeout=3.05, read_timeout=60.0, max_retries=2,
+                 pool_size=10, breaker=None):
+        import httpx
+
+        self._httpx = httpx
+        self.api_url = api_url
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyRecorder()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def run(self, message, session_id=None):
+        """Async version of LangflowClient.run; raises httpx errors after retries."""
+        self.breaker.before_call()
+        started = time.perf_counter()
+        error = None
+        try:
+            response = await self._post_with_retries(build_payload(message, session_id))
+            return response.text
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finished(started, error)
+
+    async def _post_with_retries(self, payload):
+        import asyncio
+
+        httpx = self._httpx
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.post(self.api_url, json=payload)
+                if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                    raise _Retry()
+                response.raise_for_status()
+                return response
+            except (_Retry, httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+
+    def _finished(self, started, error=None):
+        """Record a call's latency and tell the breaker whether Langflow looked down."""
+        httpx = self._httpx
+        if isinstance(error, httpx.HTTPStatusError):
+            outage = error.response.status_code >= 500
+        else:
+            outage = isinstance(error, httpx.TransportError)
+        if outage:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        self.latency.record(time.perf_counter() - started, error is None)
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,68 @@
+import json
+import logging
+import time
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+
+
+def mask_phone(number):
+    """Hide all but the country code and last four digits of a phone number for logging."""
+    if not number:
+        return number
+    if len(number) <= 7:
+        return "*" * len(number)
+    return number[:3] + "*" * (len(number) - 7) + number[-4:]
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra=` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Human-readable lines with `extra=` fields appended as key=value pairs."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging(level="INFO", fmt="text"):
+    """
+    Set up root logging for the bot.
+
+    Args:
+        level: Log level name, e.g. DEBUG, INFO or WARNING
+        fmt: 'text' for key=value lines or 'json' for one JSON object per line
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else KeyValueFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+    # werkzeug forces its access log to INFO unless a level is set explicitly
+    logging.getLogger("werkzeug").setLevel(root.level)
+    # The twilio library logs every REST request and its headers at INFO
+    logging.getLogger("twilio.http_client").setLevel(max(root.level, logging.WARNING))
@@ -1,14 +1,35 @@
-from flask import Flask, request
+from flask import Flask, Response, request
 from twilio.twiml.messaging_response import MessagingResponse
+from twilio.request_validator import RequestValidator
 from twilio.rest import Client
 import os
 import requests
 import json
+import time
+import atexit
+import logging
+import signal
+import threading
 from dotenv import load_dotenv
 
+from dispatcher import MessageStore, OutboundDispatcher
+from jobs import JobQueue
+from langflow_client import CircuitBreaker, CircuitOpenError, LangflowClient
+from log_config import configure_logging, mask_phone
+from metrics import CONTENT_TYPE, REGISTRY
+from profiler import SamplingProfiler
+from response_parser import InvalidResponseJSON, ResponseExtractor, ResponseParseError
+from response_cache import ResponseCache, bag_of_words_embedding
+from sessions import SessionHistory, SessionManager
+from sms_segments import SmsSegmenter, split_message
+
 # Load environment variables
 load_dotenv()
 
+# Logging - LOG_LEVEL=DEBUG also logs message and answer text, LOG_FORMAT=json for log shippers
+configure_logging(os.getenv('LOG_LEVEL', 'INFO'), os.getenv('LOG_FORMAT', 'text'))
+logger = logging.getLogger("twilio-bot")
+
 app = Flask(__name__)
 
 # Twilio credentials - you'll need to set these as environment variables
@@ -18,148 +39,402 @@ TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')  # Your Twilio phone numb
 
 # API configuration
 # This needs to point to where your flow is running on the langflow server locally
-API_URL = "http://127.0.0.1:7860/api/v1/run/892d40e3-ed04-44c5-9661-375f3914c349"
+API_URL = os.getenv('LANGFLOW_API_URL', "http://127.0.0.1:7860/api/v1/run/892d40e3-ed04-44c5-9661-375f3914c349")
+FLOW_ID = API_URL.rstrip('/').rsplit('/', 1)[-1]
+
+# Background processing - how many messages are handled at once and how many may wait
+WORKER_COUNT = int(os.getenv('WORKER_COUNT', '4'))
+MAX_QUEUED_MESSAGES = int(os.getenv('MAX_QUEUED_MESSAGES', '100'))
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', '30'))
+
+# Stream answers from Langflow and text them back sentence by sentence as they are generated
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'false').lower() in ('1', 'true', 'yes')
+
+# Langflow client - pooled keep-alive connections, timeouts, retries and a circuit breaker
+langflow = LangflowClient(
+    API_URL,
+    connect_timeout=float(os.getenv('LANGFLOW_CONNECT_TIMEOUT', '3.05')),
+    read_timeout=float(os.getenv('LANGFLOW_READ_TIMEOUT', '60')),
+    max_retries=int(os.getenv('LANGFLOW_MAX_RETRIES', '2')),
+    pool_size=WORKER_COUNT,
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv('LANGFLOW_BREAKER_FAILURES', '5')),
+        reset_timeout=float(os.getenv('LANGFLOW_BREAKER_RESET', '30')),
+    ),
+)
+
+# Answers to repeated questions - invalidated when the flow or the vector store changes.
+# Off by default: answers are shared between senders, so only a Langflow session's
+# very first message (before it has any chat memory) is ever looked up or stored
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE', 'false').lower() in ('1', 'true', 'yes')
+
+def cache_namespace():
+    return f"{API_URL}|{os.getenv('VECTOR_STORE_VERSION', '')}"
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '1000')),
+    ttl=float(os.getenv('RESPONSE_CACHE_TTL', str(24 * 3600))),
+    embed_fn=bag_of_words_embedding if os.getenv('RESPONSE_CACHE_SIMILARITY', 'false').lower() in ('1', 'true', 'yes') else None,
+    similarity_threshold=float(os.getenv('RESPONSE_CACHE_THRESHOLD', '0.98')),
+    namespace=cache_namespace(),
+)
+# Which Langflow sessions already have chat memory; persisted by default when the cache is on
+session_history = SessionHistory(os.getenv('SESSION_STORE_PATH') or
+                                 ('sessions.db' if RESPONSE_CACHE_ENABLED else ':memory:'))
+
+def reload_cache_namespace(signum=None, frame=None):
+    """SIGHUP handler: re-read .env and drop cached answers if VECTOR_STORE_VERSION changed."""
+    load_dotenv(override=True)
+    response_cache.set_namespace(cache_namespace())
+    logger.info("Reloaded response cache namespace", extra={"namespace": response_cache.namespace})
+
+if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGHUP, reload_cache_namespace)
+
+# Initialize Twilio client - TWILIO_API_BASE_URL points it at a fake REST server for load tests
+TWILIO_API_BASE_URL = os.getenv('TWILIO_API_BASE_URL')
+if TWILIO_API_BASE_URL:
+    from stubs import redirecting_http_client
+    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, http_client=redirecting_http_client(TWILIO_API_BASE_URL))
+else:
+    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+# Outbound SMS - one worker per sending number, rate limited per number, retried on 429/5xx.
+# SIDs and delivery status are kept in memory unless MESSAGE_STORE_PATH names a sqlite file
+SMS_STATUS_CALLBACK_URL = os.getenv('SMS_STATUS_CALLBACK_URL') or None
+dispatcher = OutboundDispatcher(
+    client,
+    TWILIO_PHONE_NUMBER,
+    rate=float(os.getenv('SMS_RATE_PER_SECOND', '1')),
+    burst=int(os.getenv('SMS_BURST', '1')),
+    max_retries=int(os.getenv('SMS_MAX_RETRIES', '4')),
+    store=MessageStore(os.getenv('MESSAGE_STORE_PATH', ':memory:')),
+    status_callback=SMS_STATUS_CALLBACK_URL,
+    number_pool=[number.strip() for number in os.getenv('TWILIO_NUMBER_POOL', '').split(',') if number.strip()],
+)
+request_validator = RequestValidator(TWILIO_AUTH_TOKEN or '')
+
+# Worker pool that processes messages after the webhook has acknowledged them
+job_queue = JobQueue(workers=WORKER_COUNT, max_queue=MAX_QUEUED_MESSAGES, name="sms")
+
+@atexit.register
+def drain_job_queue():
+    """Finish queued messages, including ones still in their coalesce window, before the process exits."""
+    sessions.shutdown()
+    if not job_queue.shutdown(timeout=SHUTDOWN_TIMEOUT):
+        logger.warning("Shutdown timed out with messages still queued")
+    if not dispatcher.shutdown(timeout=SHUTDOWN_TIMEOUT):
+        logger.warning("Shutdown timed out with replies still waiting to be sent")
+
+# Metrics served by /metrics in the Prometheus text format
+WEBHOOK_SECONDS = REGISTRY.histogram('webhook_seconds', 'Time to acknowledge an incoming SMS webhook')
+MESSAGE_SECONDS = REGISTRY.histogram('message_processing_seconds', 'Time from picking up a message to queueing its reply',
+                                     labelnames=('source',))
+LANGFLOW_SECONDS = REGISTRY.histogram('langflow_request_seconds', 'Langflow flow run time including retries',
+                                      labelnames=('mode',))
+PARSE_SECONDS = REGISTRY.histogram('response_parse_seconds', 'Time to extract the answer from a run response',
+                                   buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+ERRORS = REGISTRY.counter('errors_total', 'Errors by kind', labelnames=('kind',))
+MESSAGES_RECEIVED = REGISTRY.counter('messages_received_total', 'Incoming SMS messages')
+REGISTRY.gauge('job_queue_depth', 'Messages waiting for a worker', lambda: job_queue.depth)
+REGISTRY.gauge('jobs_in_flight', 'Messages being processed', lambda: job_queue.in_flight)
+REGISTRY.gauge('outbound_queue_depth', 'Replies waiting to be sent', lambda: dispatcher.depth)
+REGISTRY.gauge('active_sessions', 'Sender sessions held in memory', lambda: sessions.active_sessions())
+REGISTRY.gauge('langflow_circuit_open', '1 while Langflow calls are being skipped',
+               lambda: int(langflow.breaker.state == 'open'))
+REGISTRY.gauge('response_cache_hit_ratio', 'Share of questions answered from cache',
+               lambda: response_cache.stats()['hit_ratio'])
 
-# Initialize Twilio client
-client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# Extracts the answer from run responses, remembering which field each flow uses
+response_extractor = ResponseExtractor(os.getenv('RESPONSE_PARSER_BACKEND') or None)
+
+# Replies parse_api_response falls back to when it can't find the answer - never cached
+UNPARSEABLE_RESPONSE = "Sorry, I couldn't process the response properly."
+RESPONSE_ERROR = "Sorry, there was an error processing the response."
 
 def parse_api_response(response_text):
     """
     Parse the complex API response and extract the message text.
+    Only the first output's message is decoded; see response_parser.ResponseExtractor.
     """
     try:
-        response_data = json.loads(response_text)
-        
-        # Navigate through the nested structure to get the message
-        outputs = response_data.get('outputs', [])
-        if outputs and len(outputs) > 0:
-            first_output = outputs[0]
-            outputs_list = first_output.get('outputs', [])
-            if outputs_list and len(outputs_list) > 0:
-                first_output_item = outputs_list[0]
-                results = first_output_item.get('results', {})
-                message = results.get('message', {})
-                
-                # Try to get the text from the message
-                if isinstance(message, dict):
-                    # Try different possible paths for the text
-                    text = (message.get('text') or 
-                           message.get('data', {}).get('text') or
-                           message.get('artifacts', {}).get('message') or
-                           message.get('outputs', {}).get('message', {}).get('message'))
-                    
-                    if text:
-                        return text.strip()
+        with PARSE_SECONDS.time():
+            return response_extractor.extract(response_text, flow_id=FLOW_ID)
         
-        # If we can't find the message in the expected structure, return the raw response
-        print(f"Could not parse message from response structure: {response_text[:200]}...")
-        return "Sorry, I couldn't process the response properly."
-        
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON response: {e}")
-        return "Sorry, there was an error processing the response."
+    except InvalidResponseJSON as e:
+        ERRORS.inc(kind='invalid_json')
+        logger.error("Error parsing JSON response", extra={"error": str(e), "bytes": len(response_text)})
+        return RESPONSE_ERROR
+    except ResponseParseError as e:
+        # If we can't find the message in the expected structure, log the start of the raw response
+        ERRORS.inc(kind='unparseable_response')
+        logger.error("Could not parse message from response structure", extra={"bytes": len(response_text)})
+        logger.debug("Unparseable response starts with %r", response_text[:200])
+        return UNPARSEABLE_RESPONSE
     except Exception as e:
-        print(f"Error extracting message: {e}")
-        return "Sorry, there was an error processing the response."
+        ERRORS.inc(kind='parse')
+        logger.exception("Error extracting message")
+        return RESPONSE_ERROR
 
-@app.route('/webhook', methods=['POST'])
-def webhook():
+def send_apology(sender_phone):
+    """Let the user know their message could not be processed."""
+    dispatcher.send(sender_phone, "Sorry, I'm having trouble processing your request right now. Please try again later.")
+    logger.info("Queued error message", extra={"to": mask_phone(sender_phone)})
+
+def process_message_streaming(incoming_message, sender_phone, session_id=None, cache_answer=False):
     """
-    Webhook endpoint that receives incoming SMS messages from Twilio.
-    Processes the message through the API and sends the response back to the sender.
+    Stream the Langflow answer and send it as SMS-sized segments as soon as each
+    one is complete, so long answers start arriving before generation finishes.
+    With `cache_answer` the complete answer is stored in the response cache.
     """
-    # Get the incoming message details
-    incoming_message = request.form.get('Body', '')
-    sender_phone = request.form.get('From', '')
+    started = time.perf_counter()
+    segmenter = SmsSegmenter()
+    sent = 0
+    answer_parts = []
     
-    print(f"Received message from {sender_phone}: {incoming_message}")
+    def send_segments(segments):
+        nonlocal sent
+        for segment in segments:
+            dispatcher.send(sender_phone, segment)
+            if sent == 0:
+                logger.info("First segment queued", extra={"to": mask_phone(sender_phone),
+                                                           "seconds": round(time.perf_counter() - started, 3)})
+            sent += 1
     
-    # Prepare API request payload
-    payload = {
-        "input_value": incoming_message,
-        "output_type": "chat",
-        "input_type": "chat"
-    }
+    try:
+        logger.debug("Streaming API request", extra={"url": API_URL})
+        streamed_tokens = False
+        for event, data in langflow.stream_events(incoming_message, session_id=session_id):
+            if event == 'token' and data.get('chunk'):
+                streamed_tokens = True
+                answer_parts.append(data['chunk'])
+                send_segments(segmenter.feed(data['chunk']))
+            elif event == 'end' and not streamed_tokens:
+                # The flow's model isn't streaming tokens, so fall back to the final result
+                answer_parts.append(parse_api_response(json.dumps(data.get('result', {}))))
+                send_segments(segmenter.feed(answer_parts[-1]))
+            elif event == 'error':
+                raise RuntimeError(f"Langflow reported an error: {data}")
+        send_segments(segmenter.flush())
+        LANGFLOW_SECONDS.observe(time.perf_counter() - started, mode='stream')
+        answer = ''.join(answer_parts).strip()
+        if cache_answer and answer and answer not in (UNPARSEABLE_RESPONSE, RESPONSE_ERROR):
+            response_cache.put(incoming_message, answer)
+        logger.info("Streamed answer", extra={"to": mask_phone(sender_phone), "segments": sent,
+                                              "seconds": round(time.perf_counter() - started, 3)})
+        
+    except CircuitOpenError as e:
+        ERRORS.inc(kind='circuit_open')
+        logger.warning("Skipping API request", extra={"error": str(e)})
+        send_apology(sender_phone)
+        
+    except Exception as e:
+        ERRORS.inc(kind='stream')
+        logger.error("Error streaming response", extra={"error": str(e), "segments_sent": sent})
+        if sent == 0:
+            send_apology(sender_phone)
+
+def process_message(incoming_message, sender_phone, session_id=None, turn=1):
+    """
+    Run one incoming SMS through the Langflow API and text the answer back.
+    Runs on a background worker so the webhook can acknowledge Twilio immediately.
+    """
+    started = time.perf_counter()
+    source = _process_message(incoming_message, sender_phone, session_id, turn)
+    MESSAGE_SECONDS.observe(time.perf_counter() - started, source=source)
+
+def _process_message(incoming_message, sender_phone, session_id=None, turn=1):
+    """Answer one message; returns where the answer came from, for the processing-time histogram."""
+    # Once Langflow has chat memory for the session its answers can't be shared. The
+    # in-memory turn counter restarts after eviction, so ask the persisted history instead
+    first_message = session_id is None or session_history.first_use(session_id)
+    use_cache = RESPONSE_CACHE_ENABLED and first_message
+    logger.debug("Cache lookup", extra={"turn": turn, "first_message": first_message, "use_cache": use_cache})
+    if use_cache:
+        cached_answer = response_cache.get(incoming_message)
+        if cached_answer is not None:
+            logger.info("Answering from cache", extra={"to": mask_phone(sender_phone),
+                                                       "hit_ratio": round(response_cache.stats()['hit_ratio'], 3)})
+            for body in (split_message(cached_answer) if STREAM_RESPONSES else [cached_answer]):
+                dispatcher.send(sender_phone, body)
+            return 'cache'
     
-    headers = {
-        "Content-Type": "application/json"
-    }
+    if STREAM_RESPONSES:
+        process_message_streaming(incoming_message, sender_phone, session_id, cache_answer=use_cache)
+        return 'stream'
     
     try:
         # Send API request to process the message
-        print(f"Sending API request to: {API_URL}")
-        response = requests.post(API_URL, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        # Get the processed response
-        api_response_text = response.text
-        print(f"Raw API Response: {api_response_text[:500]}...")
+        logger.debug("Sending API request", extra={"url": API_URL})
+        with LANGFLOW_SECONDS.time(mode='run'):
+            api_response_text = langflow.run(incoming_message, session_id=session_id)
         
         # Parse the response to extract just the message
         parsed_message = parse_api_response(api_response_text)
-        print(f"Parsed message: {parsed_message}")
+        logger.debug("Parsed message: %s", parsed_message)
+        if use_cache and parsed_message not in (UNPARSEABLE_RESPONSE, RESPONSE_ERROR):
+            response_cache.put(incoming_message, parsed_message)
         
-        # Send the parsed message back to the sender
-        message = client.messages.create(
-            body=parsed_message,
-            from_=TWILIO_PHONE_NUMBER,
-            to=sender_phone
-        )
+        # Queue the parsed message for the sender; the dispatcher handles rate limits and retries
+        dispatcher.send(sender_phone, parsed_message)
         
-        print(f"Sent parsed message to {sender_phone}: {parsed_message[:100]}...")
-        print(f"Message SID: {message.sid}")
+        logger.info("Queued answer", extra={"to": mask_phone(sender_phone), "chars": len(parsed_message)})
         
-        # Return empty TwiML response (we're handling the response via API)
-        resp = MessagingResponse()
-        return str(resp)
+    except CircuitOpenError as e:
+        ERRORS.inc(kind='circuit_open')
+        logger.warning("Skipping API request", extra={"error": str(e)})
+        send_apology(sender_phone)
         
     except requests.exceptions.RequestException as e:
-        error_msg = f"Error making API request: {e}"
-        print(error_msg)
+        ERRORS.inc(kind='langflow_request')
+        logger.error("Error making API request", extra={"error": str(e)})
+        send_apology(sender_phone)
         
-        # Send error message back to user
-        try:
-            error_response = client.messages.create(
-                body="Sorry, I'm having trouble processing your request right now. Please try again later.",
-                from_=TWILIO_PHONE_NUMBER,
-                to=sender_phone
-            )
-            print(f"Sent error message to {sender_phone}")
-        except Exception as send_error:
-            print(f"Error sending error message: {send_error}")
+    except Exception as e:
+        ERRORS.inc(kind='unexpected')
+        logger.exception("Unexpected error")
+        send_apology(sender_phone)
+    return 'langflow'
+
+# Per-sender sessions: ordered processing per number, bursts coalesced into one flow call
+sessions = SessionManager(
+    job_queue,
+    process_message,
+    coalesce_window=float(os.getenv('COALESCE_WINDOW', '1.5')),
+    idle_ttl=float(os.getenv('SESSION_IDLE_TTL', '1800')),
+    max_sessions=int(os.getenv('MAX_SESSIONS', '10000')),
+)
+
+@app.route('/webhook', methods=['POST'])
+def webhook():
+    """
+    Webhook endpoint that receives incoming SMS messages from Twilio.
+    Queues the message for a background worker and acknowledges Twilio straight
+    away; the answer is sent later through the Twilio REST API.
+    """
+    with WEBHOOK_SECONDS.time():
+        # Get the incoming message details
+        incoming_message = request.form.get('Body', '')
+        sender_phone = request.form.get('From', '')
         
-        # Return error response
-        resp = MessagingResponse()
-        resp.message("Sorry, there was an error processing your message.")
-        return str(resp)
+        MESSAGES_RECEIVED.inc()
+        logger.info("Received message", extra={"sender": mask_phone(sender_phone), "chars": len(incoming_message)})
+        logger.debug("Message text: %s", incoming_message)
         
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-        # Return error response
         resp = MessagingResponse()
-        resp.message("Sorry, there was an error processing your message.")
+        if not sessions.submit(sender_phone, incoming_message):
+            ERRORS.inc(kind='queue_full')
+            logger.warning("Job queue full, rejecting message",
+                           extra={"sender": mask_phone(sender_phone), "waiting": job_queue.depth})
+            resp.message("Sorry, we're very busy right now. Please try again in a few minutes.")
+        
+        # Return empty TwiML response (we're handling the response via API)
         return str(resp)
 
+@app.route('/sms-status', methods=['POST'])
+def sms_status():
+    """
+    Delivery status callback from Twilio (set SMS_STATUS_CALLBACK_URL to this route's public URL).
+    Updates are buffered and written to the message store in batches. Requests
+    without a valid X-Twilio-Signature are rejected.
+    """
+    # Twilio signs the URL it was given, which behind ngrok differs from request.url
+    url = SMS_STATUS_CALLBACK_URL or request.url
+    if not request_validator.validate(url, request.form, request.headers.get('X-Twilio-Signature', '')):
+        ERRORS.inc(kind='bad_signature')
+        logger.warning("Rejected status callback with an invalid signature")
+        return ('', 403)
+    dispatcher.record_status(
+        request.form.get('MessageSid', ''),
+        request.form.get('MessageStatus', ''),
+        request.form.get('ErrorCode') or None,
+    )
+    return ('', 204)
+
+# Langflow reachability is probed at most once per HEALTH_CACHE_SECONDS, so frequent health checks stay cheap
+HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS', '10'))
+_health_lock = threading.Lock()
+_health_cache = {'checked_at': None, 'reachable': None, 'detail': None, 'probing': False}
+
+def langflow_reachable():
+    """Cached result of probing Langflow's /health endpoint."""
+    with _health_lock:
+        checked_at = _health_cache['checked_at']
+        stale = checked_at is None or time.monotonic() - checked_at >= HEALTH_CACHE_SECONDS
+        # One caller refreshes a stale result while the others keep answering from the cache
+        probe = stale and (checked_at is None or not _health_cache['probing'])
+        if probe:
+            _health_cache['probing'] = True
+    if probe:
+        # The probe can take up to 2 seconds, so it runs without holding the lock
+        try:
+            reachable, detail = langflow.probe(timeout=2.0)
+        finally:
+            with _health_lock:
+                _health_cache['probing'] = False
+        with _health_lock:
+            _health_cache.update(checked_at=time.monotonic(), reachable=reachable, detail=detail)
+        if not reachable:
+            logger.warning("Langflow health probe failed", extra={"detail": detail})
+    with _health_lock:
+        return (_health_cache['reachable'], _health_cache['detail'],
+                time.monotonic() - _health_cache['checked_at'])
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint for monitoring."""
-    return {'status': 'healthy', 'service': 'twilio-api-bot'}
+    """Health check endpoint for monitoring. Returns 503 when Langflow can't be reached."""
+    reachable, detail, age = langflow_reachable()
+    body = {
+        'status': 'healthy' if reachable else 'degraded',
+        'service': 'twilio-api-bot',
+        'langflow': {'reachable': reachable, 'detail': detail, 'checked_seconds_ago': round(age, 1),
+                     'circuit': langflow.breaker.state},
+        'queue_depth': job_queue.depth,
+        'in_flight': job_queue.in_flight,
+    }
+    return body, 200 if reachable else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
+# Optional sampling profiler: POST /debug/profiler?action=start|stop, GET for collapsed stacks
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+profiler = SamplingProfiler(interval=float(os.getenv('PROFILER_INTERVAL', '0.01')))
+
+if PROFILER_ENABLED:
+    @app.route('/debug/profiler', methods=['GET', 'POST'])
+    def debug_profiler():
+        """Start or stop the sampling profiler, or download its report as collapsed stacks."""
+        if request.method == 'GET':
+            return Response(profiler.report(), mimetype='text/plain')
+        action = request.args.get('action', 'start')
+        if action == 'start':
+            profiler.start()
+        elif action == 'stop':
+            profiler.stop()
+        else:
+            return {'error': f"Unknown action {action!r}"}, 400
+        return profiler.stats()
 
 if __name__ == '__main__':
     # Check if required environment variables are set
     if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER]):
-        print("Error: Missing required environment variables.")
-        print("Please set the following environment variables:")
-        print("- TWILIO_ACCOUNT_SID")
-        print("- TWILIO_AUTH_TOKEN") 
-        print("- TWILIO_PHONE_NUMBER")
+        logger.error("Missing required environment variables. Please set TWILIO_ACCOUNT_SID, "
+                     "TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER")
         exit(1)
     
-    print("Starting Twilio API Bot...")
-    print(f"Using Twilio phone number: {TWILIO_PHONE_NUMBER}")
-    print(f"API endpoint: {API_URL}")
-    print("Webhook endpoint: /webhook")
-    print("Health check endpoint: /health")
+    logger.info("Starting Twilio API Bot", extra={
+        "phone_number": TWILIO_PHONE_NUMBER,
+        "api_url": API_URL,
+        "workers": WORKER_COUNT,
+        "queue_size": MAX_QUEUED_MESSAGES,
+        "sms_rate": dispatcher.rate,
+        "sms_burst": dispatcher.burst,
+        "profiler": PROFILER_ENABLED,
+    })
+    logger.info("Endpoints: /webhook, /sms-status, /health, /metrics")
     
     # Run the Flask app
     app.run(debug=True, host='0.0.0.0', port=8888)
@@ -0,0 +1,84 @@
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock profiler for a running server.
+
+    While running, a background thread snapshots every thread's stack every
+    `interval` seconds. `report()` returns the samples as collapsed stacks
+    ("frame;frame;frame count" per line), the input format of flamegraph.pl
+    and speedscope.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        """
+        Args:
+            interval: Seconds between samples
+            max_depth: Innermost frames kept per stack
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks = Counter()
+        self._samples = 0
+        self._started_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start sampling, discarding the previous report. Does nothing if already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks.clear()
+            self._samples = 0
+            self._started_at = time.monotonic()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling; the collected report stays available."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def report(self, limit=None):
+        """Collapsed stacks, most sampled first."""
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+        return "\n".join(f"{stack} {count}" for stack, count in stacks) + "\n"
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+            return {"running": self.running, "samples": self._samples, "seconds": elapsed,
+                    "distinct_stacks": len(self._stacks)}
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            sample = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                summary = traceback.extract_stack(frame, limit=self.max_depth)
+                stack = ";".join(f"{f.name} ({f.filename.rsplit('/', 1)[-1]}:{f.lineno})" for f in summary)
+                sample.append(f"{names.get(thread_id, thread_id)};{stack}")
+            with self._lock:
+                self._stacks.update(sample)
+                self._samples += 1
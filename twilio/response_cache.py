@@ -0,0 +1,148 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_PUNCTUATION = re.compile(r"[^\w\s£%]")
+_WHITESPACE = re.compile(r"\s+")
+_NEGATIONS = {"no", "not", "never", "nor", "none", "nothing", "without", "cannot", "cant", "dont", "doesnt",
+              "didnt", "isnt", "arent", "wasnt", "werent", "wont", "wouldnt", "shouldnt", "couldnt", "havent",
+              "hasnt", "hadnt"}
+
+
+def normalize_question(text):
+    """Lowercase, drop punctuation and collapse whitespace so trivial variations match."""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def negations(key):
+    """Number of negations in a normalized question ("don t" counts, as punctuation is dropped)."""
+    words = key.split()
+    return (sum(word in _NEGATIONS for word in words)
+            + sum(1 for before, word in zip(words, words[1:]) if word == "t" and before.endswith("n")))
+
+
+def bag_of_words_embedding(text, dim=256):
+    """
+    Cheap local embedding: hashed word counts, L2-normalized.
+
+    It only catches reworded questions that share most of their words; plug in a
+    real embedding model through `embed_fn` for proper semantic matching.
+    """
+    vector = [0.0] * dim
+    for word in text.split():
+        bucket = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "little") % dim
+        vector[bucket] += 1.0
+    return _normalize(vector)
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+
+class ResponseCache:
+    """
+    Answer cache for repeated SMS questions.
+
+    The exact tier matches on the normalized question. The optional similarity
+    tier embeds the question and returns the answer of the most similar cached
+    question when its cosine similarity reaches `similarity_threshold` and both
+    questions have the same number of negations, since "...if I work" and
+    "...if I don't work" embed almost identically. Entries
+    expire after `ttl` seconds, the oldest are evicted beyond `max_entries`, and
+    everything is dropped when the namespace (flow id / vector store version) changes.
+    """
+
+    def __init__(self, max_entries=1000, ttl=24 * 3600, embed_fn=None, similarity_threshold=0.98,
+                 namespace=""):
+        """
+        Args:
+            max_entries: Maximum number of cached answers
+            ttl: Seconds an answer stays valid
+            embed_fn: Optional callable text -> list of floats enabling the similarity tier
+            similarity_threshold: Minimum cosine similarity for a similarity hit
+            namespace: Identifies the flow and vector store the answers came from
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def set_namespace(self, namespace):
+        """Switch to a new flow / vector store version, dropping every cached answer."""
+        with self._lock:
+            if namespace != self.namespace:
+                self.namespace = namespace
+                self._entries.clear()
+
+    def get(self, question):
+        """Return a cached answer for the question, or None."""
+        key = normalize_question(question)
+        now = time.monotonic()
+        with self._lock:
+            self._expire_locked(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"]
+            if self.embed_fn is None or not self._entries:
+                self.misses += 1
+                return None
+            candidates = [(k, e["embedding"]) for k, e in self._entries.items()]
+
+        # Embed outside the lock - a remote embedding call can be slow
+        query = _normalize(list(self.embed_fn(key)))
+        best_key, best_score = None, -1.0
+        query_negations = negations(key)
+        for candidate_key, embedding in candidates:
+            if negations(candidate_key) != query_negations:
+                continue
+            score = sum(a * b for a, b in zip(query, embedding))
+            if score > best_score:
+                best_key, best_score = candidate_key, score
+
+        with self._lock:
+            entry = self._entries.get(best_key)
+            if entry is not None and best_score >= self.similarity_threshold:
+                self._entries.move_to_end(best_key)
+                self.similar_hits += 1
+                return entry["answer"]
+            self.misses += 1
+            return None
+
+    def put(self, question, answer):
+        """Cache the answer to a question."""
+        key = normalize_question(question)
+        embedding = _normalize(list(self.embed_fn(key))) if self.embed_fn is not None else None
+        with self._lock:
+            self._entries[key] = {"answer": answer, "expires": time.monotonic() + self.ttl, "embedding": embedding}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _expire_locked(self, now):
+        expired = [k for k, e in self._entries.items() if e["expires"] <= now]
+        for k in expired:
+            del self._entries[k]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0,
+            }
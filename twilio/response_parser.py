@@ -0,0 +1,167 @@
+import io
+import json
+import threading
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Places the chat answer can live inside outputs[0].outputs[0].results.message, in the
+# order parse_api_response has always tried them
+MESSAGE_PATHS = (
+    ("text",),
+    ("data", "text"),
+    ("artifacts", "message"),
+    ("outputs", "message", "message"),
+)
+RESULTS_PREFIX = "outputs.item.outputs.item.results.message"
+# Prefixes of the two arrays whose first item holds the message
+OUTPUT_PREFIXES = ("outputs.item", "outputs.item.outputs.item")
+# Below this size a full parse beats incremental parsing
+INCREMENTAL_MIN_BYTES = 64 * 1024
+
+
+class ResponseParseError(ValueError):
+    """The response has no chat message where one is expected."""
+
+
+class InvalidResponseJSON(ResponseParseError):
+    """The response body is not valid JSON."""
+
+
+def _follow(node, path):
+    for key in path:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def _first_message(events):
+    """
+    Build outputs[0].outputs[0].results.message from ijson parse events.
+
+    ijson prefixes don't carry array indexes, so RESULTS_PREFIX alone would also
+    match the message of a later output. Items are counted per array instead, and
+    parsing stops once the first inner output has been read, giving the same
+    answer as indexing the fully parsed payload.
+    """
+    # Items seen so far in outputs and in outputs[0].outputs
+    counts = [0, 0]
+    for prefix, event, value in events:
+        if prefix in OUTPUT_PREFIXES and event not in ("map_key", "end_map", "end_array"):
+            depth = OUTPUT_PREFIXES.index(prefix)
+            counts[depth] += 1
+            if depth == 0 and counts[0] > 1:
+                return None
+        elif prefix == OUTPUT_PREFIXES[1] and event == "end_map" and counts == [1, 1]:
+            return None
+        elif prefix == OUTPUT_PREFIXES[0] and event == "end_map" and counts[0] == 1:
+            return None
+        if prefix == RESULTS_PREFIX and counts == [1, 1] and event != "map_key":
+            if event not in ("start_map", "start_array"):
+                return value
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+            for _, event, value in events:
+                builder.event(event, value)
+                if event in ("start_map", "start_array"):
+                    depth += 1
+                elif event in ("end_map", "end_array"):
+                    depth -= 1
+                    if depth == 0:
+                        return builder.value
+    return None
+
+
+class ResponseExtractor:
+    """
+    Pulls the chat answer out of a Langflow run response.
+
+    Only the first output's `results.message` is looked at. The 'ijson' backend
+    parses incrementally and stops as soon as the message object is complete, so
+    the artifacts, logs and other outputs after it are never decoded. The 'orjson'
+    and 'json' backends parse the whole payload. 'auto' uses ijson for large
+    payloads and the fastest full parser for small ones. The path that produced
+    text is remembered per flow id and tried first next time.
+    """
+
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: 'auto', 'ijson', 'orjson' or 'json' (default 'auto')
+        """
+        backend = backend or "auto"
+        if backend not in ("auto", "ijson", "orjson", "json"):
+            raise ValueError(f"Unknown response parser backend {backend!r}")
+        if backend == "ijson" and ijson is None:
+            raise ImportError("The ijson backend needs `pip install ijson`")
+        if backend == "orjson" and orjson is None:
+            raise ImportError("The orjson backend needs `pip install orjson`")
+        self.backend = backend
+        self._learned = {}
+        self._lock = threading.Lock()
+
+    def extract(self, response, flow_id=None):
+        """
+        Return the answer text from a run response.
+
+        Args:
+            response: Response body as str or bytes
+            flow_id: Flow the response came from, used to remember the winning path
+
+        Raises:
+            InvalidResponseJSON: The body is not valid JSON
+            ResponseParseError: No message text was found
+        """
+        message = self._message_object(response)
+        if not isinstance(message, dict):
+            raise ResponseParseError("Response has no outputs[0].outputs[0].results.message object")
+
+        with self._lock:
+            learned = self._learned.get(flow_id)
+        paths = MESSAGE_PATHS if learned is None else (learned,) + tuple(p for p in MESSAGE_PATHS if p != learned)
+        for path in paths:
+            text = _follow(message, path)
+            if text and isinstance(text, str):
+                if path != learned:
+                    with self._lock:
+                        self._learned[flow_id] = path
+                return text.strip()
+        raise ResponseParseError("No message text in any known location")
+
+    def learned_paths(self):
+        """Paths remembered per flow id."""
+        with self._lock:
+            return {flow_id: ".".join(path) for flow_id, path in self._learned.items()}
+
+    def _message_object(self, response):
+        backend = self.backend
+        if backend == "auto":
+            if ijson is not None and len(response) >= INCREMENTAL_MIN_BYTES:
+                backend = "ijson"
+            else:
+                backend = "orjson" if orjson is not None else "json"
+
+        if backend == "ijson":
+            data = response.encode("utf-8") if isinstance(response, str) else response
+            try:
+                return _first_message(ijson.parse(io.BytesIO(data)))
+            except ijson.JSONError as e:
+                raise InvalidResponseJSON(f"Invalid JSON: {e}") from e
+
+        try:
+            data = orjson.loads(response) if backend == "orjson" else json.loads(response)
+        except ValueError as e:
+            raise InvalidResponseJSON(f"Invalid JSON: {e}") from e
+        try:
+            return data["outputs"][0]["outputs"][0]["results"]["message"]
+        except (KeyError, IndexError, TypeError):
+            return None
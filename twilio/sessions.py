@@ -0,0 +1,221 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from log_config import mask_phone
+
+logger = logging.getLogger(__name__)
+
+
+def session_id_for(sender):
+    """Stable Langflow session id for a phone number, so chat memory survives eviction."""
+    return "sms-" + hashlib.sha256(sender.encode("utf-8")).hexdigest()[:24]
+
+
+class SessionHistory:
+    """
+    Langflow session ids that have been sent at least one message.
+
+    Langflow keeps chat memory per session id, and session ids are derived from
+    the phone number, so a sender's history outlives both our in-memory session
+    and a restart. Keep this in a file for as long as Langflow keeps its memory.
+    """
+
+    def __init__(self, path=":memory:"):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS used_sessions (session_id TEXT PRIMARY KEY, first_used REAL)")
+            self._db.commit()
+
+    def first_use(self, session_id):
+        """Record that the session is being used; True if it never was before."""
+        with self._lock:
+            cursor = self._db.execute("INSERT OR IGNORE INTO used_sessions VALUES (?, ?)", (session_id, time.time()))
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _Session:
+    __slots__ = ("sender", "session_id", "pending", "running", "has_slot", "timer", "last_message_at", "turns")
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.session_id = session_id_for(sender)
+        self.pending = []
+        # True from the first message until the drain for the last one has finished
+        self.running = False
+        # True while the session holds a reserved job queue slot for its pending messages
+        self.has_slot = False
+        # Timer of the open coalesce window, if any
+        self.timer = None
+        self.last_message_at = 0.0
+        self.turns = 0
+
+
+class SessionManager:
+    """
+    Per-sender conversation sessions on top of a JobQueue.
+
+    Messages from one sender are processed one call at a time and in order,
+    while different senders run in parallel. Messages that arrive within
+    `coalesce_window` seconds of each other are joined into a single flow call;
+    the window is timed with `threading.Timer`, so a worker is only taken once
+    it has closed. Opening a window reserves a job queue slot, so the queue
+    bound also covers messages that are still being coalesced.
+    Idle sessions are dropped after `idle_ttl` seconds, and at most
+    `max_sessions` are kept.
+    """
+
+    def __init__(self, job_queue, handler, coalesce_window=1.5, idle_ttl=1800.0, max_sessions=10000):
+        """
+        Args:
+            job_queue: JobQueue that runs the per-sender work
+            handler: Callable (message, sender, session_id, turn) doing the actual processing;
+                turn is 1 for the first flow call of the session
+            coalesce_window: Seconds to wait for follow-up messages before calling the flow
+            idle_ttl: Seconds without messages after which a session is forgotten
+            max_sessions: Maximum sessions kept in memory
+        """
+        self.job_queue = job_queue
+        self.handler = handler
+        self.coalesce_window = coalesce_window
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._closing = False
+
+    def submit(self, sender, message):
+        """
+        Queue a message from a sender.
+
+        Returns:
+            False if the message was turned away because the job queue is full
+            or the manager is shutting down
+        """
+        with self._lock:
+            if self._closing:
+                return False
+            self._evict_locked(time.monotonic())
+            session = self._sessions.get(sender)
+            if session is None:
+                session = self._sessions[sender] = _Session(sender)
+            self._sessions.move_to_end(sender)
+            if not session.has_slot:
+                # Pending messages are covered by one slot; the first of them reserves it
+                if not self.job_queue.reserve():
+                    return False
+                session.has_slot = True
+            session.pending.append(message)
+            session.last_message_at = time.monotonic()
+            if session.running:
+                # The open window or the active drain will pick this message up
+                return True
+            session.running = True
+            self._schedule_locked(session, self.coalesce_window)
+        return True
+
+    def shutdown(self):
+        """
+        Stop accepting messages and submit every session whose coalesce window is
+        still open, so the job queue can finish them. Call before `job_queue.shutdown()`.
+
+        Returns:
+            Number of sessions submitted early
+        """
+        with self._lock:
+            self._closing = True
+            waiting = [session for session in self._sessions.values() if session.timer is not None]
+            for session in waiting:
+                session.timer.cancel()
+                session.timer = None
+        for session in waiting:
+            self._submit_drain(session)
+        return len(waiting)
+
+    def _schedule_locked(self, session, delay):
+        """Call `_window_closed` for the session after `delay` seconds."""
+        timer = threading.Timer(max(delay, 0.0), self._window_closed, args=(session,))
+        timer.daemon = True
+        session.timer = timer
+        timer.start()
+
+    def _window_closed(self, session):
+        with self._lock:
+            if session.timer is not threading.current_thread():
+                # Cancelled by shutdown, which submitted the session itself
+                return
+            session.timer = None
+            wait = session.last_message_at + self.coalesce_window - time.monotonic()
+            if wait > 0:
+                # The sender is still typing; give the burst a moment longer
+                self._schedule_locked(session, wait)
+                return
+        self._submit_drain(session)
+
+    def _submit_drain(self, session):
+        with self._lock:
+            session.has_slot = False
+        if not self.job_queue.submit_reserved(self._drain, session):
+            logger.warning("Job queue shut down, dropping session", extra={"sender": mask_phone(session.sender)})
+            with self._lock:
+                session.pending = []
+                session.running = False
+
+    def _drain(self, session):
+        while True:
+            with self._lock:
+                messages, session.pending = session.pending, []
+                session.turns += 1
+
+            combined = "\n".join(messages)
+            if len(messages) > 1:
+                logger.info("Coalesced messages",
+                            extra={"sender": mask_phone(session.sender), "messages": len(messages)})
+            try:
+                self.handler(combined, session.sender, session.session_id, session.turns)
+            except Exception:
+                logger.exception("Error processing messages", extra={"sender": mask_phone(session.sender)})
+
+            with self._lock:
+                if not session.pending:
+                    session.running = False
+                    if session.has_slot:
+                        # A message reserved a slot but was taken by this call
+                        session.has_slot = False
+                        self.job_queue.release()
+                    return
+                if self._closing:
+                    # No new window during shutdown; answer what arrived in this call now
+                    if session.has_slot:
+                        session.has_slot = False
+                        self.job_queue.release()
+                    continue
+                wait = session.last_message_at + self.coalesce_window - time.monotonic()
+                # Messages that arrived during this call get their own window
+                self._schedule_locked(session, wait)
+                return
+
+    def _evict_locked(self, now):
+        cutoff = now - self.idle_ttl
+        for sender in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions and self._sessions[sender].last_message_at >= cutoff:
+                # Sessions are kept in last-message order, so the rest are newer
+                break
+            session = self._sessions[sender]
+            if not session.running and not session.pending:
+                del self._sessions[sender]
+
+    def active_sessions(self):
+        """Number of sessions currently held in memory."""
+        with self._lock:
+            return len(self._sessions)
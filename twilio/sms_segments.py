@@ -0,0 +1,119 @@
+import re
+
+# GSM 03.38 basic character set
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Extension table characters take two septets (escape + character)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+GSM7_SINGLE_LIMIT = 160
+GSM7_CONCAT_LIMIT = 153
+UCS2_SINGLE_LIMIT = 70
+UCS2_CONCAT_LIMIT = 67
+
+SENTENCE_END = re.compile(r'[.!?:;](?=\s)|\n')
+
+
+def is_gsm7(text):
+    """True if the text can be sent with the GSM-7 alphabet."""
+    return all(ch in GSM7_BASIC or ch in GSM7_EXTENDED for ch in text)
+
+
+def segment_limit(text):
+    """Characters that fit in one SMS for this text's encoding (160 GSM-7, 70 UCS-2)."""
+    return GSM7_SINGLE_LIMIT if is_gsm7(text) else UCS2_SINGLE_LIMIT
+
+
+def max_fit(text, gsm_limit=GSM7_SINGLE_LIMIT, ucs2_limit=UCS2_SINGLE_LIMIT):
+    """
+    Length of the longest prefix of `text` that fits in one SMS.
+
+    A prefix made only of GSM-7 characters may use up to `gsm_limit` septets
+    (extension characters count twice); anything else is limited to
+    `ucs2_limit` UTF-16 code units.
+    """
+    gsm_ok = True
+    gsm_cost = 0
+    ucs2_units = 0
+    fit = 0
+    for i, ch in enumerate(text):
+        if ch in GSM7_BASIC:
+            gsm_cost += 1
+        elif ch in GSM7_EXTENDED:
+            gsm_cost += 2
+        else:
+            gsm_ok = False
+        ucs2_units += 2 if ord(ch) > 0xFFFF else 1
+
+        gsm_fits = gsm_ok and gsm_cost <= gsm_limit
+        if gsm_fits or ucs2_units <= ucs2_limit:
+            fit = i + 1
+        elif not gsm_ok or gsm_cost > gsm_limit:
+            break
+    return fit
+
+
+class SmsSegmenter:
+    """
+    Turns streamed text into SMS-sized messages, cutting at sentence boundaries.
+
+    Feed chunks as they arrive. Once the buffered text no longer fits in one SMS,
+    a segment is released, cut after the last sentence end that fits (or the last
+    word boundary if there is none), so segments go out while generation continues.
+    """
+
+    def __init__(self, gsm_limit=GSM7_SINGLE_LIMIT, ucs2_limit=UCS2_SINGLE_LIMIT):
+        self.gsm_limit = gsm_limit
+        self.ucs2_limit = ucs2_limit
+        self._buffer = ""
+
+    def feed(self, chunk):
+        """Add streamed text and return the list of segments now ready to send."""
+        self._buffer += chunk
+        ready = []
+        while True:
+            segment = self._next_segment(final=False)
+            if segment is None:
+                return ready
+            ready.append(segment)
+
+    def flush(self):
+        """Return the remaining text as segments once the stream has ended."""
+        ready = []
+        while True:
+            segment = self._next_segment(final=True)
+            if segment is None:
+                return ready
+            ready.append(segment)
+
+    def _next_segment(self, final):
+        self._buffer = self._buffer.lstrip()
+        if not self._buffer:
+            return None
+        fit = max_fit(self._buffer, self.gsm_limit, self.ucs2_limit)
+        if fit == len(self._buffer):
+            if not final:
+                # Everything still fits in one SMS - wait for more text
+                return None
+            segment, self._buffer = self._buffer, ""
+            return segment.rstrip()
+
+        # Include one character past the fit so a sentence end right at the limit is seen
+        cut = 0
+        for match in SENTENCE_END.finditer(self._buffer, 0, fit + 1):
+            if match.end() <= fit:
+                cut = match.end()
+        if not cut:
+            space = self._buffer.rfind(" ", 0, fit + 1)
+            cut = space if space > 0 else fit
+
+        segment, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return segment.rstrip()
+
+
+def split_message(text):
+    """Split a complete message into SMS-sized segments."""
+    segmenter = SmsSegmenter()
+    return segmenter.feed(text) + segmenter.flush()
@@ -0,0 +1,251 @@
+"""
+Local stand-ins for Langflow and Twilio, used to load-test the webhook without
+touching either real service.
+
+Run a fake Langflow endpoint on port 7860:
+
+    python stubs.py --port 7860 --latency 2.0
+
+FakeTwilioRestServer mimics the Messages endpoint of the Twilio REST API, and
+RedirectingHttpClient points a real twilio.rest.Client at it, so the outbound
+dispatcher can be exercised including rate limits and 429/5xx errors.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+def langflow_response(text, padding_bytes=0):
+    """Build a response shaped like Langflow's /api/v1/run output."""
+    return {
+        "session_id": str(uuid.uuid4()),
+        "outputs": [{
+            "inputs": {"input_value": "stub"},
+            "outputs": [{
+                "results": {"message": {"text": text, "sender": "Machine", "sender_name": "AI"}},
+                "artifacts": {"message": text, "padding": "x" * padding_bytes},
+                "outputs": {"message": {"message": text, "type": "text"}},
+                "logs": {},
+                "messages": [{"message": text, "type": "text"}],
+            }],
+        }],
+    }
+
+
+class FakeLangflowServer:
+    """Threaded HTTP server answering every POST with a canned Langflow response."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, answer="This is a stub answer.",
+                 padding_bytes=0, status=200, token_delay=0.0):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            latency: Seconds to sleep before answering, to mimic LLM time
+            answer: Message text returned in the response
+            padding_bytes: Extra bytes added to the payload, to mimic large RAG outputs
+            status: HTTP status code to return
+            token_delay: Seconds between words when the request asks for `stream=true`
+        """
+        self.latency = latency
+        self.answer = answer
+        self.padding_bytes = padding_bytes
+        self.status = status
+        self.token_delay = token_delay
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if "stream=true" in self.path:
+                    self._stream()
+                    return
+                body = json.dumps(langflow_response(server.answer, server.padding_bytes)).encode()
+                self.send_response(server.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self):
+                self.send_response(server.status)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                words = server.answer.split(" ")
+                for i, word in enumerate(words):
+                    chunk = word if i == 0 else " " + word
+                    self._event("token", {"chunk": chunk})
+                    if server.token_delay:
+                        time.sleep(server.token_delay)
+                self._event("end", {"result": langflow_response(server.answer, server.padding_bytes)})
+
+            def _event(self, name, data):
+                self.wfile.write((json.dumps({"event": name, "data": data}) + "\n\n").encode())
+                self.wfile.flush()
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v1/run/stub-flow"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeMessage:
+    def __init__(self, sid):
+        self.sid = sid
+
+
+class FakeMessages:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def create(self, body, from_, to, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        message = FakeMessage("SM" + uuid.uuid4().hex)
+        with self._lock:
+            self.sent.append({"sid": message.sid, "body": body, "from": from_, "to": to, "time": time.time()})
+        return message
+
+
+class FakeTwilioClient:
+    """Drop-in for twilio.rest.Client that records outgoing messages instead of sending them."""
+
+    def __init__(self, latency=0.0):
+        self.messages = FakeMessages(latency)
+
+
+class FakeTwilioRestServer:
+    """Threaded HTTP server mimicking POST /2010-04-01/Accounts/{sid}/Messages.json."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, error_status=429, seed=None):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            latency: Seconds to sleep before answering
+            error_rate: Fraction of requests answered with `error_status`
+            error_status: Status returned for injected errors (429 or 5xx)
+            seed: Seed for the error injection
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.sent = []
+        self.rejected = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    failed = server._random.random() < server.error_rate
+                    if failed:
+                        server.rejected += 1
+                if failed:
+                    self._reply(server.error_status, {"code": 20429 if server.error_status == 429 else 20500,
+                                                      "message": "Injected error", "status": server.error_status})
+                    return
+                message = {"sid": "SM" + uuid.uuid4().hex, "body": form.get("Body", ""),
+                           "from": form.get("From"), "to": form.get("To"), "status": "queued",
+                           "num_segments": "1", "date_created": time.strftime("%a, %d %b %Y %H:%M:%S +0000")}
+                with server._lock:
+                    server.sent.append(dict(message, time=time.time()))
+                self._reply(201, message)
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def redirecting_http_client(base_url):
+    """
+    A twilio HTTP client that sends every API call to `base_url` instead of
+    api.twilio.com. Use as Client(sid, token, http_client=redirecting_http_client(url)).
+    """
+    from twilio.http.http_client import TwilioHttpClient
+
+    class RedirectingHttpClient(TwilioHttpClient):
+        def request(self, method, url, *args, **kwargs):
+            url = base_url + url.split(".twilio.com", 1)[-1]
+            return super().request(method, url, *args, **kwargs)
+
+    return RedirectingHttpClient()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Langflow /api/v1/run endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7860)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds before answering")
+    parser.add_argument("--padding", type=int, default=0, help="Extra payload bytes")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Seconds between streamed words")
+    args = parser.parse_args()
+
+    fake = FakeLangflowServer(args.host, args.port, latency=args.latency, padding_bytes=args.padding,
+                              token_delay=args.token_delay)
+    print(f"Fake Langflow listening on {fake.url}")
+    fake.serve_forever()
@@ -0,0 +1,123 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import dispatcher as dispatcher_module
+from dispatcher import OutboundDispatcher, split_body
+
+
+class TwilioError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FakeMessages:
+    """Records sends; `failures` maps a body to the statuses its first attempts fail with."""
+
+    def __init__(self, failures=None):
+        self.failures = {body: list(statuses) for body, statuses in (failures or {}).items()}
+        self.sent = []
+        self.attempts = []
+        self._lock = threading.Lock()
+
+    def create(self, body, from_, to, **kwargs):
+        with self._lock:
+            self.attempts.append((to, body))
+            statuses = self.failures.get(body)
+            if statuses:
+                raise TwilioError(statuses.pop(0))
+            self.sent.append((from_, to, body))
+            return SimpleNamespace(sid=f"SM{len(self.sent)}")
+
+
+@pytest.fixture(autouse=True)
+def short_backoff(monkeypatch):
+    monkeypatch.setattr(dispatcher_module, "backoff_delay", lambda attempt, base, cap: 0.3)
+
+
+def make_dispatcher(failures=None, **kwargs):
+    messages = FakeMessages(failures)
+    kwargs.setdefault("rate", 1000)
+    kwargs.setdefault("burst", 1000)
+    return OutboundDispatcher(SimpleNamespace(messages=messages), "+15550000000", **kwargs), messages
+
+
+def test_rejected_send_is_retried():
+    dispatcher, messages = make_dispatcher({"hello": [503]})
+
+    dispatcher.send("+447700900001", "hello")
+
+    assert dispatcher.shutdown(timeout=5)
+    assert messages.sent == [("+15550000000", "+447700900001", "hello")]
+    assert dispatcher.store.status_counts() == {"queued": 1, "failed_to_send": 0}
+
+
+def test_retry_wait_does_not_block_other_recipients():
+    dispatcher, messages = make_dispatcher({"to A": [429]})
+
+    dispatcher.send("+447700900001", "to A")
+    time.sleep(0.05)
+    dispatcher.send("+447700900002", "to B")
+
+    assert dispatcher.shutdown(timeout=5)
+    assert [body for _, _, body in messages.sent] == ["to B", "to A"]
+
+
+def test_replies_to_one_recipient_stay_in_order():
+    dispatcher, messages = make_dispatcher({"first": [500]})
+
+    dispatcher.send("+447700900001", "first")
+    dispatcher.send("+447700900001", "second")
+
+    assert dispatcher.shutdown(timeout=5)
+    assert [body for _, _, body in messages.sent] == ["first", "second"]
+
+
+def test_gives_up_after_max_retries():
+    dispatcher, messages = make_dispatcher({"hello": [503, 503, 503]}, max_retries=2)
+
+    dispatcher.send("+447700900001", "hello")
+
+    assert dispatcher.shutdown(timeout=5)
+    assert messages.sent == []
+    assert len(messages.attempts) == 3
+    assert dispatcher.store.status_counts() == {"failed_to_send": 1}
+
+
+def test_client_errors_are_not_retried():
+    dispatcher, messages = make_dispatcher({"hello": [400]})
+
+    dispatcher.send("+447700900001", "hello")
+
+    assert dispatcher.shutdown(timeout=5)
+    assert len(messages.attempts) == 1
+
+
+def test_number_pool_pins_each_recipient_to_one_number():
+    pool = ["+15550000001", "+15550000002", "+15550000003"]
+    dispatcher, messages = make_dispatcher(number_pool=pool)
+    recipients = [f"+4477009000{i:02d}" for i in range(20)]
+
+    for recipient in recipients:
+        dispatcher.send(recipient, "one")
+        dispatcher.send(recipient, "two")
+
+    assert dispatcher.shutdown(timeout=5)
+    numbers = {}
+    for from_number, to, _ in messages.sent:
+        numbers.setdefault(to, set()).add(from_number)
+    assert all(len(used) == 1 for used in numbers.values())
+    assert set().union(*numbers.values()) <= set(pool)
+    assert len(set().union(*numbers.values())) > 1
+
+
+def test_long_bodies_are_split():
+    body = "This sentence is fairly long. " * 80
+
+    parts = split_body(body)
+
+    assert len(parts) > 1
+    assert all(len(part) <= 1600 for part in parts)
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from jobs import JobQueue
+
+
+def test_full_queue_refuses_jobs():
+    release = threading.Event()
+    jobs = JobQueue(workers=1, max_queue=1)
+    assert jobs.submit(release.wait)
+    time.sleep(0.05)  # let the worker take the first job
+    assert jobs.submit(lambda: None)
+
+    assert not jobs.submit(lambda: None)
+    release.set()
+    assert jobs.shutdown(timeout=5)
+
+
+def test_shutdown_runs_queued_jobs_and_then_refuses_new_ones():
+    done = []
+    jobs = JobQueue(workers=2, max_queue=50)
+    for i in range(20):
+        assert jobs.submit(done.append, i)
+
+    assert jobs.shutdown(timeout=5)
+    assert sorted(done) == list(range(20))
+    assert not jobs.submit(done.append, 99)
+
+
+def test_every_accepted_job_runs_when_shutdown_races_submit():
+    for _ in range(20):
+        done = []
+        accepted = []
+        jobs = JobQueue(workers=2, max_queue=1000)
+        start = threading.Barrier(5)
+
+        def producer(base):
+            start.wait()
+            for i in range(base, base + 200):
+                if jobs.submit(done.append, i):
+                    accepted.append(i)
+
+        producers = [threading.Thread(target=producer, args=(k * 1000,)) for k in range(4)]
+        for thread in producers:
+            thread.start()
+        start.wait()
+        assert jobs.shutdown(timeout=5)
+        for thread in producers:
+            thread.join()
+
+        assert sorted(done) == sorted(accepted)
+
+
+def test_failing_job_does_not_stop_the_worker():
+    done = []
+    jobs = JobQueue(workers=1, max_queue=10)
+
+    def fail():
+        raise ValueError("boom")
+
+    jobs.submit(fail)
+    jobs.submit(done.append, 1)
+
+    assert jobs.shutdown(timeout=5)
+    assert done == [1]
+
+
+def test_reserved_slots_count_toward_the_bound():
+    done = []
+    jobs = JobQueue(workers=1, max_queue=2)
+    assert jobs.reserve()
+    assert jobs.reserve()
+
+    assert not jobs.reserve()
+    assert not jobs.submit(done.append, 0)
+    jobs.release()
+    assert jobs.submit(done.append, 1)
+    assert jobs.submit_reserved(done.append, 2)
+
+    assert jobs.shutdown(timeout=5)
+    assert sorted(done) == [1, 2]
+    assert not jobs.reserve()
@@ -0,0 +1,227 @@
+import time
+from http.client import RemoteDisconnected
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+import langflow_client
+from langflow_client import CircuitBreaker, CircuitOpenError, LangflowClient
+
+
+def response(status, body=b'{"outputs": []}'):
+    result = requests.Response()
+    result.status_code = status
+    result._content = body
+    result.url = "http://langflow/api/v1/run/flow"
+    return result
+
+
+def connection_refused():
+    reason = NewConnectionError(None, "Connection refused")
+    return requests.exceptions.ConnectionError(MaxRetryError(None, "/api/v1/run/flow", reason))
+
+
+def remote_disconnected():
+    reason = RemoteDisconnected("Remote end closed connection without response")
+    return requests.exceptions.ConnectionError(ProtocolError("Connection aborted.", reason))
+
+
+class FakeSession:
+    """Stands in for requests.Session, replaying one outcome per call."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(langflow_client, "backoff_delay", lambda attempt: 0)
+    return LangflowClient("http://langflow/api/v1/run/flow", max_retries=2,
+                          breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+
+def test_client_errors_do_not_open_the_circuit(client):
+    client.session = FakeSession(response(404), response(400))
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.run("hello")
+
+    assert client.breaker.state == "closed"
+
+
+def test_server_errors_open_the_circuit(client):
+    client.session = FakeSession(response(500))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.run("hello")
+
+    assert client.breaker.state == "open"
+
+
+def test_connect_failures_are_retried(client):
+    client.session = FakeSession(connection_refused(), connection_refused(), response(200))
+
+    assert client.run("hello") == '{"outputs": []}'
+    assert client.session.calls == 3
+    assert client.breaker.state == "closed"
+
+
+def test_dropped_connection_after_sending_is_not_retried(client):
+    client.session = FakeSession(remote_disconnected(), response(200))
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.run("hello")
+
+    assert client.session.calls == 1
+    assert client.breaker.state == "open"
+
+
+def test_retryable_status_is_retried(client):
+    client.session = FakeSession(response(503), response(429), response(200))
+
+    assert client.run("hello") == '{"outputs": []}'
+    assert client.session.calls == 3
+
+
+class FakeStream:
+    """Streamed response whose body is a list of JSON lines."""
+
+    def __init__(self, lines, status=200):
+        self.lines = lines
+        self.status_code = status
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error", response=response(self.status_code))
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+STREAM = ['{"event": "token", "data": {"chunk": "Hello"}}', '{"event": "token", "data": {"chunk": " there"}}',
+          '{"event": "end", "data": {"result": {}}}']
+
+
+def half_open_client(monkeypatch, *outcomes):
+    monkeypatch.setattr(langflow_client, "backoff_delay", lambda attempt: 0)
+    client = LangflowClient("http://langflow/api/v1/run/flow", max_retries=0,
+                            breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+    client.session = FakeSession(response(500), *outcomes)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.run("hello")
+    time.sleep(0.06)
+    assert client.breaker.state == "half-open"
+    return client
+
+
+def test_breaker_opens_after_threshold_and_rejects_calls():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_breaker_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_stream_yields_events_and_closes_the_circuit(monkeypatch):
+    client = half_open_client(monkeypatch, FakeStream(STREAM))
+
+    chunks = [data["chunk"] for event, data in client.stream_events("hello") if event == "token"]
+
+    assert chunks == ["Hello", " there"]
+    assert client.breaker.state == "closed"
+
+
+def test_consumer_raising_mid_stream_settles_the_trial(monkeypatch):
+    client = half_open_client(monkeypatch, FakeStream(STREAM))
+
+    with pytest.raises(RuntimeError):
+        for event, data in client.stream_events("hello"):
+            raise RuntimeError("consumer failed")
+
+    assert client.breaker.state == "closed"
+    client.breaker.before_call()
+
+
+def test_abandoned_stream_settles_the_trial(monkeypatch):
+    client = half_open_client(monkeypatch, FakeStream(STREAM))
+
+    events = client.stream_events("hello")
+    next(events)
+    events.close()
+
+    client.breaker.before_call()
+
+
+def test_stream_server_error_reopens_the_circuit(monkeypatch):
+    client = half_open_client(monkeypatch, FakeStream([], status=503))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        list(client.stream_events("hello"))
+
+    assert client.breaker.state == "open"
+
+
+def test_unexpected_error_in_run_settles_the_trial(monkeypatch):
+    client = half_open_client(monkeypatch, ValueError("bad payload"))
+
+    with pytest.raises(ValueError):
+        client.run("hello")
+
+    client.breaker.before_call()
@@ -0,0 +1,19 @@
+from log_config import mask_phone
+from metrics import Counter
+
+
+def test_mask_phone_keeps_country_code_and_last_four_digits():
+    assert mask_phone("+447700900123") == "+44******0123"
+    assert mask_phone("+1555") == "*****"
+    assert mask_phone("") == ""
+
+
+def test_counter_values_returns_a_copy():
+    counter = Counter("errors_total", "Errors by kind", labelnames=("kind",))
+    counter.inc(kind="parse")
+    counter.inc(kind="parse")
+
+    values = counter.values()
+    values.clear()
+
+    assert counter.values() == {("parse",): 2}
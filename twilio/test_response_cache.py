@@ -0,0 +1,29 @@
+from response_cache import ResponseCache, bag_of_words_embedding, negations, normalize_question
+
+
+def test_exact_tier_ignores_case_and_punctuation():
+    cache = ResponseCache()
+    cache.put("What is Universal Credit?", "A benefit.")
+
+    assert cache.get("what is universal credit") == "A benefit."
+
+
+def test_negation_counts_split_contractions():
+    assert negations(normalize_question("Can I claim if I work?")) == 0
+    assert negations(normalize_question("Can I claim if I don't work?")) == 1
+    assert negations(normalize_question("I can't work and have no income")) == 2
+
+
+def test_similarity_tier_never_matches_a_negated_question():
+    cache = ResponseCache(embed_fn=bag_of_words_embedding, similarity_threshold=0.5)
+    cache.put("Can I get Universal Credit if I work?", "Yes, if your earnings are low.")
+
+    assert cache.get("Can I get Universal Credit if I don't work?") is None
+    assert cache.get("Can I get Universal Credit if I work") == "Yes, if your earnings are low."
+
+
+def test_default_threshold_rejects_near_misses():
+    cache = ResponseCache(embed_fn=bag_of_words_embedding)
+    cache.put("How do I apply for Housing Benefit?", "Apply through your council.")
+
+    assert cache.get("How do I apply for Child Benefit?") is None
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from response_parser import InvalidResponseJSON, ResponseExtractor, ResponseParseError, ijson, orjson
+
+BACKENDS = ["json"] + (["orjson"] if orjson is not None else []) + (["ijson"] if ijson is not None else [])
+
+
+def run_response(*outputs):
+    """A run response with one inner output per item of each outer output."""
+    return json.dumps({
+        "session_id": "s",
+        "outputs": [{"inputs": {"input_value": "q"},
+                     "outputs": [{"results": results, "artifacts": {"big": "x" * 100}} for results in inner]}
+                    for inner in outputs],
+    }).encode("utf-8")
+
+
+def extract_all(payload, flow_id=None):
+    """Extract with every backend, returning the text or the exception type per backend."""
+    answers = {}
+    for backend in BACKENDS:
+        try:
+            answers[backend] = ResponseExtractor(backend).extract(payload, flow_id)
+        except ResponseParseError as e:
+            answers[backend] = type(e)
+    return answers
+
+
+@pytest.mark.parametrize("message, expected", [
+    ({"text": " Hello "}, "Hello"),
+    ({"data": {"text": "From data"}}, "From data"),
+    ({"artifacts": {"message": "From artifacts"}}, "From artifacts"),
+    ({"outputs": {"message": {"message": "Nested"}}}, "Nested"),
+    ({"text": "", "data": {"text": "Empty text skipped"}}, "Empty text skipped"),
+])
+def test_backends_agree_on_message_locations(message, expected):
+    answers = extract_all(run_response([{"message": message}]))
+
+    assert answers == {backend: expected for backend in BACKENDS}
+
+
+@pytest.mark.parametrize("payload", [
+    run_response([{}], [{"message": {"text": "second output"}}]),
+    run_response([{"other": 1}, {"message": {"text": "second inner output"}}]),
+    run_response([{"message": None}], [{"message": {"text": "second output"}}]),
+    run_response([{"message": "not an object"}]),
+    run_response(),
+    json.dumps({"outputs": [None, {"outputs": [{"results": {"message": {"text": "late"}}}]}]}).encode(),
+    json.dumps([{"outputs": [{"results": {"message": {"text": "top-level list"}}}]}]).encode(),
+], ids=["no-message", "no-message-in-first-inner", "null-message", "string-message", "no-outputs",
+        "null-first-output", "top-level-list"])
+def test_backends_agree_when_first_output_has_no_message(payload):
+    answers = extract_all(payload)
+
+    assert answers == {backend: ResponseParseError for backend in BACKENDS}
+
+
+def test_later_outputs_are_ignored():
+    payload = run_response([{"message": {"text": "first"}}, {"message": {"text": "second"}}],
+                           [{"message": {"text": "third"}}])
+
+    assert extract_all(payload) == {backend: "first" for backend in BACKENDS}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_invalid_json(backend):
+    with pytest.raises(InvalidResponseJSON):
+        ResponseExtractor(backend).extract(b'{"outputs": [', "flow")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_learned_path_is_tried_first_per_flow(backend):
+    extractor = ResponseExtractor(backend)
+    both = run_response([{"message": {"text": "text answer", "artifacts": {"message": "artifact answer"}}}])
+
+    assert extractor.extract(run_response([{"message": {"artifacts": {"message": "a"}}}]), "flow-a") == "a"
+    assert extractor.extract(both, "flow-a") == "artifact answer"
+    assert extractor.extract(both, "flow-b") == "text answer"
+    assert extractor.learned_paths() == {"flow-a": "artifacts.message", "flow-b": "text"}
+
+    # The learned path falls back to the usual order when it has no text
+    assert extractor.extract(run_response([{"message": {"text": "plain"}}]), "flow-a") == "plain"
+    assert extractor.learned_paths()["flow-a"] == "text"
@@ -0,0 +1,152 @@
+import threading
+import time
+
+from jobs import JobQueue
+from sessions import SessionHistory, SessionManager
+
+
+class Recorder:
+    """Handler that records each call and signals once `expected` calls were made."""
+
+    def __init__(self, expected):
+        self.calls = []
+        self.done = threading.Event()
+        self.expected = expected
+        self._lock = threading.Lock()
+
+    def __call__(self, message, sender, session_id, turn):
+        with self._lock:
+            self.calls.append((sender, message, turn, time.monotonic()))
+            if len(self.calls) >= self.expected:
+                self.done.set()
+
+
+def test_burst_is_coalesced_into_one_call():
+    handler = Recorder(expected=1)
+    jobs = JobQueue(workers=1, max_queue=10)
+    sessions = SessionManager(jobs, handler, coalesce_window=0.1)
+
+    for text in ["first", "second", "third"]:
+        assert sessions.submit("+447700900001", text)
+
+    assert handler.done.wait(2)
+    time.sleep(0.2)
+    assert [(sender, message, turn) for sender, message, turn, _ in handler.calls] == [
+        ("+447700900001", "first\nsecond\nthird", 1)]
+    jobs.shutdown(timeout=2)
+
+
+def test_coalesce_window_does_not_hold_a_worker():
+    senders = [f"+4477009000{i:02d}" for i in range(4)]
+    handler = Recorder(expected=len(senders))
+    jobs = JobQueue(workers=1, max_queue=10)
+    sessions = SessionManager(jobs, handler, coalesce_window=0.3)
+
+    started = time.monotonic()
+    for sender in senders:
+        assert sessions.submit(sender, "hello")
+
+    assert handler.done.wait(3)
+    # One worker sleeping through each window would take at least 4 x 0.3 seconds
+    assert max(at for *_, at in handler.calls) - started < 0.9
+    jobs.shutdown(timeout=2)
+
+
+def test_messages_sent_during_a_call_become_the_next_turn():
+    release = threading.Event()
+    calls = []
+
+    def handler(message, sender, session_id, turn):
+        calls.append((message, turn))
+        if turn == 1:
+            release.wait(2)
+
+    jobs = JobQueue(workers=2, max_queue=10)
+    sessions = SessionManager(jobs, handler, coalesce_window=0.05)
+    sessions.submit("+447700900001", "one")
+    time.sleep(0.2)
+    sessions.submit("+447700900001", "two")
+    sessions.submit("+447700900001", "three")
+    release.set()
+
+    deadline = time.monotonic() + 2
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert calls == [("one", 1), ("two\nthree", 2)]
+    jobs.shutdown(timeout=2)
+
+
+def test_full_queue_turns_new_sessions_away_without_touching_others():
+    block = threading.Event()
+    jobs = JobQueue(workers=1, max_queue=1)
+    jobs.submit(block.wait)
+    time.sleep(0.05)
+    jobs.submit(block.wait)
+    handler = Recorder(expected=1)
+    sessions = SessionManager(jobs, handler, coalesce_window=0.05)
+
+    assert not sessions.submit("+447700900001", "hello")
+    block.set()
+    time.sleep(0.05)
+    assert sessions.submit("+447700900002", "hi")
+
+    assert handler.done.wait(2)
+    assert [(sender, message) for sender, message, *_ in handler.calls] == [("+447700900002", "hi")]
+    jobs.shutdown(timeout=2)
+
+
+def test_open_windows_count_toward_the_queue_bound():
+    handler = Recorder(expected=2)
+    jobs = JobQueue(workers=1, max_queue=2)
+    sessions = SessionManager(jobs, handler, coalesce_window=0.2)
+
+    accepted = [sessions.submit(f"+4477009000{i:02d}", "hello") for i in range(50)]
+    # Follow-ups to a session that already holds a slot are still accepted
+    assert sessions.submit("+447700900000", "again")
+
+    assert accepted == [True, True] + [False] * 48
+    assert handler.done.wait(2)
+    assert sorted(message for _, message, *_ in handler.calls) == ["hello", "hello\nagain"]
+    assert jobs.shutdown(timeout=2)
+
+
+def test_shutdown_submits_messages_still_in_their_window():
+    handler = Recorder(expected=2)
+    jobs = JobQueue(workers=1, max_queue=10)
+    sessions = SessionManager(jobs, handler, coalesce_window=30)
+    assert sessions.submit("+447700900001", "first")
+    assert sessions.submit("+447700900002", "second")
+
+    assert sessions.shutdown() == 2
+    assert jobs.shutdown(timeout=2)
+
+    assert sorted(message for _, message, *_ in handler.calls) == ["first", "second"]
+    assert not sessions.submit("+447700900003", "too late")
+
+
+def test_released_slots_can_be_reused():
+    handler = Recorder(expected=3)
+    jobs = JobQueue(workers=1, max_queue=1)
+    sessions = SessionManager(jobs, handler, coalesce_window=0.02)
+
+    for i in range(3):
+        deadline = time.monotonic() + 2
+        while not sessions.submit(f"+4477009000{i:02d}", "hello"):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    assert handler.done.wait(2)
+    assert jobs.shutdown(timeout=2)
+
+
+def test_session_history_remembers_used_sessions_across_reopening(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    history = SessionHistory(path)
+    assert history.first_use("sms-a")
+    assert not history.first_use("sms-a")
+    history.close()
+
+    reopened = SessionHistory(path)
+    assert not reopened.first_use("sms-a")
+    assert reopened.first_use("sms-b")
+    reopened.close()
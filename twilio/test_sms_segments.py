@@ -0,0 +1,67 @@
+from sms_segments import (GSM7_SINGLE_LIMIT, UCS2_SINGLE_LIMIT, SmsSegmenter, is_gsm7, max_fit, segment_limit,
+                          split_message)
+
+
+def test_gsm7_detection():
+    assert is_gsm7("Hello £5 @ 10:00 {ok} €")
+    assert not is_gsm7("Café ☕")
+    assert not is_gsm7("naïve")
+
+
+def test_segment_limit_depends_on_encoding():
+    assert segment_limit("plain text") == GSM7_SINGLE_LIMIT
+    assert segment_limit("emoji 😀") == UCS2_SINGLE_LIMIT
+
+
+def test_gsm7_text_fits_exactly_160_characters():
+    assert max_fit("a" * 160) == 160
+    assert max_fit("a" * 161) == 160
+
+
+def test_extension_characters_take_two_septets():
+    assert max_fit("€" * 80) == 80
+    assert max_fit("€" * 81) == 80
+    assert max_fit("a" * 159 + "€") == 159
+
+
+def test_ucs2_text_fits_70_code_units():
+    assert max_fit("☕" * 70) == 70
+    assert max_fit("☕" * 71) == 70
+
+
+def test_characters_outside_the_bmp_count_as_two_code_units():
+    assert max_fit("😀" * 35) == 35
+    assert max_fit("😀" * 36) == 35
+
+
+def test_one_non_gsm_character_drops_the_limit_to_70():
+    text = "a" * 100 + "☕"
+    assert max_fit(text) == 100
+    assert max_fit("a" * 69 + "☕") == 70
+
+
+def test_segments_are_cut_at_sentence_ends():
+    first = "This is the first sentence. " * 4
+    text = first + "And a second part that keeps going for a while longer than one message allows."
+
+    segments = split_message(text)
+
+    assert all(max_fit(segment) == len(segment) for segment in segments)
+    assert segments[0].endswith(".")
+    assert " ".join(segments) == " ".join(text.split())
+
+
+def test_streamed_chunks_release_segments_once_full():
+    segmenter = SmsSegmenter()
+
+    assert segmenter.feed("Short start. ") == []
+    ready = segmenter.feed("word " * 30)
+
+    assert len(ready) == 1
+    assert ready[0] == "Short start."
+    assert segmenter.flush() == [("word " * 30).strip()]
+
+
+def test_short_message_is_a_single_segment():
+    assert split_message("Hello there") == ["Hello there"]
+    assert split_message("") == []